@@ -0,0 +1,74 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+# Compares the BroadcastData encodings: repr/ast.literal_eval against bcastcodec carried in the ICC JSON payload.
+# Usage: python -m controller.benchmarks.bcast_bench [iterations]
+
+import ast
+import sys
+import timeit
+import controller.framework.bcastcodec as bcastcodec
+import controller.framework.jsoncodec as jsoncodec
+
+UID = "ed735ccbdf7f81d5a344eb133359f05b3cb015e1"
+
+
+# SendMacDetails message as broadcast by ArpCache with a MAC-IP table of the given size
+def mac_details(table_size):
+    table = dict(("5A7C7C{0:06X}".format(i), "10.254.{0}.{1}".format(i // 250, i % 250 + 1))
+                 for i in range(table_size))
+    return {"src_uid": UID, "src_node_mac": "5A7C7CB9812A", "mac_ip_table": table,
+            "message_type": "SendMacDetails"}
+
+
+def icc(dataframe):
+    return {"msg_type": "forward", "src_uid": UID, "msg": {"dataframe": dataframe, "init_uid": UID,
+                                                           "peer_list": [UID], "put_time": 1508181200680,
+                                                           "message_type": "BroadcastData"}}
+
+
+def literal_roundtrip(msg):
+    data = jsoncodec.loads(jsoncodec.dumps(icc(str(msg))))
+    ast.literal_eval(data["msg"]["dataframe"])
+
+
+def codec_roundtrip(msg):
+    data = jsoncodec.loads(jsoncodec.dumps(icc(bcastcodec.encode(msg))))
+    bcastcodec.decode(data["msg"]["dataframe"])
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    jsoncodec.select_backend("auto")
+    print("json backend: {0}".format(jsoncodec.BACKEND))
+    print("{0:>10} {1:>20} {2:>20} {3:>8}".format("entries", "literal_eval us/msg", "bcastcodec us/msg", "speedup"))
+    for size in [1, 16, 128, 1024]:
+        msg = mac_details(size)
+        assert bcastcodec.decode(bcastcodec.encode(msg)) == msg
+        count = max(1, iterations // max(1, size // 16))
+        old = timeit.timeit(lambda: literal_roundtrip(msg), number=count) / count * 1e6
+        new = timeit.timeit(lambda: codec_roundtrip(msg), number=count) / count * 1e6
+        print("{0:>10} {1:>20.2f} {2:>20.2f} {3:>7.1f}x".format(size, old, new, old / new))
+
+
+if __name__ == "__main__":
+    main()
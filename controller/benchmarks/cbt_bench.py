@@ -0,0 +1,110 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+# Cost of registerCBT with the slotted CBT against the previous uuid4 tagged CBT with an eager Request object.
+# Usage: python -m controller.benchmarks.cbt_bench [iterations]
+
+import gc
+import sys
+import uuid
+import timeit
+import tracemalloc
+from controller.framework.CBT import CBT
+from controller.framework.CFxHandle import CFxHandle
+from controller.framework.ControllerModule import ControllerModule
+
+
+class LegacyCBT(object):
+    class Request(object):
+        def __init__(self, initiator='', recipient='', action='', data=''):
+            self.Initiator = initiator
+            self.Recipient = recipient
+            self.Action = action
+            self.Data = data
+
+    def __init__(self, initiator='', recipient='', action='', data=''):
+        self.Tag = uuid.uuid4()
+        self.Parent = None
+        self.ChildCount = 0
+        self.Completed = False
+        self.OpType = "Request"
+        self.initiator = initiator
+        self.recipient = recipient
+        self.action = action
+        self.data = data
+        self.Request = self.Request(initiator, recipient, action, data)
+
+
+class NullCFx(object):
+    def submitCBT(self, cbt):
+        pass
+
+
+class LegacyHandle(CFxHandle):
+    def createCBT(self, initiator='', recipient='', action='', data=''):
+        cbt = LegacyCBT(initiator, recipient, action, data)
+        self.OwnedCBTs[cbt.Tag] = cbt
+        return cbt
+
+
+class BenchModule(ControllerModule):
+    def initialize(self):
+        pass
+
+    def processCBT(self, cbt):
+        pass
+
+    def timer_method(self):
+        pass
+
+    def terminate(self):
+        pass
+
+
+def measure(handle_cls, iterations):
+    module = BenchModule(handle_cls(NullCFx()), {}, "BenchModule")
+    register = lambda: module.registerCBT("Logger", "debug", "Broadcast message received from peer node.")
+    elapsed = timeit.timeit(register, number=iterations)
+    # The CBTs are kept alive while tracing so the traced size is the memory of a CBT and its tracking entry
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    cbts = [register() for _ in range(iterations)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del cbts
+    stats = after.compare_to(before, "filename")
+    count = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    return elapsed / iterations * 1e9, float(count) / iterations, float(size) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print("{0:<8} {1:>16} {2:>16} {3:>16}".format("cbt", "ns/registerCBT", "blocks/CBT", "bytes/CBT"))
+    for name, handle_cls in [("legacy", LegacyHandle), ("slotted", CFxHandle)]:
+        ns, blocks, size = measure(handle_cls, iterations)
+        print("{0:<8} {1:>16.0f} {2:>16.2f} {3:>16.1f}".format(name, ns, blocks, size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+# Micro-benchmark of the JSON codec backends on Tincan and XMPP messages captured from a running controller.
+# Usage: python -m controller.benchmarks.codec_bench [iterations]
+
+import sys
+import json
+import timeit
+import controller.framework.ipoplib as ipoplib
+import controller.framework.jsoncodec as jsoncodec
+from controller.framework.TapFrame import TapFrame
+
+UID = "ed735ccbdf7f81d5a344eb133359f05b3cb015e1"
+PEER_UID = "325e888f9bda1f2df1247ca68defecc011fbf299"
+
+# Frames captured from UpdateRoutes messages in logs/ctrl.log (ARP reply, IGMP report, mDNS query)
+FRAMES = [
+    "FFFFFFFFFFFF5A7C7CB9812A080600010800060400025A7C7CB9812A0AFE000A5A7C7CB9812A0AFE000A",
+    "01005E0000165A7C7CB9812A080046C00028000040000102F8F10AFE000AE0000016940400002200F9020000000104000000E00000FB",
+    "01005E0000FB5A7C7CB9812A0800450000736F314000FF1120450AFE000AE00000FB14E914E9005F311100000000000200000002000002"
+    "313001300332353402313007696E2D6164647204617270610000FF00010373616D056C6F63616C0000FF0001C02A0001000100000078"
+    "00040AFE000AC00C000C0001000000780002C02A"
+]
+
+
+def _update_routes(frame):
+    return json.dumps({"IPOP": {"ProtocolVersion": 4, "TransactionId": 0, "ControlType": "TincanRequest",
+                                "Request": {"Command": "UpdateRoutes", "InterfaceName": "ipop_tap0", "Data": frame}}})
+
+
+def _node_info_response():
+    message = {"Type": "peer", "UID": PEER_UID, "VIP4": "10.254.0.10", "MAC": "5A7C7CB9812A", "Status": "online",
+               "Fingerprint": "sha-1 EF:73:46:2C:2E:AA:E8:7B:2C:D7:0B:F8:02:D7:91:63:8E:E6:93:E9"}
+    return json.dumps({"IPOP": {"ProtocolVersion": 4, "TransactionId": 12, "ControlType": "TincanResponse",
+                                "Request": {"Command": "QueryNodeInfo", "InterfaceName": "ipop_tap0", "UID": PEER_UID,
+                                            "MAC": "", "Initiator": "LinkManager", "ProtocolVersion": 4},
+                                "Response": {"Success": True, "Message": json.dumps(message)}}})
+
+
+def _icc_advertise():
+    data = {"src_uid": UID, "msg_type": "advertise", "peer_list": [PEER_UID]}
+    return json.dumps({"IPOP": {"ProtocolVersion": 4, "TransactionId": 0, "ControlType": "TincanRequest",
+                                "Request": {"Command": "ICC", "InterfaceName": "ipop_tap0", "Recipient": UID,
+                                            "Data": json.dumps(data)}}})
+
+
+# Messages received from Tincan, decoded by TincanInterface.process_tincan_data
+INGRESS = [_update_routes(frame).encode("utf-8") for frame in FRAMES] + \
+          [_node_info_response().encode("utf-8"), _icc_advertise().encode("utf-8")]
+
+# Forwarded CBT sent over XMPP by LinkManager.request_cas
+CAS_REQUEST = {"peer_uid": PEER_UID, "interface_name": "ipop_tap0", "ip4": "10.254.0.30", "mac": "CEC679FB2C4B",
+               "fpr": "sha-1 EF:73:46:2C:2E:AA:E8:7B:2C:D7:0B:F8:02:D7:91:63:8E:E6:93:E9", "ttl": 1508181200.68}
+
+
+def decode_ingress():
+    for data in INGRESS:
+        msg = jsoncodec.loads(data)["IPOP"]
+        request = msg["Request"]
+        if "Response" in msg:
+            jsoncodec.loads(msg["Response"]["Message"])
+        elif request["Command"] == "ICC":
+            jsoncodec.loads(request["Data"])
+
+
+def encode_requests():
+    ipoplib.LSTATE.build(1, ProtocolVersion=4, InterfaceName="ipop_tap0", UID=PEER_UID, MAC="",
+                         Initiator="LinkManager")
+    ipoplib.ICC.build(2, InterfaceName="ipop_tap0", Recipient=PEER_UID, RecipientMac="",
+                      Data=jsoncodec.dumps({"src_uid": UID, "msg_type": "advertise", "peer_list": [PEER_UID]}),
+                      Initiator="BaseTopologyManager")
+    ipoplib.INSERT_TAP_PACKET.build(3, InterfaceName="ipop_tap0", Data=TapFrame.from_hex(FRAMES[0]))
+
+
+# Forwarded CBT as sent before the codec change, the core data was JSON encoded inside the JSON payload
+def xmpp_roundtrip_nested():
+    cbt = dict(sender_uid=UID, dest_module="LinkManager", action="RETRIEVE_CAS_FROM_TINCAN",
+               core_data=json.dumps(CAS_REQUEST))
+    payload = json.loads(json.dumps(cbt))
+    json.loads(payload["core_data"])
+
+
+def xmpp_roundtrip():
+    cbt = dict(sender_uid=UID, dest_module="LinkManager", action="RETRIEVE_CAS_FROM_TINCAN", core_data=CAS_REQUEST)
+    jsoncodec.loads(jsoncodec.dumps(cbt))
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print("{0:<10} {1:>18} {2:>18} {3:>18}".format("backend", "ingress us/msg", "requests us/msg",
+                                                    "xmpp cbt us/msg"))
+    for name in jsoncodec.available_backends():
+        jsoncodec.select_backend(name)
+        ingress = timeit.timeit(decode_ingress, number=iterations) / (iterations * len(INGRESS)) * 1e6
+        requests = timeit.timeit(encode_requests, number=iterations) / (iterations * 3) * 1e6
+        xmpp = timeit.timeit(xmpp_roundtrip, number=iterations) / iterations * 1e6
+        print("{0:<10} {1:>18.2f} {2:>18.2f} {3:>18.2f}".format(name, ingress, requests, xmpp))
+    nested = timeit.timeit(xmpp_roundtrip_nested, number=iterations) / iterations * 1e6
+    print("{0:<10} {1:>18} {2:>18} {3:>18.2f}".format("nested", "-", "-", nested))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+# Compares the broadcast duplicate check: the timestamp list scanned with list.count against DedupeCache.
+# Usage: python -m controller.benchmarks.dedupe_bench [messages]
+
+import sys
+import timeit
+from controller.framework.DedupeCache import DedupeCache
+
+UIDS = ["{0:040x}".format(i * 7919) for i in range(64)]
+
+
+# Broadcast keys as received by a node, every message arrives twice (over two forwarding paths)
+def received_keys(count):
+    keys = []
+    for i in range(count):
+        key = (UIDS[i % len(UIDS)], 1508181200680 + i // 4, i)
+        keys.append(key)
+        keys.append(key)
+    return keys
+
+
+def list_dedupe(keys):
+    prevtimestamp = []
+    forwarded = 0
+    for key in keys:
+        if prevtimestamp.count(key[1]) == 0:
+            if len(prevtimestamp) >= 10000:
+                prevtimestamp = []
+            prevtimestamp.append(key[1])
+            forwarded += 1
+    return forwarded
+
+
+def cache_dedupe(keys):
+    cache = DedupeCache(10000, 30)
+    forwarded = 0
+    for key in keys:
+        if not cache.seen(key):
+            forwarded += 1
+    return forwarded
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    keys = received_keys(count)
+    print("{0:>10} {1:>16} {2:>16} {3:>16} {4:>16}".format("messages", "list us/msg", "list forwarded",
+                                                             "cache us/msg", "cache forwarded"))
+    old = timeit.timeit(lambda: list_dedupe(keys), number=1) / len(keys) * 1e6
+    new = timeit.timeit(lambda: cache_dedupe(keys), number=1) / len(keys) * 1e6
+    print("{0:>10} {1:>16.2f} {2:>16} {3:>16.2f} {4:>16}".format(count, old, list_dedupe(keys), new,
+                                                                  cache_dedupe(keys)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+# Compares the broadcast relay target selection: scanning the peer list per message against BroadcastTree.
+# Usage: python -m controller.benchmarks.fanout_bench [messages]
+
+import sys
+import random
+import timeit
+from controller.framework.BroadcastTree import BroadcastTree
+
+
+# Relay targets as selected by BroadcastForwarder before the fan-out was cached
+def scan_targets(uid, peerlist, init_id, in_plist):
+    targets = []
+    plist = sorted(peerlist)
+    if uid >= max(in_plist) and uid > init_id:
+        for peer in plist:
+            if peer != init_id and peer > uid:
+                targets.append(peer)
+    elif uid <= min(in_plist) and uid < init_id:
+        for peer in plist:
+            if init_id >= max(in_plist):
+                if uid < peer and in_plist.count(peer) == 0 and peer != init_id:
+                    targets.append(peer)
+            else:
+                if uid > peer and in_plist.count(peer) == 0 and peer != init_id:
+                    targets.append(peer)
+    else:
+        for peer in plist:
+            if uid < peer and in_plist.count(peer) == 0 and peer != init_id and peer < max(in_plist):
+                targets.append(peer)
+    return targets
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rnd = random.Random(7)
+    print("{0:>8} {1:>14} {2:>14} {3:>8}".format("peers", "scan us/msg", "tree us/msg", "speedup"))
+    for size in [4, 16, 64, 256]:
+        nodes = sorted("{0:040x}".format(rnd.getrandbits(160)) for _ in range(max(128, size * 4)))
+        uid = nodes[len(nodes) // 2]
+        peers = rnd.sample([node for node in nodes if node != uid], size)
+        # Broadcasts of 32 initiators, each arriving with one of two peer lists
+        messages = []
+        for _ in range(count):
+            init_id = nodes[rnd.randrange(32) * 4]
+            messages.append((init_id, [nodes[rnd.randrange(2) + 40], nodes[rnd.randrange(2) + 80]]))
+        tree = BroadcastTree(uid)
+        tree.update(uid, peers)
+        for init_id, in_plist in messages[:100]:
+            assert tree.targets(init_id, in_plist) == scan_targets(uid, peers, init_id, in_plist)
+        old = timeit.timeit(lambda: [scan_targets(uid, peers, i, p) for i, p in messages], number=1) / count * 1e6
+        new = timeit.timeit(lambda: [tree.targets(i, p) for i, p in messages], number=1) / count * 1e6
+        print("{0:>8} {1:>14.2f} {2:>14.2f} {3:>7.1f}x".format(size, old, new, old / new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+# Next hop selection of BaseTopologyManager.forward_msg: scan of the sorted successor table against the routing
+# index lookup. Forwards packets to random destinations over a ring of simulated peers, a tenth of them offline.
+# Usage: python -m controller.benchmarks.forwarding_bench [peers] [packets]
+
+import sys
+import time
+import random
+from controller.framework.RoutingIndex import RoutingIndex
+
+
+def _uid(rnd):
+    return "{0:040x}".format(rnd.getrandbits(160))
+
+
+def closer(uid_A, uid, uid_B):
+    if (uid_A < uid_B) and ((uid_A < uid) and (uid <= uid_B)):
+        return True
+    elif (uid_A > uid_B) and ((uid_A < uid) or (uid <= uid_B)):
+        return True
+    return False
+
+
+def is_link_connected(vnet_details, uid):
+    if uid in vnet_details["link_type"].keys():
+        link_type = vnet_details["link_type"][uid]
+        if uid in vnet_details[link_type].keys():
+            if "status" in vnet_details[link_type][uid].keys():
+                if vnet_details[link_type][uid]["status"] == "online":
+                    return True
+    return False
+
+
+# Next hop selection as done by forward_msg before the routing index
+def scan_next_hop(vnet_details, uid, dst_uid):
+    nxt_uid = uid
+    for peer in sorted(list(vnet_details["successor"].keys())):
+        if is_link_connected(vnet_details, peer):
+            if peer == dst_uid:
+                return peer
+            if closer(uid, peer, dst_uid):
+                nxt_uid = peer
+    return nxt_uid
+
+
+def main():
+    npeers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    npackets = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    rnd = random.Random(11)
+    uid = _uid(rnd)
+    vnet_details = {"successor": {}, "link_type": {}}
+    index = RoutingIndex()
+    for _ in range(npeers):
+        peer = _uid(rnd)
+        status = "offline" if rnd.random() < 0.1 else "online"
+        vnet_details["successor"][peer] = {"status": status, "ttl": 0, "mac": ""}
+        vnet_details["link_type"][peer] = "successor"
+        index.set_online(peer, is_link_connected(vnet_details, peer))
+    peers = list(vnet_details["successor"].keys())
+    # half of the packets are sent to a peer, the others to arbitrary nodes of the ring
+    dsts = [rnd.choice(peers) if i % 2 else _uid(rnd) for i in range(npackets)]
+
+    # the scan is timed on a sample, it takes minutes for the full packet count
+    sample = dsts[:max(1, npackets // 100)]
+    start = time.time()
+    scanned = [scan_next_hop(vnet_details, uid, dst) for dst in sample]
+    scan_us = (time.time() - start) / len(sample) * 1e6
+    start = time.time()
+    for dst in dsts:
+        index.next_hop(uid, dst)
+    index_us = (time.time() - start) / len(dsts) * 1e6
+
+    # the scan keeps the largest peer past zero on a wrapped interval, the index the one closest to the destination
+    same = sum(1 for dst, hop in zip(sample, scanned) if uid > dst or index.next_hop(uid, dst) == hop)
+    print("{0} peers ({1} online), {2} packets".format(npeers, len(index), npackets))
+    print("{0:<8} {1:>12}".format("lookup", "us/packet"))
+    print("{0:<8} {1:>12.2f}".format("scan", scan_us))
+    print("{0:<8} {1:>12.2f}".format("index", index_us))
+    print("next hop agreement on unwrapped intervals: {0}/{1}".format(same, len(sample)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+# Compares the Tincan link state queries issued by LinkManager with fixed polling, adaptive polling and Tincan
+# link state notifications. A stub Tincan holds the state of every link and flaps a few links over a simulated
+# hour, the LinkManager timer is simulated at its default interval. Without notifications a longer max poll
+# interval saves queries at the cost of detecting a change later, adaptive polling is also run with a 60 s max.
+# Usage: python -m controller.benchmarks.linkstate_bench [peers] [flaps per hour]
+
+import sys
+import random
+import controller.framework.fxlib as fxlib
+from controller.framework.LinkStatePoller import LinkStatePoller
+
+DURATION = 3600
+
+
+class StubTincan(object):
+    '''
+    Link states of the peers as Tincan would report them. Notification listeners are called on every change,
+    standing in for the unsolicited LinkStateChange messages.
+    '''
+    def __init__(self, peers, flaps, seed=7):
+        rnd = random.Random(seed)
+        self.status = dict((uid, "online") for uid in peers)
+        self.events = sorted((rnd.uniform(0, DURATION), rnd.choice(peers)) for _ in range(flaps))
+        self.listeners = []
+        self.queries = 0
+
+    def advance(self, now):
+        changes = []
+        while self.events and self.events[0][0] <= now:
+            when, uid = self.events.pop(0)
+            self.status[uid] = "offline" if self.status[uid] == "online" else "online"
+            changes.append((when, uid))
+            for listener in self.listeners:
+                listener(uid, self.status[uid], when)
+        return changes
+
+    def query(self, uid):
+        # QueryNodeInfo and QueryLinkStats are sent together for every polled peer
+        self.queries += 2
+        return self.status[uid]
+
+
+def run(mode, peers, flaps, max_interval=None):
+    config = fxlib.CONFIG["LinkManager"]
+    interval = config["TimerInterval"]
+    if max_interval is None:
+        max_interval = config["MaxLinkPollInterval"]
+    tincan = StubTincan(peers, flaps)
+    poller = LinkStatePoller(interval, min(max_interval, config["LinkPulse"] / 2), config["LinkPollBackoff"])
+    known = dict((uid, "online") for uid in peers)
+    pending = {}   # uid -> time of the change not yet seen by LinkManager
+    delays = []
+
+    def on_notification(uid, status, when):
+        poller.notify(uid, status, when)
+        known[uid] = status
+        delays.append(0.0)
+        pending.pop(uid, None)
+
+    if mode == "notify":
+        tincan.listeners.append(on_notification)
+    now = 0
+    while now < DURATION:
+        now += interval
+        for when, uid in tincan.advance(now):
+            if mode != "notify":
+                pending.setdefault(uid, when)
+        for uid in peers:
+            if mode != "fixed" and not poller.is_due(uid, now):
+                continue
+            status = tincan.query(uid)
+            poller.observe(uid, status, now)
+            if status != known[uid]:
+                known[uid] = status
+                delays.append(now - pending.pop(uid, now))
+    return tincan.queries, sum(delays) / max(1, len(delays))
+
+
+def main():
+    npeers = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    flaps = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    peers = ["{0:040x}".format(i) for i in range(npeers)]
+    print("{0} peers, {1} link flaps per hour".format(npeers, flaps))
+    print("{0:<10} {1:>12} {2:>16} {3:>18}".format("mode", "max poll (s)", "queries/hour", "mean detect (s)"))
+    default = fxlib.CONFIG["LinkManager"]["MaxLinkPollInterval"]
+    for mode, max_interval in (("fixed", default), ("adaptive", default), ("adaptive", 60), ("notify", default),
+                               ("notify", 60)):
+        queries, delay = run(mode, peers, flaps, max_interval)
+        print("{0:<10} {1:>12} {2:>16} {3:>18.1f}".format(mode, "-" if mode == "fixed" else max_interval, queries,
+                                                          delay))
+
+
+if __name__ == "__main__":
+    main()
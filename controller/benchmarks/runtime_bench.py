@@ -0,0 +1,126 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+# Compares the threaded and asyncio CFx runtimes: a ring of controller modules passes CBTs to its successor while
+# every module also runs a timer. Reports throughput, OS threads, context switches and resident memory.
+# Usage: python -m controller.benchmarks.runtime_bench [modules] [hops]
+
+import os
+import sys
+import time
+import resource
+import threading
+import subprocess
+from controller.framework.CFxHandle import CFxHandle
+from controller.framework.ControllerModule import ControllerModule
+
+TOKENS = 32
+
+
+class RingModule(ControllerModule):
+    def initialize(self):
+        pass
+
+    def processCBT(self, cbt):
+        hops = cbt.data
+        if hops == 0:
+            self.CMConfig["done"].release()
+        else:
+            self.registerCBT(self.CMConfig["next"], "PING", hops - 1)
+
+    def timer_method(self):
+        pass
+
+    def terminate(self):
+        pass
+
+
+class BenchCFx(object):
+    def __init__(self, runtime):
+        self.CONFIG = {"CFx": {"QueueCapacity": 0}}
+        self.runtime = runtime
+        self.CFxHandleDict = {}
+
+    def submitCBT(self, cbt):
+        self.CFxHandleDict[cbt.recipient].CMQueue.put(cbt)
+
+
+def rss_kb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS"):
+                return int(line.split()[1])
+    return 0
+
+
+def run(runtime_name, modules, hops):
+    runtime = None
+    if runtime_name == "asyncio":
+        from controller.framework.AsyncRuntime import AsyncRuntime
+        runtime = AsyncRuntime()
+    cfx = BenchCFx(runtime)
+    done = threading.Semaphore(0)
+    rss_before = rss_kb()
+    for i in range(modules):
+        name = "Ring{0}".format(i)
+        handle = CFxHandle(cfx)
+        config = {"next": "Ring{0}".format((i + 1) % modules), "done": done, "TimerInterval": 1}
+        handle.CMInstance = RingModule(handle, config, name)
+        handle.CMConfig = config
+        cfx.CFxHandleDict[name] = handle
+        handle.initialize()
+    if runtime is not None:
+        runtime.start(list(cfx.CFxHandleDict.values()))
+    else:
+        for handle in cfx.CFxHandleDict.values():
+            handle.CMThread.start()
+            handle.timer_thread.daemon = True
+            handle.timer_thread.start()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.time()
+    for token in range(TOKENS):
+        cfx.CFxHandleDict["Ring{0}".format(token % modules)].CMInstance.registerCBT("Ring0", "PING", hops)
+    for token in range(TOKENS):
+        done.acquire()
+    elapsed = time.time() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    print("{0:<9} {1:>12.0f} {2:>8} {3:>12} {4:>12} {5:>10}".format(
+        runtime_name, TOKENS * hops / elapsed, threading.active_count(), after.ru_nvcsw - usage.ru_nvcsw,
+        after.ru_nivcsw - usage.ru_nivcsw, rss_kb() - rss_before))
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in ["threaded", "asyncio"]:
+        run(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
+        return
+    modules = sys.argv[1] if len(sys.argv) > 1 else "15"
+    hops = sys.argv[2] if len(sys.argv) > 2 else "2000"
+    print("{0:<9} {1:>12} {2:>8} {3:>12} {4:>12} {5:>10}".format("runtime", "CBTs/s", "threads", "vol csw",
+                                                                 "invol csw", "rss KB"))
+    # each runtime runs in a fresh interpreter so threads and memory of one run do not affect the other
+    for runtime_name in ["threaded", "asyncio"]:
+        subprocess.check_call([sys.executable, "-m", "controller.benchmarks.runtime_bench", runtime_name, modules,
+                               hops], cwd=os.getcwd())
+
+
+if __name__ == "__main__":
+    main()
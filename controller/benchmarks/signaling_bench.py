@@ -0,0 +1,305 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+# Measures the XMPP signaling of XmppClient and XC offline: N controllers join the in-process stand-in server, at once
+# or one every join interval, and every pair exchanges the CAS request/response of a link setup through it. Each
+# controller runs the XMPP module with a simulated LinkManager that answers CAS requests immediately, so the results
+# only reflect the signaling path. Reports the simulated time to the full mesh, the stanzas sent per link setup and
+# the server stanza rate. XmppClient is run with the peers discovered from their presence, and with the peer UIDs
+# known up front (as from the link advertisements of BaseTopologyManager) while the server is late pushing the
+# roster presences, so the link setups are requested again every timer tick and queue several CBTs per peer until its
+# JID is resolved. Both are run with forwarded CBT batching off and on. XC is run with the peer UIDs known up front,
+# it drops the CAS messages to peers it has not received an advertisement from. Without sleekxmpp installed the
+# modules run against the stand-in stanza classes of xmpp_standin.
+# Usage: python -m controller.benchmarks.signaling_bench [nodes ...] [--latency=<ms>] [--join=<ms>]
+#                                                        [--roster-delay=<ms>]
+
+import sys
+import json
+import time
+import random
+from collections import deque
+from controller.framework.CBT import CBT
+from controller.framework.fxlib import CONFIG
+from controller.benchmarks.xmpp_standin import StandInClient, StandInServer, install_sleekxmpp
+STANDIN_SLEEKXMPP = install_sleekxmpp()
+import controller.modules.XmppClient as xmppclient
+import controller.modules.XC as xc
+
+TAP = "ipop_tap0"
+FPR = "F" * 95
+CAS = "1:1:udp:10.0.0.1:50000:host:2130706431 " * 8
+TIMER_INTERVAL = 1.0
+MAX_TIME = 600.0
+
+
+class StandInModule(object):
+    # Takes the place of the sleekxmpp module in XmppClient so its connections are made to the stand-in server
+    def __init__(self, server):
+        self.server = server
+
+    def ClientXMPP(self, jid, password, sasl_mech=None):
+        return StandInClient(self.server, jid, password, sasl_mech)
+
+
+class SimClock(object):
+    # Takes the place of the time module in XC, its advertisement delays are measured on the server clock
+    def __init__(self, server):
+        self.server = server
+
+    def time(self):
+        return self.server.now
+
+
+class Publisher(object):
+    def __init__(self, controller, action):
+        self.controller = controller
+        self.action = action
+
+    def PostUpdate(self, msg):
+        self.controller.submitCBT(CBT("XmppClient", "LinkManager", self.action, msg))
+
+
+class BenchHandle(object):
+    # CFxHandle of a simulated controller, CBTs are queued on the controller and dispatched by the bench loop
+    def __init__(self, controller):
+        self.controller = controller
+
+    def createCBT(self, initiator='', recipient='', action='', data=''):
+        return CBT(initiator, recipient, action, data)
+
+    def submitCBT(self, cbt):
+        self.controller.submitCBT(cbt)
+
+    def submitCBTs(self, cbts):
+        for cbt in cbts:
+            self.controller.submitCBT(cbt)
+
+    def queryParam(self, ModuleName, ParamName=""):
+        return [{"TapName": TAP, "uid": self.controller.uid}]
+
+    def PublishSubscription(self, SubscriptionName):
+        return Publisher(self.controller, SubscriptionName)
+
+
+class SimLinkManager(object):
+    # Link setup handshake of LinkManager, the CAS of the local Tincan is available right away
+    def __init__(self, controller):
+        self.controller = controller
+        self.peers = []         # peer UIDs known up front
+        self.requested = set()  # peer UIDs a CAS request was sent to
+        self.linked = set()     # peer UIDs whose CAS was received
+        self.failed = 0
+
+    def forward(self, peer_uid, action, core_data):
+        payload = dict(sender_uid=self.controller.uid, dest_module="LinkManager", action=action, core_data=core_data)
+        self.controller.submitCBT(CBT("LinkManager", "XmppClient", "FORWARD_CBT",
+                                      {"uid": peer_uid, "data": payload, "interface_name": TAP}))
+
+    def request_cas(self, peer_uid):
+        self.requested.add(peer_uid)
+        self.forward(peer_uid, "RETRIEVE_CAS_FROM_TINCAN",
+                     {"peer_uid": peer_uid, "interface_name": TAP, "ip4": "10.254.0.1", "fpr": FPR,
+                      "mac": "ae:00:00:00:00:01", "ttl": 120})
+
+    def processCBT(self, cbt):
+        msg = cbt.data
+        if cbt.action == "PEER_PRESENCE_NOTIFICATION":
+            peer_uid = msg["uid_notification"]
+            if peer_uid != self.controller.uid and peer_uid not in self.requested:
+                self.request_cas(peer_uid)
+        elif cbt.action == "RETRIEVE_CAS_FROM_TINCAN":
+            self.forward(msg["uid"], "CREATE_P2PLINK",
+                         {"uid": self.controller.uid, "cas": CAS, "fpr": FPR, "mac": "ae:00:00:00:00:02"})
+            if msg["uid"] not in self.requested:
+                self.request_cas(msg["uid"])
+        elif cbt.action == "CREATE_P2PLINK":
+            if msg["uid"] not in self.linked:
+                self.linked.add(msg["uid"])
+                self.controller.bench.link_endpoint(self.controller.uid, msg["uid"])
+        elif cbt.action == "FORWARD_CBT_FAILED":
+            self.failed += 1
+
+    # The link setups to the peers known up front are requested again every tick until their CAS is received, like
+    # the CREATE_LINK of BaseTopologyManager for its discovered nodes
+    def timer_method(self):
+        if not self.controller.session_started():
+            return
+        for peer_uid in self.peers:
+            if peer_uid not in self.linked:
+                self.request_cas(peer_uid)
+
+
+class SimLegacyLinkManager(SimLinkManager):
+    # Link setup handshake of the LinkManager signaling through XC, the CAS request and response are DO_SEND_MSG
+    # methods carrying the JSON encoded data
+    METHODS = {"RETRIEVE_CAS_FROM_TINCAN": "get_peer_casdetails", "CREATE_P2PLINK": "sent_peer_casdetails"}
+
+    def forward(self, peer_uid, action, core_data):
+        self.controller.submitCBT(CBT("LinkManager", "XmppClient", "DO_SEND_MSG",
+                                      {"method": self.METHODS[action], "uid": peer_uid, "data": json.dumps(core_data),
+                                       "interface_name": TAP}))
+
+
+class Controller(object):
+    def __init__(self, bench, index, config, module):
+        self.bench = bench
+        self.uid = "{0:040x}".format(random.getrandbits(160))
+        self.queue = deque()
+        self.link_manager = SimLegacyLinkManager(self) if module is xc else SimLinkManager(self)
+        config = dict(config)
+        config["XmppDetails"] = [{"TapName": TAP, "Username": "node{0}@{1}".format(index, bench.server.domain),
+                                  "Password": "password", "AddressHost": bench.server.domain, "Port": 5222,
+                                  "AcceptUntrustedServer": True}]
+        bench.server.add_account("node{0}@{1}".format(index, bench.server.domain))
+        self.xmpp = module.XmppClient(BenchHandle(self), config, "XmppClient")
+
+    def session_started(self):
+        xmpp_details = self.xmpp.ipop_xmpp_details.get(TAP)
+        return xmpp_details is not None and xmpp_details["callbackinit"]
+
+    def submitCBT(self, cbt):
+        self.queue.append(cbt)
+        self.bench.busy.add(self)
+
+    # Dispatch the queued CBTs, XmppClient gets its CBTs in one batch per cycle like the CFx worker
+    def dispatch(self):
+        process_batch = getattr(self.xmpp, "processCBTBatch", None)
+        cbts = list(self.queue)
+        self.queue.clear()
+        batch = []
+        for cbt in cbts:
+            if cbt.recipient == "XmppClient":
+                batch.append(cbt)
+            elif cbt.recipient == "LinkManager":
+                self.link_manager.processCBT(cbt)
+        if batch and process_batch is not None:
+            process_batch(batch)
+        else:
+            for cbt in batch:
+                self.xmpp.processCBT(cbt)
+
+
+class SignalingBench(object):
+    def __init__(self, nodes, latency, join, config, module=xmppclient, known_peers=False, roster_delay=0.0):
+        self.server = StandInServer(module.JID, latency, roster_delay=roster_delay)
+        self.module = module
+        self.join = join
+        self.busy = set()
+        self.endpoints = set()
+        self.links = 0
+        self.mesh_links = nodes * (nodes - 1) // 2
+        self.mesh_time = None
+        self.controllers = [Controller(self, index, config, module) for index in range(nodes)]
+        if known_peers:
+            for controller in self.controllers:
+                controller.link_manager.peers = [peer.uid for peer in self.controllers if peer is not controller]
+
+    # A link is set up once both ends have received the CAS of the other
+    def link_endpoint(self, uid, peer_uid):
+        self.endpoints.add((uid, peer_uid))
+        if (peer_uid, uid) in self.endpoints:
+            self.links += 1
+            if self.links == self.mesh_links:
+                self.mesh_time = self.server.now
+
+    def drain(self):
+        while self.busy:
+            busy, self.busy = self.busy, set()
+            for controller in busy:
+                controller.dispatch()
+
+    def timer(self):
+        for controller in self.controllers:
+            controller.link_manager.timer_method()
+            controller.xmpp.timer_method()
+        if self.mesh_time is None and self.server.now < MAX_TIME:
+            self.server.schedule(TIMER_INTERVAL, self.timer)
+
+    def run(self):
+        sleekxmpp, xc_time = self.module.sleekxmpp, xc.time
+        self.module.sleekxmpp = StandInModule(self.server)
+        xc.time = SimClock(self.server)
+        try:
+            start = time.time()
+            for index, controller in enumerate(self.controllers):
+                self.server.schedule(index * self.join, controller.xmpp.initialize)
+            self.server.schedule(TIMER_INTERVAL, self.timer)
+            self.drain()
+            while self.mesh_time is None and self.server.now < MAX_TIME and self.server.step():
+                self.drain()
+            wall = time.time() - start
+        finally:
+            self.module.sleekxmpp, xc.time = sleekxmpp, xc_time
+        return wall
+
+
+def run(nodes, latency, join, batching, module=xmppclient, known_peers=False, roster_delay=0.0):
+    config = dict(CONFIG["XmppClient"])
+    config["BatchForwardedCBTs"] = batching
+    random.seed(nodes)
+    bench = SignalingBench(nodes, latency, join, config, module, known_peers, roster_delay)
+    wall = bench.run()
+    server = bench.server
+    sent = sum(count for kind, count in server.received.items() if kind in ("presence", "message"))
+    delivered = sum(server.delivered.values())
+    elapsed = bench.mesh_time if bench.mesh_time is not None else server.now
+    links = max(1, bench.links)
+    print("{0:>5} {1:>10} {2:>8} {3:>8} {4:>6}/{5:<6} {6:>10} {7:>9.1f} {8:>9.1f} {9:>11.0f} {10:>9.0f} {11:>7}".format(
+        nodes, "XC" if module is xc else "XmppClient", "known" if known_peers else "presence",
+        "-" if module is xc else "on" if batching else "off", bench.links, bench.mesh_links,
+        "{0:.2f}".format(bench.mesh_time) if bench.mesh_time is not None else "timeout",
+        float(server.received["message"]) / links, float(sent) / links,
+        delivered / elapsed if elapsed else 0, 1000 * wall,
+        sum(controller.link_manager.failed for controller in bench.controllers)))
+
+
+def main():
+    latency = 0.02
+    join = 0.0
+    roster_delay = 3.0
+    sizes = []
+    for arg in sys.argv[1:]:
+        if arg.startswith("--latency="):
+            latency = float(arg.split("=", 1)[1]) / 1000
+        elif arg.startswith("--join="):
+            join = float(arg.split("=", 1)[1]) / 1000
+        elif arg.startswith("--roster-delay="):
+            roster_delay = float(arg.split("=", 1)[1]) / 1000
+        else:
+            sizes.append(int(arg))
+    sizes = sizes or [4, 16, 64]
+    print("stand-in server latency {0:.0f} ms, join interval {1:.0f} ms, roster delay {2:.0f} ms with known peers{3}"
+          .format(1000 * latency, 1000 * join, 1000 * roster_delay,
+                  ", sleekxmpp not installed, using stand-in stanzas" if STANDIN_SLEEKXMPP else ""))
+    print("{0:>5} {1:>10} {2:>8} {3:>8} {4:>13} {5:>10} {6:>9} {7:>9} {8:>11} {9:>9} {10:>7}".format(
+        "nodes", "module", "peers", "batching", "links", "mesh s", "msgs/link", "stz/link", "server st/s", "wall ms",
+        "failed"))
+    for nodes in sizes:
+        for known_peers in (False, True):
+            for batching in (False, True):
+                run(nodes, latency, join, batching, xmppclient, known_peers, roster_delay if known_peers else 0.0)
+        run(nodes, latency, join, False, xc, True, roster_delay)
+
+
+if __name__ == "__main__":
+    main()
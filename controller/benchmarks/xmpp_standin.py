@@ -0,0 +1,294 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+# In-process stand-in for an XMPP server, used to measure the signaling of the XMPP modules offline.
+# The server keeps a roster per account and routes presences and messages between the connected clients on a
+# simulated clock, every delivered stanza takes the configured latency and the presences pushed to the roster can be
+# held back for a roster delay on top of it. StandInClient implements the subset of
+# sleekxmpp.ClientXMPP used by XmppClient, the JID class of the module under test is passed in so stanzas carry the
+# same JID objects a live server would produce. When sleekxmpp is not installed install_sleekxmpp() registers
+# stand-ins for the names XmppClient imports from it, so the benchmarks also run without it.
+
+import sys
+import types
+import heapq
+import itertools
+from collections import defaultdict
+
+
+class StandInJID(object):
+    # user@domain/resource, compares equal to its full JID string like sleekxmpp JIDs
+    def __init__(self, jid=None):
+        self.full = str(jid or "")
+        self.bare, _, self.resource = self.full.partition("/")
+        self.user, _, self.domain = self.bare.rpartition("@")
+
+    def __str__(self):
+        return self.full
+
+    def __repr__(self):
+        return self.full
+
+    def __eq__(self, other):
+        return self.full == str(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.full)
+
+
+class StandInElementBase(object):
+    # Base of the IpopMsg stanza plugin, stand-in stanzas carry the plugin fields in a plain dict
+    pass
+
+
+class StandInCallback(object):
+    def __init__(self, name, matcher, pointer, **kwargs):
+        self.name = name
+        self.pointer = pointer
+
+    def run(self, payload, instream=False):
+        self.pointer(payload)
+
+
+# Register stand-in sleekxmpp modules unless sleekxmpp is installed, returns True if the stand-ins are used.
+# Must be called before the XMPP modules are imported.
+def install_sleekxmpp():
+    try:
+        import sleekxmpp
+        return False
+    except ImportError:
+        pass
+    modules = {}
+    for name in ["sleekxmpp", "sleekxmpp.xmlstream", "sleekxmpp.xmlstream.stanzabase", "sleekxmpp.xmlstream.handler",
+                 "sleekxmpp.xmlstream.handler.callback", "sleekxmpp.xmlstream.matcher", "sleekxmpp.stanza",
+                 "sleekxmpp.stanza.message", "sleekxmpp.stanza.presence"]:
+        modules[name] = sys.modules[name] = types.ModuleType(name)
+    modules["sleekxmpp.xmlstream.stanzabase"].ElementBase = StandInElementBase
+    modules["sleekxmpp.xmlstream.stanzabase"].JID = StandInJID
+    modules["sleekxmpp.xmlstream"].register_stanza_plugin = lambda stanza, plugin, **kwargs: None
+    modules["sleekxmpp.xmlstream.handler.callback"].Callback = StandInCallback
+    modules["sleekxmpp.xmlstream.matcher"].StanzaPath = lambda criteria: criteria
+    modules["sleekxmpp.stanza.message"].Message = type("Message", (object,), {})
+    modules["sleekxmpp.stanza.presence"].Presence = type("Presence", (object,), {})
+    # ClientXMPP is replaced with StandInClient by the benchmark
+    modules["sleekxmpp"].ClientXMPP = None
+    return True
+
+
+class IpopElement(dict):
+    # Missing stanza fields read as empty strings like sleekxmpp stanza interfaces
+    def __missing__(self, key):
+        return ""
+
+
+class StandInStanza(IpopElement):
+    def __init__(self, client, kind, **fields):
+        IpopElement.__init__(self, fields)
+        self.client = client
+        self.kind = kind  # <presence>/<message>
+        self["Ipop"] = IpopElement()
+
+    # Copy addressed to one recipient, the server stamps the 'to' JID of every delivery
+    def copy_to(self, jid):
+        stanza = StandInStanza(self.client, self.kind, **self)
+        stanza["Ipop"] = IpopElement(self["Ipop"])
+        stanza["to"] = jid
+        return stanza
+
+    def send(self):
+        self.client.send(self)
+
+
+class StandInClient(object):
+    def __init__(self, server, jid, password=None, sasl_mech=None):
+        self.server = server
+        self.username = jid
+        self.boundjid = server.jid_class(jid or "")
+        self.handlers = []
+        self.event_handlers = defaultdict(list)
+        self.connected = False
+
+    def add_event_handler(self, name, pointer):
+        self.event_handlers[name].append(pointer)
+
+    def event(self, name, data=None):
+        for pointer in list(self.event_handlers[name]):
+            pointer(data)
+
+    def register_plugin(self, plugin, pconfig=None):
+        pass
+
+    def registerHandler(self, handler):
+        self.handlers.append(handler)
+
+    def get_roster(self):
+        self.server.count("roster")
+
+    def connect(self, address=None, **kwargs):
+        return self.server.connect(self)
+
+    def process(self, **kwargs):
+        # Stanzas are delivered by the server clock, there is no stream to read
+        pass
+
+    def disconnect(self, **kwargs):
+        self.server.disconnect(self)
+
+    def make_presence(self, pshow=None, pstatus=None, ppriority=None, pto=None, ptype=None, pfrom=None):
+        presence = StandInStanza(self, "presence", type=ptype or "available", status=pstatus or "")
+        if pto is not None:
+            presence["to"] = self.server.jid_class(pto)
+        return presence
+
+    def send_presence(self, pshow=None, pstatus=None, ppriority=None, pto=None, ptype=None, pfrom=None):
+        self.make_presence(pshow, pstatus, ppriority, pto, ptype, pfrom).send()
+
+    def Message(self):
+        return StandInStanza(self, "message", type="normal")
+
+    def send(self, stanza):
+        stanza["from"] = self.boundjid
+        self.server.route(stanza)
+
+    # Called by the server clock with a stanza addressed to this client
+    def deliver(self, stanza):
+        if stanza.kind == "presence":
+            self.event("presence_unavailable" if stanza["type"] == "unavailable" else "presence_available", stanza)
+        else:
+            for handler in self.handlers:
+                handler.run(stanza)
+
+
+class StandInServer(object):
+    '''
+    Routes the stanzas of StandInClients. A broadcast presence is delivered to the online resources of the
+    contacts on the sender's roster, and a new session is sent the last presence of each online contact like the
+    replies to the presence probes of a live server. Directed presences and messages go to the full JID, or to the
+    first online resource of a bare JID. Broadcast presences and probe replies take roster_delay seconds on top of
+    the latency, like a loaded server that is late pushing presences. Events are processed in timestamp order by
+    step(), callers may schedule their own events on the same clock.
+    '''
+    def __init__(self, jid_class, latency=0.02, domain="standin.local", roster_delay=0.0):
+        self.jid_class = jid_class
+        self.latency = latency
+        self.roster_delay = roster_delay
+        self.domain = domain
+        self.now = 0.0
+        self.events = []
+        self.seq = itertools.count()
+        self.resource_ids = itertools.count(1)
+        self.rosters = {}                  # bare JID -> bare JIDs on its roster, None for every account
+        self.sessions = {}                 # full JID -> client
+        self.resources = defaultdict(list)  # bare JID -> full JIDs of its online sessions
+        self.last_presence = {}            # full JID -> last broadcast presence of the session
+        self.received = defaultdict(int)   # stanzas sent by the clients by kind
+        self.delivered = defaultdict(int)  # stanzas delivered to the clients by kind
+
+    # roster lists the bare JIDs subscribed to the account, None subscribes it to every account
+    def add_account(self, bare_jid, roster=None):
+        self.rosters[bare_jid] = None if roster is None else set(roster)
+
+    def contacts(self, bare_jid):
+        roster = self.rosters.get(bare_jid)
+        if roster is None:
+            return [bare for bare in self.rosters if bare != bare_jid]
+        return roster
+
+    def count(self, kind):
+        self.received[kind] += 1
+
+    def schedule(self, delay, pointer, *args):
+        heapq.heappush(self.events, (self.now + delay, next(self.seq), pointer, args))
+
+    # Run the next event, returns False once no event is left
+    def step(self):
+        if not self.events:
+            return False
+        self.now, _, pointer, args = heapq.heappop(self.events)
+        pointer(*args)
+        return True
+
+    def connect(self, client):
+        bare = client.boundjid.bare
+        if bare not in self.rosters:
+            return False
+        full = "{0}/standin{1}".format(bare, next(self.resource_ids))
+        client.boundjid = self.jid_class(full)
+        client.connected = True
+        self.sessions[full] = client
+        self.resources[bare].append(full)
+        self.schedule(self.latency, client.event, "session_start", None)
+        return True
+
+    def disconnect(self, client):
+        full = client.boundjid.full
+        if self.sessions.pop(full, None) is None:
+            return
+        client.connected = False
+        self.resources[client.boundjid.bare].remove(full)
+        if self.last_presence.pop(full, None) is not None:
+            unavailable = StandInStanza(client, "presence", type="unavailable")
+            unavailable["from"] = client.boundjid
+            self.broadcast(client.boundjid.bare, unavailable)
+
+    def route(self, stanza):
+        self.received[stanza.kind] += 1
+        sender = stanza["from"]
+        if stanza["to"]:
+            self.deliver_to(stanza["to"], stanza)
+        elif stanza.kind == "presence":
+            first = sender.full not in self.last_presence
+            self.last_presence[sender.full] = stanza
+            self.broadcast(sender.bare, stanza)
+            # The first presence of a session is answered with the presences of the contacts already online
+            if first:
+                for bare in self.contacts(sender.bare):
+                    for full in self.resources.get(bare, ()):
+                        if full in self.last_presence:
+                            self.deliver(sender.full, self.last_presence[full], self.roster_delay)
+
+    def broadcast(self, bare_jid, stanza):
+        for bare in self.contacts(bare_jid):
+            for full in self.resources.get(bare, ()):
+                self.deliver(full, stanza, self.roster_delay)
+
+    def deliver_to(self, jid, stanza):
+        jid = self.jid_class(jid)
+        if jid.full in self.sessions:
+            self.deliver(jid.full, stanza)
+        elif self.resources.get(jid.bare):
+            self.deliver(self.resources[jid.bare][0], stanza)
+        else:
+            self.received["undeliverable"] += 1
+
+    def deliver(self, full, stanza, delay=0.0):
+        self.delivered[stanza.kind] += 1
+        client = self.sessions[full]
+        self.schedule(self.latency + delay, self.receive, client, stanza.copy_to(client.boundjid))
+
+    def receive(self, client, stanza):
+        # The session may have ended while the stanza was in flight
+        if client.connected:
+            client.deliver(stanza)
@@ -0,0 +1,108 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from controller.framework.PacketRouteTable import PacketRouteTable
+
+
+class AddressTable(object):
+    '''
+    MAC and IP addresses of the nodes reachable through each UID of a virtual network, the local node and the
+    unmanaged hosts behind every peer. Addresses are indexed both ways, address -> UID for routing and
+    UID -> addresses so the addresses of a peer are removed in O(k) when its link goes away. An address learned
+    for another UID moves to it. Frames are resolved through the binary keyed PacketRouteTable kept in step.
+    '''
+    def __init__(self, cache_size=256):
+        self.mac_uid = {}   # MAC -> UID
+        self.ip_uid = {}    # IP -> UID
+        self.uid_macs = {}  # UID -> MACs in the order they were learned
+        self.uid_ips = {}   # UID -> set of IPs
+        self.routes = PacketRouteTable(cache_size)
+
+    def __len__(self):
+        return len(self.uid_macs)
+
+    def __contains__(self, uid):
+        return uid in self.uid_macs
+
+    def __repr__(self):
+        return "AddressTable(uids={0}, macs={1}, ips={2})".format(len(self.uid_macs), len(self.mac_uid),
+                                                                  len(self.ip_uid))
+
+    # Add the MAC of a node, used for the local node which has no IP entry
+    def add_mac(self, uid, mac):
+        self.uid_macs.setdefault(uid, [])
+        self.__set_mac(mac, uid)
+
+    # Add the hosts reported for a UID from a {MAC: IP} table. An IP is only recorded along with a newly learned MAC.
+    def update(self, uid, mac_ip_table):
+        self.uid_macs.setdefault(uid, [])
+        for mac, ip in mac_ip_table.items():
+            if self.mac_uid.get(mac) != uid:
+                self.__set_mac(mac, uid)
+                self.__set_ip(ip, uid)
+
+    # Remove the UID and all the addresses reached through it
+    def remove_uid(self, uid):
+        macs = self.uid_macs.pop(uid, [])
+        ips = self.uid_ips.pop(uid, ())
+        for mac in macs:
+            del self.mac_uid[mac]
+        for ip in ips:
+            del self.ip_uid[ip]
+        if macs or ips:
+            self.routes.discard(ips, macs)
+
+    def __set_mac(self, mac, uid):
+        old_uid = self.mac_uid.get(mac)
+        if old_uid == uid:
+            return
+        if old_uid is not None:
+            self.uid_macs[old_uid].remove(mac)
+        self.mac_uid[mac] = uid
+        self.uid_macs.setdefault(uid, []).append(mac)
+        self.routes.set_mac(mac, uid)
+
+    def __set_ip(self, ip, uid):
+        old_uid = self.ip_uid.get(ip)
+        if old_uid == uid:
+            return
+        if old_uid is not None:
+            self.uid_ips[old_uid].discard(ip)
+        self.ip_uid[ip] = uid
+        self.uid_ips.setdefault(uid, set()).add(ip)
+        self.routes.set_ip(ip, uid)
+
+    def get_uid_by_mac(self, mac):
+        return self.mac_uid.get(mac)
+
+    def get_uid_by_ip(self, ip):
+        return self.ip_uid.get(ip)
+
+    def get_ips(self, uid):
+        return list(self.uid_ips.get(uid, ()))
+
+    # UID -> MAC list mapping reported to the visualizer
+    def get_mac_mapping(self):
+        return dict((uid, list(macs)) for uid, macs in self.uid_macs.items())
+
+    # Returns the UID a frame is routed to, None if its destination is unknown
+    def lookup(self, frame):
+        return self.routes.lookup(frame)
@@ -0,0 +1,135 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import sys
+import logging
+import threading
+from controller.framework.CBTQueue import allow_blocking
+
+py_ver = sys.version_info[0]
+if py_ver == 3:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+# Max CBTs a module processes before yielding the event loop to the other modules
+DRAIN_BATCH = 64
+
+
+class DatagramHandler(asyncio.DatagramProtocol if py_ver == 3 else object):
+    def __init__(self, callback):
+        self.callback = callback
+
+    def datagram_received(self, data, addr):
+        self.callback(data)
+
+    def error_received(self, exc):
+        logging.warning("Datagram endpoint error: {0}".format(exc))
+
+
+class AsyncRuntime(object):
+    '''
+    Alternate CFx runtime hosting every controller module on one asyncio event loop thread instead of a worker and
+    a timer thread per module. CBT processing and timer_method calls of a module are serialized on the loop; modules
+    configured with AsyncOffload run them on a shared thread pool so they may block without stalling the loop.
+    Callbacks are used instead of coroutines so the framework stays importable on Python 2.
+    '''
+    def __init__(self, pool_size=4):
+        if py_ver != 3:
+            raise RuntimeError("The asyncio runtime requires Python 3")
+        self.loop = asyncio.new_event_loop()
+        # pool threads run module code and may wait for queue space, the loop thread never does
+        self.pool = ThreadPoolExecutor(max_workers=pool_size, initializer=allow_blocking)
+        self.thread = None
+        self.running = 0
+        self.done = threading.Event()
+
+    def start(self, handles):
+        for handle in handles:
+            self.running += 1
+            self.loop.call_soon(self.__drain, handle)
+            if handle.timer_enabled:
+                self.loop.call_later(handle.interval, self.__tick, handle)
+        self.thread = threading.Thread(target=self.__run, name="CFxEventLoop")
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def __run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.done.set()
+
+    def join(self, timeout=None):
+        self.done.wait(timeout)
+        self.pool.shutdown(wait=False)
+
+    # Schedule a coroutine, e.g. loop.create_datagram_endpoint, from any thread
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    # Read datagrams from a bound non-blocking socket on the event loop, callback receives the payload bytes
+    def open_datagram_endpoint(self, sock, callback):
+        return self.submit(self.loop.create_datagram_endpoint(lambda: DatagramHandler(callback), sock=sock))
+
+    def __wakeup(self, handle):
+        # Called by the thread submitting a CBT to the idle module. The module is always drained on the loop, a
+        # submit from another thread (Tincan listener, XMPP, pool) has to wake the loop up.
+        if threading.current_thread() is self.thread:
+            self.loop.call_soon(self.__drain, handle)
+        else:
+            self.loop.call_soon_threadsafe(self.__drain, handle)
+
+    # Runs on the loop thread only
+    def __drain(self, handle):
+        cbts = handle.CMQueue.get_batch_nowait(DRAIN_BATCH, lambda: self.__wakeup(handle))
+        if not cbts:
+            return
+        if handle.CMConfig.get("AsyncOffload", False):
+            # Process in the pool, the next CBTs are taken once these complete to keep CBTs in order
+            future = self.loop.run_in_executor(self.pool, handle.dispatchCBTs, cbts)
+            future.add_done_callback(lambda f: self.__processed(handle, f.result()))
+        elif handle.dispatchCBTs(cbts):
+            # yield to the other modules before draining the rest of the queue
+            self.loop.call_soon(self.__drain, handle)
+        else:
+            self.__terminated()
+
+    def __processed(self, handle, running):
+        if running:
+            self.loop.call_soon_threadsafe(self.__drain, handle)
+        else:
+            self.__terminated()
+
+    def __terminated(self):
+        self.running -= 1
+        if self.running == 0:
+            self.loop.stop()
+
+    def __tick(self, handle):
+        if handle.terminateFlag:
+            return
+        if handle.CMConfig.get("AsyncOffload", False):
+            future = self.loop.run_in_executor(self.pool, handle.runTimer)
+            future.add_done_callback(lambda f: self.loop.call_later(handle.interval, self.__tick, handle))
+        else:
+            handle.runTimer()
+            self.loop.call_later(handle.interval, self.__tick, handle)
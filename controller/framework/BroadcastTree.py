@@ -0,0 +1,118 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+
+class BroadcastTree(object):
+    '''
+    Forwarding fan-out of the broadcasts of a virtual network. A broadcast is relayed along the UID ring, the peers a
+    node relays it to only depend on the initiator, the peer list carried by the message and the online peers of
+    the node, so the targets are computed once with binary searches over the sorted peers and kept in a small LRU
+    keyed by (initiator, peer list). Any change to the online peers clears the LRU.
+    '''
+    def __init__(self, uid="", cache_size=1024):
+        self.uid = uid
+        self.peers = []     # sorted UIDs of the online peers
+        self.macs = {}      # UID -> MAC of the online peers
+        self.origin = None  # [(peer, peer_list)] for the broadcasts initiated by this node
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # Replace the online peers, returns True when they changed
+    def update(self, uid, peers, macs=None):
+        peers = sorted(peers)
+        macs = dict((peer, macs[peer]) for peer in peers if peer in macs) if macs else {}
+        if uid == self.uid and peers == self.peers and macs == self.macs:
+            return False
+        self.uid = uid
+        self.peers = peers
+        self.macs = macs
+        self.origin = None
+        self.cache.clear()
+        self.invalidations += 1
+        return True
+
+    def mac(self, peer):
+        return self.macs.get(peer)
+
+    # [(peer, peer_list)] a broadcast initiated by this node is sent to, each peer relays it up to its successor
+    def origin_targets(self):
+        if self.origin is None:
+            plist = self.peers
+            if not plist:
+                self.origin = []
+            elif self.uid > plist[-1]:
+                # The initiator is the last node in the network
+                self.origin = [(plist[0], [plist[0], self.uid])]
+            else:
+                self.origin = [(peer, [peer, plist[(ind + 1) % len(plist)]]) for ind, peer in enumerate(plist)]
+        return self.origin
+
+    # Peers a broadcast of init_uid received with peer_list is relayed to
+    def targets(self, init_uid, peer_list):
+        key = (init_uid, tuple(peer_list))
+        cache = self.cache
+        targets = cache.pop(key, None)
+        if targets is not None:
+            cache[key] = targets
+            self.hits += 1
+            return targets
+        self.misses += 1
+        targets = self.__compute(init_uid, peer_list)
+        cache[key] = targets
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return targets
+
+    def __compute(self, init_uid, peer_list):
+        uid, plist = self.uid, self.peers
+        high, low = max(peer_list), min(peer_list)
+        # Case when next node is larger than initiator and current node UID
+        if uid >= high and uid > init_uid:
+            candidates = plist[bisect_right(plist, uid):]
+            excluded = (init_uid,)
+        # Case when next node is smaller than initiator and current node UID
+        elif uid <= low and uid < init_uid:
+            if init_uid >= high:
+                candidates = plist[bisect_right(plist, uid):]
+            else:
+                candidates = plist[:bisect_left(plist, uid)]
+            excluded = set(peer_list)
+            excluded.add(init_uid)
+        else:
+            candidates = plist[bisect_right(plist, uid):bisect_left(plist, high)]
+            excluded = set(peer_list)
+            excluded.add(init_uid)
+        return [peer for peer in candidates if peer not in excluded]
+
+    def get_stats(self):
+        return {
+            "peers": len(self.peers),
+            "cached": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations
+        }
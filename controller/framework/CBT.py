@@ -19,25 +19,53 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-import uuid
+import itertools
+
+# Process local source of CBT tags, next() on a count is atomic so CBTs can be created from any thread
+_tags = itertools.count(1)
+
 
 class CBT(object):
-    class Request(object):
-        def __init__(self, initiator='', recipient='', action='', data=''):
+    '''
+    Control Block Transaction passed between the controller modules. Tags are process local integers,
+    the Request and Response views are only created when they are accessed.
+    '''
+    __slots__ = ("Tag", "Parent", "ChildCount", "Completed", "OpType", "initiator", "recipient", "action", "data",
+                 "Priority", "_response", "__weakref__")
+
+    class RequestView(object):
+        __slots__ = ("_cbt",)
+
+        def __init__(self, cbt):
+            self._cbt = cbt
+
+        @property
+        def Initiator(self):
+            return self._cbt.initiator
+
+        @property
+        def Recipient(self):
+            return self._cbt.recipient
+
+        @property
+        def Action(self):
+            return self._cbt.action
+
+        @property
+        def Data(self):
+            return self._cbt.data
+
+    class ResponseData(object):
+        __slots__ = ("Status", "Initiator", "Recipient", "Data")
+
+        def __init__(self, initiator=None, recipient=None, data=None, status=False):
+            self.Status = status
             self.Initiator = initiator
             self.Recipient = recipient
-            self.Action = action
             self.Data = data
-    class Response(object):
-        def __init__(self,):
-            self.Status = False
-            self.Initiator = None
-            self.Recipient = None
-            self.Data = None
 
     def __init__(self, initiator='', recipient='', action='', data=''):
-        self.Tag = uuid.uuid4()  # Unique identifier for CBTs
-        #self.vnet = vnet
+        self.Tag = next(_tags)  # Unique identifier for CBTs within this controller
         self.Parent = None
         self.ChildCount = 0
         self.Completed = False
@@ -46,15 +74,24 @@ class CBT(object):
         self.recipient = recipient
         self.action = action
         self.data = data
-        self.Request = self.Request(initiator, recipient, action, data)
+        self.Priority = None  # Priority class, None lets the recipient queue classify the CBT by action
+        self._response = None
 
-    def Response(self, initiator='', recipient='', data='', status = False):
-        self.optype = "Response"
+    @property
+    def Request(self):
+        return CBT.RequestView(self)
+
+    @property
+    def Response(self):
+        return self._response
+
+    def SetResponse(self, initiator='', recipient='', data='', status=False):
+        self.OpType = "Response"
         self.initiator = initiator
         self.recipient = recipient
         self.Completed = True
-        self.Response = self.Response()
-        self.Response.Status = status
-        self.Response.Initiator = initiator
-        self.Response.Recipient = recipient
-        self.Response.Data = data
+        self._response = CBT.ResponseData(initiator, recipient, data, status)
+
+    def __repr__(self):
+        return "CBT(Tag={0}, initiator={1}, recipient={2}, action={3})".format(
+            self.Tag, self.initiator, self.recipient, self.action)
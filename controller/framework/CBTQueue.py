@@ -0,0 +1,294 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import time
+import threading
+from collections import deque
+
+# CBT priority classes, lower values are served first with strict scheduling
+PRIORITY_DATA = 0
+PRIORITY_CONTROL = 1
+PRIORITY_HOUSEKEEPING = 2
+
+PRIORITY_NAMES = {
+    "data": PRIORITY_DATA,
+    "control": PRIORITY_CONTROL,
+    "housekeeping": PRIORITY_HOUSEKEEPING
+}
+
+
+# Policies applied when a CBT is submitted to a full queue
+POLICY_BLOCK = "block"                    # wait up to the block timeout for space, then drop the new CBT
+POLICY_DROP_OLDEST = "drop-oldest"        # drop the oldest CBT of the lowest priority class queued
+POLICY_DROP_NEWEST = "drop-newest"        # drop the CBT being submitted
+POLICY_DROP_BY_ACTION = "drop-by-action"  # shed CBTs with a droppable action first, then as drop-oldest
+
+# Threads allowed to wait for space in a full queue
+_producer = threading.local()
+
+
+# Mark the calling thread as a module thread, it may wait for space in a full queue with the block policy.
+# Other threads (Tincan listener, XMPP, ...) never wait, a full queue sheds CBTs by action for them instead.
+def allow_blocking():
+    _producer.blocking = True
+
+
+class CBTQueue(object):
+    '''
+    CBT queue of a controller module with one FIFO per priority class (data-plane, control-plane and
+    housekeeping). The worker drains the classes either by strict priority or by weighted round robin, so packet
+    forwarding is not delayed behind bursts of control or logging traffic. CBTs without an explicit priority are
+    classified by their action. A queue with a capacity applies its overflow policy once it is full and counts the
+    CBTs it drops. The CBTs with a droppable action are also indexed per class, a dropped CBT is marked and skipped
+    when the worker reaches it so shedding does not scan the queue.
+    '''
+    def __init__(self, scheduling="weighted", weights=None, actions=None):
+        self.queues = [deque(), deque(), deque()]     # (seq, CBT) in arrival order per class
+        self.droppable = [deque(), deque(), deque()]  # (seq, CBT) of the queued CBTs with a droppable action
+        self.counts = [0, 0, 0]                       # CBTs queued per class, excluding the dropped ones
+        self.shed = set()                             # seq of the dropped CBTs still held by self.queues
+        self.seq = 0
+        self.lck = threading.Lock()
+        self.cv = threading.Condition(self.lck)          # signalled when a CBT is queued
+        self.not_full = threading.Condition(self.lck)    # signalled when a CBT is taken off the queue
+        self.size = 0
+        self.strict = False
+        self.weights = [8, 4, 1]
+        self.action_class = {}
+        self.current = PRIORITY_DATA
+        self.credit = self.weights[PRIORITY_DATA]
+        self.capacity = 0  # 0 leaves the queue unbounded
+        self.policy = POLICY_BLOCK
+        self.block_timeout = 1.0
+        self.drop_actions = frozenset()
+        self.consumer = None  # ident of the dedicated worker thread, it never blocks on its own queue
+        self.loop_consumer = None  # ident of the event loop thread draining the queue along with other queues
+        self.owner = None     # name of the module owning the queue, its CBTs to itself skip the capacity check
+        self.waiter = None    # wakeup callback registered by get_nowait
+        self.dropped = 0
+        self.dropped_by_action = {}
+        self.blocked = 0
+        self.configure(scheduling, weights, actions)
+
+    # scheduling is <strict>/<weighted>, weights and actions are dicts keyed by priority class name
+    def configure(self, scheduling="weighted", weights=None, actions=None):
+        with self.cv:
+            self.strict = scheduling == "strict"
+            for name, weight in (weights or {}).items():
+                self.weights[PRIORITY_NAMES[name]] = max(1, int(weight))
+            for name, action_list in (actions or {}).items():
+                for action in action_list:
+                    self.action_class[action] = PRIORITY_NAMES[name]
+            self.credit = self.weights[self.current]
+
+    def set_capacity(self, capacity=0, policy=POLICY_BLOCK, block_timeout=1.0, drop_actions=None):
+        if policy not in (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_DROP_BY_ACTION):
+            raise ValueError("Unknown CBT queue policy: {0}".format(policy))
+        with self.lck:
+            self.capacity = max(0, int(capacity or 0))
+            self.policy = policy
+            self.block_timeout = block_timeout
+            self.drop_actions = frozenset(drop_actions or [])
+            self.not_full.notify_all()
+
+    def classify(self, cbt):
+        if cbt.Priority is not None:
+            return cbt.Priority
+        return self.action_class.get(cbt.action, PRIORITY_CONTROL)
+
+    # Queue a CBT, returns False when the CBT was dropped. force bypasses the capacity (used for TERMINATE).
+    def put(self, cbt, force=False):
+        return self.put_many([cbt], force) == 1
+
+    # Queue several CBTs with one lock acquisition, returns the number of CBTs queued
+    def put_many(self, cbts, force=False):
+        queued = 0
+        with self.lck:
+            for cbt in cbts:
+                if not force and self.capacity and self.size >= self.capacity and not self.__make_room(cbt):
+                    self.__count_drop(cbt)
+                    continue
+                self.__append(cbt)
+                queued += 1
+            if queued:
+                self.cv.notify()
+                waiter, self.waiter = self.waiter, None
+            else:
+                waiter = None
+        if waiter is not None:
+            waiter()
+        return queued
+
+    def __append(self, cbt):
+        priority = self.classify(cbt)
+        self.seq += 1
+        entry = (self.seq, cbt)
+        self.queues[priority].append(entry)
+        if cbt.action in self.drop_actions:
+            self.droppable[priority].append(entry)
+        self.counts[priority] += 1
+        self.size += 1
+
+    # Take the oldest CBT of a class that has one, skipping the dropped ones
+    def __pop(self, priority):
+        queue, droppable = self.queues[priority], self.droppable[priority]
+        while True:
+            seq, cbt = queue.popleft()
+            if self.shed and seq in self.shed:
+                self.shed.discard(seq)
+                continue
+            if droppable and droppable[0][0] == seq:
+                droppable.popleft()
+            self.counts[priority] -= 1
+            self.size -= 1
+            return cbt
+
+    # Drop the oldest CBT with a droppable action of a class, returns False if the class has none
+    def __shed_droppable(self, priority):
+        droppable = self.droppable[priority]
+        if not droppable:
+            return False
+        seq, cbt = droppable.popleft()
+        self.shed.add(seq)
+        self.counts[priority] -= 1
+        self.size -= 1
+        self.__count_drop(cbt)
+        # Drop the marked entries once they outnumber the queued CBTs, keeps the queues bounded while the worker
+        # is stalled
+        if len(self.shed) > max(64, self.size):
+            shed, self.shed = self.shed, set()
+            for index, queue in enumerate(self.queues):
+                self.queues[index] = deque(entry for entry in queue if entry[0] not in shed)
+        return True
+
+    # Apply the overflow policy, called with the lock held. Returns True if the CBT can be queued.
+    def __make_room(self, cbt):
+        policy = self.policy
+        if policy == POLICY_BLOCK:
+            if self.__self_submitted(cbt):
+                return True
+            if getattr(_producer, "blocking", False):
+                self.blocked += 1
+                deadline = time.time() + self.block_timeout
+                while self.size >= self.capacity:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                    self.not_full.wait(remaining)
+                return True
+            # I/O threads must not stall on a slow module
+            policy = POLICY_DROP_BY_ACTION
+        if policy == POLICY_DROP_NEWEST:
+            return False
+        if policy == POLICY_DROP_BY_ACTION:
+            if cbt.action in self.drop_actions:
+                return False
+            for priority in reversed(range(len(self.queues))):
+                if self.__shed_droppable(priority):
+                    return True
+        # drop-oldest, also the fallback when no droppable action is queued
+        for priority in reversed(range(len(self.queues))):
+            if self.counts[priority]:
+                self.__count_drop(self.__pop(priority))
+                return True
+        return True
+
+    # A worker submitting to its own queue would wait for itself. The event loop thread drains every module, only
+    # the CBTs the owning module sends to itself are exempted there, its CBTs to other modules are bounded.
+    def __self_submitted(self, cbt):
+        ident = threading.current_thread().ident
+        if ident == self.consumer:
+            return True
+        return ident == self.loop_consumer and self.owner is not None and cbt.initiator == self.owner
+
+    def __count_drop(self, cbt):
+        self.dropped += 1
+        self.dropped_by_action[cbt.action] = self.dropped_by_action.get(cbt.action, 0) + 1
+
+    def get(self):
+        return self.get_batch(1)[0]
+
+    # Block until CBTs are queued and take up to max_count of them in scheduling order
+    def get_batch(self, max_count):
+        with self.cv:
+            self.consumer = threading.current_thread().ident
+            while self.size == 0:
+                self.cv.wait()
+            return self.__take(max_count)
+
+    # Non blocking get for event loop consumers, returns up to max_count CBTs. When the queue is empty waiter is
+    # stored and called once on the next put, from the submitting thread.
+    def get_batch_nowait(self, max_count, waiter=None):
+        with self.lck:
+            self.loop_consumer = threading.current_thread().ident
+            if self.size == 0:
+                self.waiter = waiter
+                return []
+            return self.__take(max_count)
+
+    def __take(self, max_count):
+        cbts = []
+        while self.size and len(cbts) < max_count:
+            cbts.append(self.__pop(self.__next_class()))
+        self.not_full.notify(len(cbts))
+        return cbts
+
+    def __next_class(self):
+        counts = self.counts
+        if self.strict:
+            for priority in range(len(counts)):
+                if counts[priority]:
+                    return priority
+        # Weighted round robin, a class is served up to its weight before moving on to the next one
+        while True:
+            if counts[self.current] and self.credit > 0:
+                self.credit -= 1
+                return self.current
+            self.current = (self.current + 1) % len(counts)
+            self.credit = self.weights[self.current]
+
+    def empty(self):
+        return self.size == 0
+
+    def qsize(self):
+        return self.size
+
+    def qsize_by_class(self):
+        return dict((name, self.counts[priority]) for name, priority in PRIORITY_NAMES.items())
+
+    def clear(self):
+        with self.cv:
+            for queue in self.queues + self.droppable:
+                queue.clear()
+            self.counts = [0, 0, 0]
+            self.shed.clear()
+            self.size = 0
+            self.not_full.notify_all()
+
+    def get_drop_stats(self):
+        with self.lck:
+            return {
+                "capacity": self.capacity,
+                "policy": self.policy,
+                "dropped": self.dropped,
+                "dropped_by_action": dict(self.dropped_by_action),
+                "blocked": self.blocked
+            }
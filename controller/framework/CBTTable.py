@@ -0,0 +1,85 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class CBTTable(object):
+    '''
+    Bounded table of CBTs keyed by tag. Entries are kept in insertion order, the oldest entry is evicted once the
+    capacity is reached and entries older than ttl seconds are reclaimed as new CBTs are added.
+    '''
+    def __init__(self, capacity=4096, ttl=300):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.entries = OrderedDict()  # tag -> (insertion time, cbt)
+        self.lck = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def __setitem__(self, tag, cbt):
+        now = time.time()
+        with self.lck:
+            self.entries.pop(tag, None)
+            self.entries[tag] = (now, cbt)
+            self.__reclaim(now)
+
+    def __getitem__(self, tag):
+        return self.entries[tag][1]
+
+    def __contains__(self, tag):
+        return tag in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, tag, default=None):
+        entry = self.entries.get(tag)
+        return default if entry is None else entry[1]
+
+    def pop(self, tag, default=None):
+        with self.lck:
+            entry = self.entries.pop(tag, None)
+        return default if entry is None else entry[1]
+
+    def values(self):
+        with self.lck:
+            return [entry[1] for entry in self.entries.values()]
+
+    def expire(self):
+        with self.lck:
+            self.__reclaim(time.time())
+
+    def __reclaim(self, now):
+        entries = self.entries
+        while len(entries) > self.capacity:
+            entries.popitem(last=False)
+            self.evicted += 1
+        if self.ttl:
+            deadline = now - self.ttl
+            while entries:
+                tag = next(iter(entries))
+                if entries[tag][0] > deadline:
+                    break
+                del entries[tag]
+                self.expired += 1
@@ -29,10 +29,12 @@ import importlib
 import uuid
 import controller.framework.fxlib as fxlib
 import controller.framework.ipoplib as ipoplib
+import controller.framework.jsoncodec as jsoncodec
 from collections import OrderedDict
 from controller.framework.CBT import CBT as CBT
 from controller.framework.CFxHandle import CFxHandle
 from controller.framework.CFxSubscription import CFxSubscription
+from controller.framework.ProcessHost import ProcessModule
 
 
 class CFX(object):
@@ -50,10 +52,20 @@ class CFX(object):
         self.event = None
         self.Subscriptions = {}
         self.NodeId = uuid.uuid4()
+        self.runtime = None  # AsyncRuntime when modules run on an asyncio event loop
 
     def submitCBT(self, cbt):
         recipient = cbt.recipient
-        self.CFxHandleDict[recipient].CMQueue.put(cbt)
+        # the recipient queue applies its capacity policy, TERMINATE is always queued
+        self.CFxHandleDict[recipient].CMQueue.put(cbt, force=cbt.action == 'TERMINATE')
+
+    def submitCBTs(self, cbts):
+        # group the CBTs by recipient so each recipient queue is locked once, order per recipient is kept
+        by_recipient = OrderedDict()
+        for cbt in cbts:
+            by_recipient.setdefault(cbt.recipient, []).append(cbt)
+        for recipient, recipient_cbts in by_recipient.items():
+            self.CFxHandleDict[recipient].CMQueue.put_many(recipient_cbts)
 
     #def createCBT(self, initiator='', recipient='', action='', data=''):
     #    # create and return an empty CBT
@@ -78,12 +90,26 @@ class CFX(object):
             print("Circular dependency detected in config.json. Exiting")
             sys.exit()
 
+        # select the JSON codec used for Tincan and XMPP payloads before any module is loaded
+        jsoncodec.select_backend(self.CONFIG['CFx'].get('JsonCodec', 'auto'))
+
+        # modules loaded below run on the event loop of the asyncio runtime instead of their own threads
+        if self.CONFIG['CFx'].get('Runtime', 'threaded') == 'asyncio':
+            if sys.version_info[0] == 3:
+                from controller.framework.AsyncRuntime import AsyncRuntime
+                self.runtime = AsyncRuntime(self.CONFIG['CFx'].get('AsyncPoolSize', 4))
+            else:
+                print("The asyncio runtime requires Python 3, using the threaded runtime")
+
         # iterate and load the modules specified in the configuration file
         for key in self.CONFIG:
             if key not in self.loaded_modules:
                 self.load_module(key)
 
         # start all the worker and timer threads
+        if self.runtime is not None:
+            self.runtime.start(list(self.CFxHandleDict.values()))
+            return
         for handle in self.CFxHandleDict:
             self.CFxHandleDict[handle].CMThread.start()
             if self.CFxHandleDict[handle].timer_thread:
@@ -115,7 +141,11 @@ class CFX(object):
 
             # create a CFxHandle object for each module
             handle = CFxHandle(self)
-            instance = module_class(handle, self.CONFIG[module_name], module_name)
+            if self.CONFIG[module_name].get('RunInProcess', False):
+                # host the module in a worker process, the stand-in relays its CBTs and CFx calls
+                instance = ProcessModule(handle, self.CONFIG[module_name], module_name, self, module.__name__)
+            else:
+                instance = module_class(handle, self.CONFIG[module_name], module_name)
 
             handle.CMInstance = instance
             handle.CMConfig = self.CONFIG[module_name]
@@ -235,15 +265,18 @@ class CFX(object):
     def terminate(self):
         for key in self.CFxHandleDict:
             # create a special terminate CBT to terminate all the CMs
-            terminateCBT = self.createCBT('CFx', key, 'TERMINATE', '')
+            terminateCBT = CBT('CFx', key, 'TERMINATE', '')
 
             # clear all the queues and put the terminate CBT in all the queues
-            self.CFxHandleDict[key].CMQueue.queue.clear()
+            self.CFxHandleDict[key].CMQueue.clear()
 
             self.submitCBT(terminateCBT)
 
         # wait for the threads to process their current CBTs and exit
             print("waiting for timer threads to exit gracefully...")
+        if self.runtime is not None:
+            self.runtime.join()
+            sys.exit(0)
         for handle in self.CFxHandleDict:
             if self.CFxHandleDict[handle].joinEnabled:
                 self.CFxHandleDict[handle].CMThread.join()
@@ -267,6 +300,10 @@ class CFX(object):
             print("Exception occurred while querying data." + str(error))
             return None
 
+    # Returns the CBT tracking gauges of every loaded module
+    def queryCBTStats(self):
+        return dict((name, handle.getCBTStats()) for name, handle in self.CFxHandleDict.items())
+
     # Caller is the subscription source
     def PublishSubscription(self, OwnerName, SubscriptionName, Owner):
         sub = CFxSubscription(OwnerName, SubscriptionName)
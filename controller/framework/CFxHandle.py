@@ -23,18 +23,17 @@ import sys
 import logging
 import threading
 import traceback
+import weakref
 from controller.framework.CBT import CBT
+from controller.framework.CBTTable import CBTTable
+from controller.framework.CBTQueue import CBTQueue, allow_blocking
 
 py_ver = sys.version_info[0]
-if py_ver == 3:
-    import queue as Queue
-else:
-    import Queue
 
 
 class CFxHandle(object):
     def __init__(self, CFxObject):
-        self.CMQueue = Queue.Queue()  # CBT queue
+        self.CMQueue = CBTQueue()  # CBT queue, one FIFO per priority class
         self.CMInstance = None
         self.CMThread = None  # CM worker thread
         self.CMConfig = None
@@ -43,17 +42,24 @@ class CFxHandle(object):
         self.timer_thread = None
         self.terminateFlag = False
         self.interval = 1
-        self.PendingCBTs = {}
-        self.OwnedCBTs = {}
+        self.timer_enabled = False
+        self.batch_size = 32  # max CBTs the worker takes off the queue at once
+        self.CBTTracking = "weak"
+        self.PendingCBTs = CBTTable()
+        self.OwnedCBTs = weakref.WeakValueDictionary()
 
-    def __getCBT(self):
-        cbt = self.CMQueue.get()  # blocking call
-        return cbt
+    def __getCBTs(self):
+        cbts = self.CMQueue.get_batch(self.batch_size)  # blocking call
+        return cbts
 
     def submitCBT(self, cbt):
         # submit CBT to the CFx
         self.__CFxObject.submitCBT(cbt)
 
+    def submitCBTs(self, cbts):
+        # submit several CBTs to the CFx at once
+        self.__CFxObject.submitCBTs(cbts)
+
     def createCBT(self, initiator='', recipient='', action='', data=''):
         # create and return a CBT with optional parameters
         cbt = CBT(initiator, recipient, action, data)
@@ -86,30 +92,81 @@ class CFxHandle(object):
         if not cbt.ChildCount == 0:
             raise RuntimeError("Invalid attempt to complete a CBT with outstanding dependencies")
 
+    # Select how owned and pending CBTs are tracked, module settings override the CFx settings.
+    #   weak - owned CBTs are referenced weakly and reclaimed once no module holds them
+    #   ttl  - owned CBTs are kept in a bounded table and reclaimed by age or capacity
+    # Pending CBTs are always kept in a bounded table since nothing else references them.
+    def configureCBTTracking(self, config):
+        tracking = config.get("CBTTracking", "weak")
+        capacity = config.get("CBTTableCapacity", 4096)
+        ttl = config.get("CBTTableTTL", 300)
+        pending = CBTTable(capacity, ttl)
+        for cbt in self.PendingCBTs.values():
+            pending[cbt.Tag] = cbt
+        if tracking == "ttl":
+            owned = CBTTable(capacity, ttl)
+        else:
+            tracking = "weak"
+            owned = weakref.WeakValueDictionary()
+        for cbt in list(self.OwnedCBTs.values()):
+            owned[cbt.Tag] = cbt
+        self.CBTTracking = tracking
+        self.PendingCBTs = pending
+        self.OwnedCBTs = owned
+
+    # Gauges of the CBTs currently tracked by the module
+    def getCBTStats(self):
+        if isinstance(self.OwnedCBTs, CBTTable):
+            self.OwnedCBTs.expire()
+        self.PendingCBTs.expire()
+        return {
+            "tracking": self.CBTTracking,
+            "owned": len(self.OwnedCBTs),
+            "pending": len(self.PendingCBTs),
+            "pending_evicted": self.PendingCBTs.evicted,
+            "pending_expired": self.PendingCBTs.expired,
+            "queued": self.CMQueue.qsize(),
+            "queued_by_class": self.CMQueue.qsize_by_class(),
+            "queue": self.CMQueue.get_drop_stats()
+        }
+
     def initialize(self):
+        # CFx settings apply to every module unless the module configuration overrides them
+        config = dict(self.__CFxObject.CONFIG.get("CFx", {}))
+        config.update(self.CMConfig)
+        self.configureCBTTracking(config)
+        self.CMQueue.owner = self.CMInstance.ModuleName
+        self.CMQueue.configure(config.get("QueueScheduling", "weighted"), config.get("QueueWeights"),
+                               config.get("PriorityActions"))
+        self.CMQueue.set_capacity(config.get("QueueCapacity", 0), config.get("QueuePolicy", "block"),
+                                  config.get("QueueBlockTimeout", 1.0), config.get("DropActions"))
+        self.batch_size = max(1, int(config.get("CBTBatchSize", 32)))
+
         # intialize the CM
         self.CMInstance.initialize()
 
-        # create the worker thread, which is started by CFx
-        self.CMThread = threading.Thread(target=self.__worker)
-        self.CMThread.setDaemon(True)
-
         # check whether CM requires join() or not
         self.joinEnabled = True
 
         # check if the CMConfig has timer_interval specified
-        timer_enabled = False
-
         try:
             self.interval = int(self.CMConfig['TimerInterval'])
-            timer_enabled = True
+            self.timer_enabled = True
         except ValueError:
             logging.warning("Invalid timer configuration for {0}"
                             ". Timer has been disabled for this module".format("CFXHandle"))
         except KeyError:
             pass
 
-        if timer_enabled:
+        # with the asyncio runtime the CBTs and timer are driven by the event loop
+        if self.getRuntime() is not None:
+            return
+
+        # create the worker thread, which is started by CFx
+        self.CMThread = threading.Thread(target=self.__worker)
+        self.CMThread.setDaemon(True)
+
+        if self.timer_enabled:
             # create the timer worker thread, which is started by CFx
             self.timer_thread = threading.Thread(target=self.__timer_worker,
                                                  args=())
@@ -118,68 +175,122 @@ class CFxHandle(object):
     def updateTimerInterval(self, interval):
         self.interval = interval
 
+    # Returns the asyncio runtime hosting the module or None when the module runs on its own threads
+    def getRuntime(self):
+        return getattr(self.__CFxObject, "runtime", None)
+
+    # Pass a CBT to the module, returns False once the module has processed the TERMINATE CBT
+    def dispatchCBT(self, cbt):
+        # break on special termination CBT
+        if cbt.action == 'TERMINATE':
+            self.terminateFlag = True
+            module_name = self.CMInstance.__class__.__name__
+            logging.info("{0} exiting".format(module_name))
+            self.CMInstance.terminate()
+            return False
+        try:
+            self.CMInstance.processCBT(cbt)
+            if not cbt.Completed:
+                self.PendingCBTs[cbt.Tag] = cbt
+        except SystemExit:
+            sys.exit()
+        except:
+            logCBT = self.createCBT(
+                initiator=self.CMInstance.__class__.__name__,
+                recipient='Logger',
+                action='warning',
+                data="CBT exception:\n"
+                     "    initiator {0}\n"
+                     "    recipient {1}:\n"
+                     "    action    {2}:\n"
+                     "    data      {3}:\n"
+                     "    traceback:\n{4}"
+                     .format(cbt.initiator, cbt.recipient, cbt.action,
+                             cbt.data, traceback.format_exc())
+            )
+
+            self.submitCBT(logCBT)
+        return True
+
+    # Pass CBTs taken off the queue to the module, returns False once the module has processed the TERMINATE CBT.
+    # Modules implementing processCBTBatch(cbts) get the CBTs in one call, others get a processCBT call per CBT.
+    def dispatchCBTs(self, cbts):
+        process_batch = getattr(self.CMInstance, "processCBTBatch", None)
+        if process_batch is None:
+            for cbt in cbts:
+                if not self.dispatchCBT(cbt):
+                    return False
+            return True
+        batch = []
+        for cbt in cbts:
+            if cbt.action == 'TERMINATE':
+                self.__dispatchBatch(process_batch, batch)
+                return self.dispatchCBT(cbt)
+            batch.append(cbt)
+        self.__dispatchBatch(process_batch, batch)
+        return True
+
+    def __dispatchBatch(self, process_batch, cbts):
+        if not cbts:
+            return
+        try:
+            process_batch(cbts)
+            for cbt in cbts:
+                if not cbt.Completed:
+                    self.PendingCBTs[cbt.Tag] = cbt
+        except SystemExit:
+            sys.exit()
+        except:
+            logCBT = self.createCBT(
+                initiator=self.CMInstance.__class__.__name__,
+                recipient='Logger',
+                action='warning',
+                data="CBT batch exception:\n"
+                     "    actions   {0}:\n"
+                     "    traceback:\n{1}"
+                     .format([cbt.action for cbt in cbts], traceback.format_exc())
+            )
+            self.submitCBT(logCBT)
+
+    # Invoke the timer_method of the CM once
+    def runTimer(self):
+        try:
+            self.CMInstance.timer_method()
+        except SystemExit:
+            sys.exit()
+        except:
+            logCBT = self.createCBT(
+                initiator=self.CMInstance.__class__.__name__,
+                recipient='Logger',
+                action='warning',
+                data="timer_method exception:\n{0}".format(traceback.format_exc())
+            )
+            self.submitCBT(logCBT)
+
     def __worker(self):
         # get CBT from the local queue and call processCBT() of the
         # CBT recipient and passing the CBT as an argument
-        while True:
-            cbt = self.__getCBT()
-
-            # break on special termination CBT
-            if cbt.action == 'TERMINATE':
-                self.terminateFlag = True
-                module_name = self.CMInstance.__class__.__name__
-                logging.info("{0} exiting".format(module_name))
-                self.CMInstance.terminate()
-                break
-            else:
-                try:
-                    self.CMInstance.processCBT(cbt)
-                    if not cbt.Completed:
-                        self.PendingCBTs[cbt.Tag] = cbt
-                except SystemExit:
-                    sys.exit()
-                except:
-                    logCBT = self.createCBT(
-                        initiator=self.CMInstance.__class__.__name__,
-                        recipient='Logger',
-                        action='warning',
-                        data="CBT exception:\n"
-                             "    initiator {0}\n"
-                             "    recipient {1}:\n"
-                             "    action    {2}:\n"
-                             "    data      {3}:\n"
-                             "    traceback:\n{4}"
-                             .format(cbt.initiator, cbt.recipient, cbt.action,
-                                     cbt.data, traceback.format_exc())
-                    )
-
-                    self.submitCBT(logCBT)
+        allow_blocking()
+        while self.dispatchCBTs(self.__getCBTs()):
+            pass
 
     def __timer_worker(self):
         # call the timer_method of each CM every timer_interval seconds
+        allow_blocking()
         event = threading.Event()
         while True:
             if self.terminateFlag:
                 break
             event.wait(self.interval)
-
-            try:
-                self.CMInstance.timer_method()
-            except SystemExit:
-                sys.exit()
-            except:
-                logCBT = self.createCBT(
-                    initiator=self.CMInstance.__class__.__name__,
-                    recipient='Logger',
-                    action='warning',
-                    data="timer_method exception:\n{0}".format(traceback.format_exc())
-                )
-                self.submitCBT(logCBT)
+            self.runTimer()
 
     def queryParam(self, ModuleName, ParamName=""):
         pv = self.__CFxObject.queryParam(ModuleName, ParamName)
         return pv
 
+    def queryCBTStats(self):
+        return self.__CFxObject.queryCBTStats()
+
     # Caller is the subscription source
     def PublishSubscription(self, SubscriptionName):
         return self.__CFxObject.PublishSubscription(self.CMInstance.__class__.__name__, SubscriptionName, self.CMInstance)
@@ -40,4 +40,4 @@ class CFxSubscription(object):
     def PostUpdate(self, msg):
         sink = None
         for sink in self.subscribers:
-            self.Owner.registerCBT(sink.__class__.__name__, self.SubscriptionName, msg)
+            self.Owner.registerCBT(sink.ModuleName, self.SubscriptionName, msg)
@@ -52,8 +52,8 @@ class ControllerModule(object):
     def terminate(self):
         pass
 
-    # create and submit CBT mask method
-    def registerCBT(self, _recipient, _action, _data='', _tag=None):
+    # create and submit CBT mask method, _priority is one of the CBTQueue PRIORITY_* classes
+    def registerCBT(self, _recipient, _action, _data='', _tag=None, _priority=None):
         cbt = self.CFxHandle.createCBT(
             #vnet = _vnet,
             initiator = self.ModuleName,
@@ -63,5 +63,24 @@ class ControllerModule(object):
         )
         if _tag is not None:
             cbt.Tag = _tag
+        cbt.Priority = _priority
         self.CFxHandle.submitCBT(cbt)
         return cbt
+
+    # create and submit several CBTs at once, each entry holds the registerCBT arguments
+    # (_recipient, _action[, _data[, _tag[, _priority]]])
+    def registerCBTs(self, _cbts):
+        cbts = []
+        for entry in _cbts:
+            cbt = self.CFxHandle.createCBT(
+                initiator = self.ModuleName,
+                recipient = entry[0],
+                action = entry[1],
+                data = entry[2] if len(entry) > 2 else ''
+            )
+            if len(entry) > 3 and entry[3] is not None:
+                cbt.Tag = entry[3]
+            cbt.Priority = entry[4] if len(entry) > 4 else None
+            cbts.append(cbt)
+        self.CFxHandle.submitCBTs(cbts)
+        return cbts
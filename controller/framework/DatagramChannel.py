@@ -0,0 +1,98 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import errno
+import socket
+import threading
+
+# errno values signalling that a non-blocking socket has been drained (10035 is WSAEWOULDBLOCK)
+_DRAINED = (errno.EAGAIN, errno.EWOULDBLOCK, 10035)
+
+
+class DatagramChannel(object):
+    '''
+    Batched UDP I/O for the Tincan control channel. Every wakeup of the listener drains all pending
+    datagrams into a preallocated buffer pool with recvfrom_into, and outbound messages queued
+    within one dispatch cycle are sent together by flush().
+    '''
+    def __init__(self, recv_sock, send_sock, dest, buf_size, recv_batch_size=16):
+        self.recv_sock = recv_sock
+        self.send_sock = send_sock
+        self.dest = dest
+        # Preallocated receive buffers, one per datagram of a batch
+        self.pool = [bytearray(buf_size) for _ in range(max(1, recv_batch_size))]
+        self.views = [memoryview(buf) for buf in self.pool]
+        self.tx_queue = []
+        self.tx_lck = threading.Lock()
+        self.rx_wakeups = 0
+        self.rx_syscalls = 0
+        self.rx_datagrams = 0
+        self.tx_flushes = 0
+        self.tx_datagrams = 0
+        self.recv_sock.setblocking(False)
+
+    # Drain the receive socket, returns memoryviews of the datagrams which are valid until the next call
+    def recv_batch(self):
+        datagrams = []
+        self.rx_wakeups += 1
+        for view in self.views:
+            self.rx_syscalls += 1
+            try:
+                nbytes, addr = self.recv_sock.recvfrom_into(view)
+            except socket.error as err:
+                if err.errno in _DRAINED:
+                    break
+                raise
+            datagrams.append(view[:nbytes])
+        self.rx_datagrams += len(datagrams)
+        return datagrams
+
+    # Queue an outbound message, it is sent on the next flush
+    def send(self, msg):
+        with self.tx_lck:
+            self.tx_queue.append(bytes(msg.encode('utf-8')))
+            return len(self.tx_queue)
+
+    def pending(self):
+        return len(self.tx_queue)
+
+    # Send all the messages queued since the last flush
+    def flush(self):
+        with self.tx_lck:
+            msgs, self.tx_queue = self.tx_queue, []
+        if not msgs:
+            return 0
+        self.tx_flushes += 1
+        for msg in msgs:
+            self.send_sock.sendto(msg, self.dest)
+            self.tx_datagrams += 1
+        return len(msgs)
+
+    def get_stats(self):
+        return {
+            "rx_wakeups": self.rx_wakeups,
+            "rx_syscalls": self.rx_syscalls,
+            "rx_datagrams": self.rx_datagrams,
+            "rx_datagrams_per_wakeup": float(self.rx_datagrams) / max(1, self.rx_wakeups),
+            "tx_flushes": self.tx_flushes,
+            "tx_datagrams": self.tx_datagrams,
+            "tx_datagrams_per_flush": float(self.tx_datagrams) / max(1, self.tx_flushes)
+        }
@@ -0,0 +1,97 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import time
+import threading
+from collections import deque
+
+
+class DedupeCache(object):
+    '''
+    Set of recently seen message keys used to drop duplicate deliveries. Membership is a hash lookup, the keys are
+    also kept in a ring ordered by arrival so the oldest ones are evicted once the capacity is reached and keys older
+    than ttl seconds are reclaimed as new keys are added or by expire(). The cache is shared by the module worker
+    and timer threads, so it is locked.
+    '''
+    def __init__(self, capacity=10000, ttl=30):
+        self.capacity = max(1, int(capacity))
+        self.ttl = ttl
+        self.keys = set()
+        self.ring = deque()  # (arrival time, key) in arrival order
+        self.lck = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+
+    # Record key as seen, returns True if it was already seen (a duplicate)
+    def seen(self, key, now=None):
+        if now is None:
+            now = time.time()
+        with self.lck:
+            self.__reclaim(now)
+            if key in self.keys:
+                self.hits += 1
+                return True
+            self.misses += 1
+            self.keys.add(key)
+            self.ring.append((now, key))
+            if len(self.ring) > self.capacity:
+                self.keys.discard(self.ring.popleft()[1])
+                self.evicted += 1
+            return False
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        with self.lck:
+            self.keys.clear()
+            self.ring.clear()
+
+    def expire(self, now=None):
+        with self.lck:
+            self.__reclaim(time.time() if now is None else now)
+
+    # Called with the lock held
+    def __reclaim(self, now):
+        if not self.ttl:
+            return
+        deadline = now - self.ttl
+        ring = self.ring
+        while ring and ring[0][0] <= deadline:
+            self.keys.discard(ring.popleft()[1])
+            self.expired += 1
+
+    def get_stats(self):
+        with self.lck:
+            return {
+                "size": len(self.keys),
+                "capacity": self.capacity,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "expired": self.expired
+            }
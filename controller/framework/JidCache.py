@@ -0,0 +1,152 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import time
+import threading
+
+
+class JidCache(object):
+    '''
+    UID -> full JID of the peers of a virtual network as learnt from their presence and UID_MATCH replies, so a CBT
+    forwarded to a known peer is sent to its JID without querying the whole roster. Entries expire after ttl seconds
+    and are dropped when the JID goes unavailable. The time from the first query of a UID to its resolution is
+    recorded as the resolution latency, queries left unanswered are abandoned by expire().
+    '''
+    def __init__(self, ttl=300, query_interval=5):
+        self.ttl = ttl
+        self.query_interval = query_interval
+        self.uid_jid = {}   # UID -> (full JID, expiry time)
+        self.jid_uid = {}   # full JID -> UID
+        self.queries = {}   # UID -> [time of the first unanswered query, time of the last query]
+        self.lck = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self.abandoned = 0
+        self.resolved = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def __len__(self):
+        return len(self.uid_jid)
+
+    def __contains__(self, uid):
+        return uid in self.uid_jid
+
+    # Returns the JID of uid, None if it is unknown or expired
+    def get(self, uid, now=None):
+        if now is None:
+            now = time.time()
+        with self.lck:
+            entry = self.uid_jid.get(uid)
+            if entry is not None and self.ttl and entry[1] <= now:
+                self.__remove(uid)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    # Returns the JID of uid without counting a lookup
+    def peek(self, uid):
+        entry = self.uid_jid.get(uid)
+        return None if entry is None else entry[0]
+
+    def put(self, uid, jid, now=None):
+        if now is None:
+            now = time.time()
+        jid = str(jid)
+        with self.lck:
+            self.__remove(uid)
+            stale_uid = self.jid_uid.pop(jid, None)
+            if stale_uid is not None:
+                self.uid_jid.pop(stale_uid, None)
+            self.uid_jid[uid] = (jid, now + self.ttl)
+            self.jid_uid[jid] = uid
+            query = self.queries.pop(uid, None)
+            if query is not None:
+                latency = (now - query[0]) * 1000
+                self.resolved += 1
+                self.total_ms += latency
+                self.max_ms = max(self.max_ms, latency)
+
+    # Records a query for uid, returns False when one was sent less than query_interval seconds ago
+    def query(self, uid, now=None):
+        if now is None:
+            now = time.time()
+        with self.lck:
+            query = self.queries.get(uid)
+            if query is None:
+                self.queries[uid] = [now, now]
+                return True
+            if now - query[1] < self.query_interval:
+                return False
+            query[1] = now
+            return True
+
+    # Reclaim the expired entries and abandon the queries first sent more than query_ttl seconds ago, so UIDs that
+    # never resolve are not kept and a late answer does not count as the resolution latency
+    def expire(self, query_ttl, now=None):
+        if now is None:
+            now = time.time()
+        with self.lck:
+            if self.ttl:
+                for uid in [uid for uid, entry in self.uid_jid.items() if entry[1] <= now]:
+                    self.__remove(uid)
+                    self.expired += 1
+            for uid in [uid for uid, query in self.queries.items() if now - query[0] > query_ttl]:
+                del self.queries[uid]
+                self.abandoned += 1
+
+    # Drop the entry of a JID that went unavailable, returns its UID
+    def invalidate(self, jid):
+        with self.lck:
+            uid = self.jid_uid.get(str(jid))
+            if uid is not None:
+                self.__remove(uid)
+                self.invalidated += 1
+            return uid
+
+    def __remove(self, uid):
+        entry = self.uid_jid.pop(uid, None)
+        if entry is not None:
+            self.jid_uid.pop(entry[0], None)
+
+    def get_stats(self):
+        with self.lck:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.uid_jid),
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": float(self.hits) / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "invalidated": self.invalidated,
+                "pending_queries": len(self.queries),
+                "abandoned_queries": self.abandoned,
+                "resolved": self.resolved,
+                "mean_resolution_ms": self.total_ms / self.resolved if self.resolved else 0.0,
+                "max_resolution_ms": self.max_ms
+            }
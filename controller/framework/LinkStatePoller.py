@@ -0,0 +1,82 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import time
+
+
+class LinkStatePoller(object):
+    '''
+    Schedules the link state queries of the peers of one virtual network. A peer is polled every min_interval
+    seconds while its state changes; every poll that finds the state unchanged multiplies the interval by backoff,
+    up to max_interval. Link state notifications pushed by Tincan stand in for a poll, so peers reporting their
+    state changes are only polled at max_interval.
+    '''
+    def __init__(self, min_interval=10, max_interval=60, backoff=2.0):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = backoff
+        self.peers = {}  # uid -> [status, interval, next poll time]
+        self.polls = 0
+        self.notifications = 0
+
+    # Returns True when the peer has to be queried, the next poll is scheduled when it is
+    def is_due(self, uid, now=None):
+        now = time.time() if now is None else now
+        peer = self.peers.get(uid)
+        if peer is None:
+            self.peers[uid] = [None, self.min_interval, now + self.min_interval]
+        elif peer[2] > now:
+            return False
+        else:
+            peer[2] = now + peer[1]
+        self.polls += 1
+        return True
+
+    # Record the state reported by a poll, returns True when it differs from the last known state
+    def observe(self, uid, status, now=None):
+        now = time.time() if now is None else now
+        peer = self.peers.get(uid)
+        if peer is None:
+            self.peers[uid] = [status, self.min_interval, now + self.min_interval]
+            return True
+        changed = peer[0] != status
+        if changed:
+            peer[1] = self.min_interval
+        else:
+            peer[1] = min(peer[1] * self.backoff, self.max_interval)
+        peer[0] = status
+        peer[2] = now + peer[1]
+        return changed
+
+    # Record a state change pushed by Tincan, returns True when it differs from the last known state
+    def notify(self, uid, status, now=None):
+        now = time.time() if now is None else now
+        self.notifications += 1
+        peer = self.peers.get(uid)
+        changed = peer is None or peer[0] != status
+        self.peers[uid] = [status, self.max_interval, now + self.max_interval]
+        return changed
+
+    def remove(self, uid):
+        self.peers.pop(uid, None)
+
+    def get_stats(self):
+        return {"peers": len(self.peers), "polls": self.polls, "notifications": self.notifications}
@@ -0,0 +1,100 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import socket
+import struct
+import binascii
+from collections import OrderedDict
+
+
+# IPv4 address as an integer, other addresses are kept as they are
+def ip_key(ip):
+    try:
+        return struct.unpack("!I", socket.inet_aton(ip))[0]
+    except (socket.error, TypeError, ValueError):
+        return ip
+
+
+def mac_key(mac):
+    return binascii.unhexlify(mac.replace(":", ""))
+
+
+class PacketRouteTable(object):
+    '''
+    Lookup of the UID a frame from the local network interface is routed to. Destination IPv4 addresses are kept as
+    integers and MAC addresses as bytes so a frame is matched on its binary header fields, and the last decisions
+    are kept in a small LRU keyed by (destination MAC, destination IP). Any change to the tables clears the LRU.
+    '''
+    def __init__(self, cache_size=256):
+        self.ip_uid = {}   # IPv4 address as int (other IPs as str) -> UID
+        self.mac_uid = {}  # MAC as bytes -> UID
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def set_ip(self, ip, uid):
+        self.ip_uid[ip_key(ip)] = uid
+        self.cache.clear()
+
+    def set_mac(self, mac, uid):
+        try:
+            self.mac_uid[mac_key(mac)] = uid
+        except (TypeError, ValueError, binascii.Error):
+            return
+        self.cache.clear()
+
+    def discard(self, ips=(), macs=()):
+        for ip in ips:
+            self.ip_uid.pop(ip_key(ip), None)
+        for mac in macs:
+            try:
+                self.mac_uid.pop(mac_key(mac), None)
+            except (TypeError, ValueError, binascii.Error):
+                pass
+        self.cache.clear()
+
+    def clear(self):
+        self.ip_uid.clear()
+        self.mac_uid.clear()
+        self.cache.clear()
+
+    # Returns the UID the frame is routed to by its destination IP or else its destination MAC, None if unknown
+    def lookup(self, frame):
+        key = frame.route_key()
+        cache = self.cache
+        uid = cache.pop(key, self)
+        if uid is not self:
+            self.hits += 1
+            cache[key] = uid
+            return uid
+        self.misses += 1
+        uid = self.ip_uid.get(key[1])
+        if uid is None:
+            uid = self.mac_uid.get(key[0])
+        cache[key] = uid
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return uid
+
+    def get_stats(self):
+        return {"ips": len(self.ip_uid), "macs": len(self.mac_uid), "cached": len(self.cache),
+                "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,117 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import time
+import threading
+from collections import deque
+
+
+class PendingDelivery(object):
+    __slots__ = ("uid", "data", "initiator", "deadline")
+
+    def __init__(self, uid, data, initiator, deadline):
+        self.uid = uid
+        self.data = data
+        self.initiator = initiator
+        self.deadline = deadline
+
+
+class PendingDeliveryStore(object):
+    '''
+    Messages waiting for the address of their destination peer UID to be resolved. Each UID holds at most capacity
+    messages, the oldest one is dropped when a new message does not fit, and a message still waiting ttl seconds
+    after it was queued expires. Dropped and expired messages are returned to the caller so their originator can
+    be told about the failed delivery.
+    '''
+    def __init__(self, capacity=32, ttl=30):
+        self.capacity = max(1, int(capacity))
+        self.ttl = ttl
+        self.queues = {}  # UID -> deque of PendingDelivery in arrival order
+        self.lck = threading.Lock()
+        self.queued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.expired = 0
+
+    def __len__(self):
+        return self.queued
+
+    def __contains__(self, uid):
+        return uid in self.queues
+
+    # Number of messages still queued for uid
+    def count(self, uid):
+        with self.lck:
+            return len(self.queues.get(uid, ()))
+
+    # Queue a message for uid, returns the message dropped to make room or None
+    def put(self, uid, data, initiator=None, now=None):
+        if now is None:
+            now = time.time()
+        entry = PendingDelivery(uid, data, initiator, now + self.ttl)
+        with self.lck:
+            queue = self.queues.get(uid)
+            if queue is None:
+                queue = self.queues[uid] = deque()
+            queue.append(entry)
+            if len(queue) <= self.capacity:
+                self.queued += 1
+                return None
+            self.dropped += 1
+            return queue.popleft()
+
+    # Take all the messages queued for uid in arrival order
+    def pop(self, uid):
+        with self.lck:
+            queue = self.queues.pop(uid, None)
+            if not queue:
+                return []
+            self.queued -= len(queue)
+            self.delivered += len(queue)
+            return [entry.data for entry in queue]
+
+    # Remove and return the messages whose deadline has passed
+    def expire(self, now=None):
+        if now is None:
+            now = time.time()
+        expired = []
+        with self.lck:
+            for uid in list(self.queues.keys()):
+                queue = self.queues[uid]
+                while queue and queue[0].deadline <= now:
+                    expired.append(queue.popleft())
+                if not queue:
+                    del self.queues[uid]
+            self.queued -= len(expired)
+            self.expired += len(expired)
+        return expired
+
+    def get_stats(self):
+        with self.lck:
+            return {
+                "uids": len(self.queues),
+                "queued": self.queued,
+                "capacity": self.capacity,
+                "ttl": self.ttl,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "expired": self.expired
+            }
@@ -0,0 +1,230 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import os
+import sys
+import logging
+import itertools
+import importlib
+import threading
+import multiprocessing
+import controller.framework.CBT as CBTModule
+from controller.framework.CFxHandle import CFxHandle
+from controller.framework.ControllerModule import ControllerModule
+
+# Fresh interpreters avoid forking the controller with its threads and sockets, Python 2 can only fork
+if hasattr(multiprocessing, "get_context"):
+    mp = multiprocessing.get_context("spawn")
+else:
+    mp = multiprocessing
+
+
+class ProcessModule(ControllerModule):
+    '''
+    Stand-in for a controller module hosted in a worker process, selected with RunInProcess in the module
+    configuration. CBTs submitted to the module are passed to the worker process and the CBTs it creates are
+    submitted to CFx here. queryParam and the subscription calls made by the hosted module are served by the
+    parent CFx so they behave as for an in-process module.
+    '''
+    def __init__(self, CFxHandle, paramDict, ModuleName, CFxObject, module_path):
+        super(ProcessModule, self).__init__(CFxHandle, paramDict, ModuleName)
+        self.CFxObject = CFxObject
+        self.module_path = module_path
+        self.to_child = mp.Queue()
+        self.to_parent = mp.Queue()
+        self.replies = mp.Queue()
+        self.process = None
+        self.dispatcher = None
+        self.started = threading.Event()
+        self.start_status = None
+
+    def initialize(self):
+        self.process = mp.Process(target=child_main, name="CFx-{0}".format(self.ModuleName),
+                                  args=(self.module_path, self.ModuleName, dict(self.CMConfig),
+                                        dict(self.CFxObject.CONFIG["CFx"]), self.to_child, self.to_parent,
+                                        self.replies))
+        self.process.daemon = True
+        self.process.start()
+        self.dispatcher = threading.Thread(target=self.__dispatch, name="CFx-{0}-dispatch".format(self.ModuleName))
+        self.dispatcher.setDaemon(True)
+        self.dispatcher.start()
+        # wait for the hosted module to finish initializing, as an in-process module would
+        while not self.started.wait(1):
+            if not self.process.is_alive():
+                self.start_status = ("failed", "exit code {0}".format(self.process.exitcode))
+                break
+        if self.start_status[0] != "ready":
+            raise RuntimeError("{0} failed to start in a worker process: {1}".format(self.ModuleName,
+                                                                                    self.start_status[1]))
+
+    def processCBT(self, cbt):
+        self.to_child.put(cbt)
+
+    def timer_method(self):
+        pass
+
+    def terminate(self):
+        self.to_child.put(CBTModule.CBT("CFx", self.ModuleName, "TERMINATE", ""))
+        self.process.join()
+
+    # Serve the messages of the worker process until it exits
+    def __dispatch(self):
+        while True:
+            msg = self.to_parent.get()
+            kind = msg[0]
+            if kind == "cbt":
+                self.CFxObject.submitCBT(msg[1])
+            elif kind == "cbts":
+                self.CFxObject.submitCBTs(msg[1])
+            elif kind == "call":
+                try:
+                    result = ("ok", self.__call(msg[1], msg[2]))
+                except Exception as err:
+                    result = ("error", "{0}: {1}".format(type(err).__name__, err))
+                self.replies.put(result)
+            elif kind in ["ready", "failed"]:
+                self.start_status = msg
+                self.started.set()
+                if kind == "failed":
+                    break
+            elif kind == "exit":
+                break
+
+    def __call(self, method, args):
+        cfx = self.CFxObject
+        if method == "queryParam":
+            return cfx.queryParam(*args)
+        elif method == "queryCBTStats":
+            return cfx.queryCBTStats()
+        elif method == "PublishSubscription":
+            cfx.PublishSubscription(self.ModuleName, args[0], self)
+        elif method == "RemoveSubscription":
+            cfx.RemoveSubscription(cfx.findSubscription(self.ModuleName, args[0]))
+        elif method == "PostUpdate":
+            cfx.findSubscription(self.ModuleName, args[0]).PostUpdate(args[1])
+        elif method == "StartSubscription":
+            cfx.StartSubscription(args[0], args[1], self)
+        elif method == "EndSubscription":
+            cfx.EndSubscription(args[0], args[1], self)
+        else:
+            raise NameError("Unsupported CFx call {0}".format(method))
+
+
+class RemoteSubscription(object):
+    '''
+    Handle returned to a module hosted in a worker process when it publishes a subscription, updates are posted
+    to the subscription held by the parent CFx.
+    '''
+    def __init__(self, cfx, OwnerName, SubscriptionName):
+        self.cfx = cfx
+        self.OwnerName = OwnerName
+        self.SubscriptionName = SubscriptionName
+
+    def PostUpdate(self, msg):
+        self.cfx.call("PostUpdate", self.SubscriptionName, msg)
+
+
+class ChildCFx(object):
+    '''
+    CFx seen by a module hosted in a worker process. CBTs are sent to the parent CFx and queries are forwarded to
+    it synchronously.
+    '''
+    def __init__(self, module_name, cfx_config, to_parent, replies):
+        self.CONFIG = {"CFx": cfx_config}
+        self.module_name = module_name
+        self.to_parent = to_parent
+        self.replies = replies
+        self.handle = None
+        self.call_lck = threading.Lock()
+
+    def call(self, method, *args):
+        with self.call_lck:
+            self.to_parent.put(("call", method, args))
+            status, result = self.replies.get()
+        if status != "ok":
+            raise RuntimeError(result)
+        return result
+
+    def submitCBT(self, cbt):
+        # CBTs to the hosted module itself do not need to leave the process
+        if cbt.recipient == self.module_name and self.handle is not None:
+            self.handle.CMQueue.put(cbt)
+        else:
+            self.to_parent.put(("cbt", cbt))
+
+    def submitCBTs(self, cbts):
+        local = [cbt for cbt in cbts if cbt.recipient == self.module_name]
+        remote = [cbt for cbt in cbts if cbt.recipient != self.module_name]
+        if local:
+            self.handle.CMQueue.put_many(local)
+        if remote:
+            self.to_parent.put(("cbts", remote))
+
+    def queryParam(self, ModuleName, ParamName=""):
+        return self.call("queryParam", ModuleName, ParamName)
+
+    def queryCBTStats(self):
+        return self.call("queryCBTStats")
+
+    def PublishSubscription(self, OwnerName, SubscriptionName, Owner):
+        self.call("PublishSubscription", SubscriptionName)
+        return RemoteSubscription(self, OwnerName, SubscriptionName)
+
+    def RemoveSubscription(self, sub):
+        self.call("RemoveSubscription", sub.SubscriptionName)
+
+    def StartSubscription(self, OwnerName, SubscriptionName, Sink):
+        self.call("StartSubscription", OwnerName, SubscriptionName)
+
+    def EndSubscription(self, OwnerName, SubscriptionName, Sink):
+        self.call("EndSubscription", OwnerName, SubscriptionName)
+
+
+# Entry point of the worker process hosting a controller module
+def child_main(module_path, module_name, config, cfx_config, to_child, to_parent, replies):
+    # CBT tags are process local, offset them so tags created here do not collide with the parent's
+    CBTModule._tags = itertools.count((os.getpid() << 32) + 1)
+    cfx = ChildCFx(module_name, cfx_config, to_parent, replies)
+    try:
+        module_class = getattr(importlib.import_module(module_path), module_name)
+        handle = CFxHandle(cfx)
+        handle.CMInstance = module_class(handle, config, module_name)
+        handle.CMConfig = config
+        cfx.handle = handle
+        handle.initialize()
+    except Exception as err:
+        to_parent.put(("failed", "{0}: {1}".format(type(err).__name__, err)))
+        return
+    handle.CMThread.start()
+    if handle.timer_thread:
+        handle.timer_thread.setDaemon(True)
+        handle.timer_thread.start()
+    to_parent.put(("ready",))
+    # Feed the CBTs received from the parent to the module queue until the module terminates
+    while True:
+        cbt = to_child.get()
+        handle.CMQueue.put(cbt, force=cbt.action == "TERMINATE")
+        if cbt.action == "TERMINATE":
+            break
+    handle.CMThread.join()
+    to_parent.put(("exit",))
+    logging.info("{0} worker process exiting".format(module_name))
+    sys.exit(0)
@@ -0,0 +1,82 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from bisect import bisect_left, bisect_right, insort
+
+
+class RoutingIndex(object):
+    '''
+    Online peers of a virtual network as a sorted array of integer UIDs, used to pick the next hop of a forwarded
+    message with a binary search instead of scanning the link tables. The index is only updated when the state of
+    a link changes.
+    '''
+    def __init__(self):
+        self.keys = []  # sorted integer UIDs of the online peers
+        self.uids = {}  # integer UID -> UID string
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, uid):
+        return int(uid, 16) in self.uids
+
+    # Add or remove a peer, returns True when the index changed
+    def set_online(self, uid, online):
+        key = int(uid, 16)
+        if online:
+            if key in self.uids:
+                return False
+            insort(self.keys, key)
+            self.uids[key] = uid
+            return True
+        if key not in self.uids:
+            return False
+        del self.keys[bisect_left(self.keys, key)]
+        del self.uids[key]
+        return True
+
+    def discard(self, uid):
+        return self.set_online(uid, False)
+
+    def clear(self):
+        del self.keys[:]
+        self.uids.clear()
+
+    # Returns the online peer on the ring interval (local_uid, dst_uid] closest to dst_uid, the destination itself
+    # when it is online, or local_uid when no peer is closer to the destination than this node
+    def next_hop(self, local_uid, dst_uid):
+        keys = self.keys
+        if not keys:
+            return local_uid
+        local = int(local_uid, 16)
+        dst = int(dst_uid, 16)
+        i = bisect_right(keys, dst) - 1  # largest peer <= dst
+        if local < dst:
+            # 0---local===dst---N
+            if i >= 0 and keys[i] > local:
+                return self.uids[keys[i]]
+        elif local > dst:
+            # 0===dst---local===N, peers past zero are closer to the destination than the ones before it
+            if i >= 0:
+                return self.uids[keys[i]]
+            if keys[-1] > local:
+                return self.uids[keys[-1]]
+        return local_uid
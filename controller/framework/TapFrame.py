@@ -0,0 +1,143 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import sys
+import socket
+import struct
+import binascii
+
+py_ver = sys.version_info[0]
+
+ETH_P_IP = 0x0800
+ETH_P_ARP = 0x0806
+ETH_P_IPV6 = 0x86DD
+
+ETH_HDR_LEN = 14
+ZERO_MAC = "000000000000"
+BROADCAST_MAC = "FFFFFFFFFFFF"
+
+
+def _hex(view):
+    return binascii.hexlify(view).decode("ascii").upper()
+
+
+class TapFrame(object):
+    '''
+    Ethernet frame delivered by Tincan (UpdateRoutes/ICC) decoded once at ingress.
+    The frame is held as bytes and only re-encoded to a hex string at the Tincan JSON boundary,
+    the hex string received from Tincan is kept so an unmodified frame is never re-encoded.
+    '''
+    __slots__ = ("buf", "_hex", "ethertype", "dst_mac", "src_mac", "src_ip", "dst_ip", "ip_proto",
+                 "arp_op", "arp_src_mac", "arp_dst_mac")
+
+    def __init__(self, buf, hexstr=None):
+        self.buf = buf
+        self._hex = hexstr
+        self.ethertype = 0
+        self.dst_mac = self.src_mac = ""
+        self.src_ip = self.dst_ip = ""
+        self.ip_proto = None
+        self.arp_op = 0
+        self.arp_src_mac = self.arp_dst_mac = ""
+        self.parse()
+
+    @classmethod
+    def from_hex(cls, hexstr):
+        return cls(binascii.unhexlify(hexstr), hexstr)
+
+    def parse(self):
+        buf = self.buf
+        length = len(buf)
+        if length < ETH_HDR_LEN:
+            return
+        view = memoryview(buf) if py_ver == 3 else buf
+        self.dst_mac = _hex(view[0:6])
+        self.src_mac = _hex(view[6:12])
+        self.ethertype = struct.unpack_from("!H", buf, 12)[0]
+        if self.ethertype == ETH_P_IP and length >= 34:
+            self.ip_proto = struct.unpack_from("!B", buf, 23)[0]
+            self.src_ip = socket.inet_ntoa(bytes(view[26:30]))
+            self.dst_ip = socket.inet_ntoa(bytes(view[30:34]))
+        elif self.ethertype == ETH_P_IPV6 and length >= 54:
+            self.ip_proto = struct.unpack_from("!B", buf, 20)[0]
+            self.src_ip = _hex(view[22:38])
+            self.dst_ip = _hex(view[38:54])
+        elif self.ethertype == ETH_P_ARP and length >= 22:
+            maclen, iplen, self.arp_op = struct.unpack_from("!BBH", buf, 18)
+            srcipindex = 22 + maclen
+            destmacindex = srcipindex + iplen
+            destipindex = destmacindex + maclen
+            if length < destipindex + iplen:
+                return
+            self.arp_src_mac = _hex(view[22:srcipindex])
+            self.arp_dst_mac = _hex(view[destmacindex:destipindex])
+            if iplen == 4:
+                self.src_ip = socket.inet_ntoa(bytes(view[srcipindex:destmacindex]))
+                self.dst_ip = socket.inet_ntoa(bytes(view[destipindex:destipindex + 4]))
+
+    # Binary destination of the frame used as a routing key: the destination MAC as bytes and the destination IPv4
+    # address as an integer (IPv6 as the hex string, None without an IP header). ARP uses the target addresses.
+    def route_key(self):
+        buf = self.buf
+        ethertype = self.ethertype
+        if ethertype == ETH_P_IP:
+            if len(buf) >= 34:
+                return buf[0:6], struct.unpack_from("!I", buf, 30)[0]
+        elif ethertype == ETH_P_ARP:
+            if self.arp_dst_mac:
+                maclen, iplen = struct.unpack_from("!BB", buf, 18)
+                destmacindex = 22 + maclen + iplen
+                destipindex = destmacindex + maclen
+                if iplen == 4:
+                    return buf[destmacindex:destipindex], struct.unpack_from("!I", buf, destipindex)[0]
+                return buf[destmacindex:destipindex], None
+        elif ethertype == ETH_P_IPV6 and self.dst_ip:
+            return buf[0:6], self.dst_ip
+        return buf[0:6], None
+
+    @property
+    def is_arp(self):
+        return self.ethertype == ETH_P_ARP
+
+    @property
+    def is_ip(self):
+        return self.ethertype in (ETH_P_IP, ETH_P_IPV6)
+
+    @property
+    def hex(self):
+        # Encode the frame for Tincan, reusing the ingress encoding when available
+        if self._hex is None:
+            self._hex = _hex(self.buf)
+        return self._hex
+
+    def __len__(self):
+        return len(self.buf)
+
+    def __repr__(self):
+        return "TapFrame(ethertype={0:#06x}, src={1}, dst={2}, len={3})".format(
+            self.ethertype, self.src_mac, self.dst_mac, len(self.buf))
+
+
+# json.dumps default hook used at the Tincan boundary to encode TapFrames as hex strings
+def json_default(obj):
+    if isinstance(obj, TapFrame):
+        return obj.hex
+    raise TypeError("{0} is not JSON serializable".format(repr(obj)))
@@ -0,0 +1,170 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import time
+import threading
+from collections import namedtuple
+
+# Upper bounds in ms of the latency histogram buckets, the last bucket counts everything slower
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+# Request Tincan does not respond to, only what the caller may log is kept and nothing waits on it
+SentRequest = namedtuple("SentRequest", ["tid", "command", "request", "initiator"])
+
+
+class Transaction(object):
+    '''
+    Outstanding Tincan request. Acts as a minimal future: callbacks added with add_done_callback run once the
+    response arrives or the request times out, on the thread that completed it, and result() blocks until then.
+    '''
+    __slots__ = ("tid", "command", "request", "initiator", "timeout", "retries", "attempts", "sent", "deadline",
+                 "response", "timed_out", "_callbacks", "_event")
+
+    def __init__(self, tid, command, request, initiator=None, timeout=5.0, retries=0):
+        self.tid = tid
+        self.command = command
+        self.request = request  # JSON text, resent unchanged on a retry
+        self.initiator = initiator
+        self.timeout = timeout
+        self.retries = retries
+        self.attempts = 1
+        self.sent = time.time()
+        self.deadline = self.sent + timeout
+        self.response = None
+        self.timed_out = False
+        self._callbacks = []
+        self._event = threading.Event()
+
+    def done(self):
+        return self._event.is_set()
+
+    def add_done_callback(self, callback):
+        if self.done():
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    # Returns the decoded Tincan response, None when the request timed out
+    def result(self, timeout=None):
+        if not self._event.wait(timeout):
+            raise RuntimeError("Tincan transaction {0} is still pending".format(self.tid))
+        return self.response
+
+    def _finish(self, response, timed_out=False):
+        self.response = response
+        self.timed_out = timed_out
+        self._event.set()
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+
+class TransactionTable(object):
+    '''
+    Tincan requests awaiting a response, keyed by TransactionId. Responses complete their transaction and are timed
+    into a latency histogram per command. expire() resends the requests whose deadline passed with an exponential
+    backoff until their retries are used up, after which they complete as timed out.
+    '''
+    def __init__(self, timeout=5.0, retries=0, backoff=2.0):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pending = {}
+        self.lck = threading.Lock()
+        self.stats = {}
+
+    def add(self, tid, command, request, initiator=None, callback=None, timeout=None, retries=None):
+        trans = Transaction(tid, command, request, initiator, self.timeout if timeout is None else timeout,
+                            self.retries if retries is None else retries)
+        if callback is not None:
+            trans.add_done_callback(callback)
+        with self.lck:
+            self.pending[tid] = trans
+        return trans
+
+    # Complete the transaction of a response, returns None for unknown or already completed TransactionIds
+    def complete(self, tid, response):
+        with self.lck:
+            trans = self.pending.pop(tid, None)
+            if trans is None:
+                return None
+            self.__record(trans.command, (time.time() - trans.sent) * 1000)
+        trans._finish(response)
+        return trans
+
+    # Returns the transactions to resend and completes the ones that ran out of retries
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        resend, timed_out = [], []
+        with self.lck:
+            for tid, trans in list(self.pending.items()):
+                if trans.deadline > now:
+                    continue
+                if trans.attempts <= trans.retries:
+                    trans.deadline = now + trans.timeout * (self.backoff ** trans.attempts)
+                    trans.attempts += 1
+                    trans.sent = now
+                    self.__stats(trans.command)["retries"] += 1
+                    resend.append(trans)
+                else:
+                    del self.pending[tid]
+                    self.__stats(trans.command)["timeouts"] += 1
+                    timed_out.append(trans)
+        for trans in timed_out:
+            trans._finish(None, timed_out=True)
+        return resend, timed_out
+
+    def __len__(self):
+        return len(self.pending)
+
+    def __stats(self, command):
+        stats = self.stats.get(command)
+        if stats is None:
+            stats = {"count": 0, "retries": 0, "timeouts": 0, "total_ms": 0.0, "max_ms": 0.0,
+                     "buckets": [0] * (len(LATENCY_BUCKETS) + 1)}
+            self.stats[command] = stats
+        return stats
+
+    def __record(self, command, latency):
+        stats = self.__stats(command)
+        stats["count"] += 1
+        stats["total_ms"] += latency
+        stats["max_ms"] = max(stats["max_ms"], latency)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                stats["buckets"][i] += 1
+                break
+        else:
+            stats["buckets"][-1] += 1
+
+    def get_stats(self):
+        with self.lck:
+            commands = {}
+            for command, stats in self.stats.items():
+                stats = dict(stats, buckets=list(stats["buckets"]))
+                stats["mean_ms"] = stats["total_ms"] / stats["count"] if stats["count"] else 0.0
+                commands[command] = stats
+            return {
+                "pending": len(self.pending),
+                "bucket_bounds_ms": list(LATENCY_BUCKETS),
+                "commands": commands
+            }
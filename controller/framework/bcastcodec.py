@@ -0,0 +1,67 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+# Encoding of the control data broadcast over the overlay (BroadcastData ICC messages).
+# A message travels as the list [version, message_type, field, ...] with the fields of registered message types
+# in schema order, unregistered types carry their fields as a single dict. The list is embedded in the ICC JSON
+# payload, so it is parsed together with the ICC message instead of being evaluated as a Python literal.
+
+import ast
+
+VERSION = 1
+
+# Message type -> ordered field names
+SCHEMAS = {
+    "SendMacDetails": ("src_uid", "src_node_mac", "mac_ip_table")
+}
+
+
+def register_type(message_type, fields):
+    SCHEMAS[message_type] = tuple(fields)
+
+
+def encode(msg):
+    message_type = msg["message_type"]
+    fields = SCHEMAS.get(message_type)
+    if fields is None:
+        body = dict(msg)
+        del body["message_type"]
+        return [VERSION, message_type, body]
+    return [VERSION, message_type] + [msg[field] for field in fields]
+
+
+def decode(frame):
+    # Control data sent by controllers predating the codec is the repr of a dict
+    if not isinstance(frame, list):
+        return ast.literal_eval(frame)
+    if len(frame) < 2 or frame[0] != VERSION:
+        raise ValueError("Unsupported broadcast data encoding: {0}".format(frame[:2]))
+    message_type = frame[1]
+    fields = SCHEMAS.get(message_type)
+    if fields is None:
+        msg = dict(frame[2])
+    else:
+        if len(frame) != len(fields) + 2:
+            raise ValueError("Malformed {0} broadcast data, expected {1} fields got {2}"
+                             .format(message_type, len(fields), len(frame) - 2))
+        msg = dict(zip(fields, frame[2:]))
+    msg["message_type"] = message_type
+    return msg
@@ -32,6 +32,29 @@ CONFIG = {
         "local_uid": "",  # Attribute to store node UID needed by Statreport and SVPN
         "uid_size": 40,   # No of bytes for node UID
         "ipopVerRel": ipopVerRel,
+        "Runtime": "threaded",      # Module execution <threaded>/<asyncio>, asyncio runs all modules on one event loop
+        "AsyncPoolSize": 4,         # Threads shared by AsyncOffload modules with the asyncio runtime
+        "JsonCodec": "auto",  # JSON backend <auto>/<orjson>/<msgspec>/<ujson>/<json>, auto picks the fastest installed
+        "CBTTracking": "weak",     # Owned CBT tracking <weak>/<ttl>, can be overridden per module
+        "CBTTableCapacity": 4096,  # Max pending (and owned with ttl tracking) CBTs kept per module
+        "CBTTableTTL": 300,        # Seconds after which a pending CBT that was never completed is reclaimed
+        "QueueScheduling": "weighted",  # Order the CBT priority classes are served in <weighted>/<strict>
+        "QueueWeights": {"data": 8, "control": 4, "housekeeping": 1},  # CBTs served per class in a weighted round
+        "QueueCapacity": 8192,      # Max CBTs queued per module, 0 for unbounded
+        "QueuePolicy": "block",     # Full queue policy <block>/<drop-oldest>/<drop-newest>/<drop-by-action>,
+                                    # only module threads block, I/O threads shed by action instead
+        "QueueBlockTimeout": 1.0,   # Seconds a submitter waits on a full queue before the CBT is dropped
+        "DropActions": [],          # Actions shed first by the drop-by-action policy
+        "CBTBatchSize": 32,         # Max CBTs a module worker takes off its queue at once
+        # Actions classified as data-plane or housekeeping CBTs, all other actions are control-plane
+        "PriorityActions": {
+            "data": ["TINCAN_PACKET", "ARPPacket", "BroadcastPkt", "DO_INSERT_DATA_PACKET", "IPv4_MULTICAST",
+                     "IPv6_MULTICAST", "PROCESS_TINCAN_DATA", "FORWARD_MSG"],
+            "housekeeping": ["debug", "info", "GET_VISUALIZER_DATA", "GET_CHANNEL_STATS", "GET_ONLINE_PEERLIST",
+                             "GET_LINK_DETAILS", "DO_QUERY_LINK_STATS", "DO_ECHO", "pktdump",
+                             "GET_TRANSACTION_STATS", "GET_BROADCAST_STATS",
+                             "GET_JID_CACHE_STATS", "GET_PENDING_CBT_STATS"]
+        },
     },
     "Logger": {
         "Enabled": True,
@@ -42,11 +65,28 @@ CONFIG = {
         "TincanLogFileName": "tincan.log",
         "LogFileSize": 1000000,   # 1MB sized log files
         "BackupLogFileCount": 5,   # Keep up to 5 files of history
-        "ConsoleLevel": None
+        "ConsoleLevel": None,
+        "PriorityActions": {},     # Log records share one priority class so they are written in order
+        "QueuePolicy": "drop-by-action",  # Never stall a module on logging, debug and info records are shed first
+        "DropActions": ["debug", "info"],
+        "AsyncOffload": True,      # Blocking module, runs on the asyncio runtime thread pool
     },
     "TincanInterface": {
         "buf_size": 65507,      # Max buffer size for Tincan Messages
         "SocketReadWaitTime": 15,   # Socket read wait time for Tincan Messages
+        "DirectIngress": True,      # Route Tincan messages from the listener thread instead of a CBT to self
+        "RecvBatchSize": 16,        # Max Tincan datagrams read per listener wakeup
+        "SendBatchSize": 32,        # Max Tincan requests queued before they are flushed
+        "TimerInterval": 1,         # Interval in sec at which request deadlines are checked
+        "RequestTimeout": 5,        # Seconds to wait for a Tincan response before the request is retried
+        "RequestRetries": 2,        # Max resends of a request listed in RetryCommands
+        "RetryBackoff": 2,          # Factor the timeout grows by with every resend
+        # Commands Tincan responds to, their responses are matched to the request by TransactionId
+        "TrackedCommands": ["CreateCtrlRespLink", "ConfigureLogging", "CreateVnet", "SetIgnoredNetInterfaces",
+                            "CreateTunnel", "ConnectTunnel", "QueryNodeInfo", "QueryLinkStats",
+                            "QueryCandidateAddressSet", "Echo"],
+        # Idempotent setup commands that are resent when no response arrives in time
+        "RetryCommands": ["CreateCtrlRespLink", "ConfigureLogging", "CreateVnet", "SetIgnoredNetInterfaces"],
         "ctrl_recv_port": 5801,     # Controller UDP Listening Port
         "ip6_prefix": "fd50:0dbc:41f2:4a3c",
         "localhost": "127.0.0.1",
@@ -60,19 +100,30 @@ CONFIG = {
         "InitialLinkTTL": 120,              # Initial Time to Live for a p2p link in sec
         "LinkPulse": 180,                   # Time to Live for an online p2p link in sec
         "MaxConnRetry": 5,                  # Max Connection Retry attempts for each p2p link
+        "MaxLinkPollInterval": 20,          # Max interval in sec between link state queries of a stable link,
+                                            # also bounds how late a change Tincan does not notify is detected
+        "LinkPollBackoff": 2,               # Factor the query interval grows by while the link state is unchanged
+        "LegacyCoreData": True,             # Send forwarded CBT core_data JSON encoded, as controllers predating
+                                            # the dict form expect, disable once all peers accept dicts
         "dependencies": ["Logger", "TincanInterface"]
     },
     "BroadcastForwarder": {
         "Enabled": True,
         "TimerInterval": 10,                # Timer thread interval in sec
+        "DedupeCapacity": 10000,            # Max broadcast message keys remembered to drop duplicates
+        "DedupeTTL": 30,                    # Seconds a broadcast message key is remembered
+        "LegacyBroadcastData": True,        # Send control data as the repr of the dict, as controllers predating
+                                            # bcastcodec expect, disable once all peers decode the codec frames
         "dependencies": ["Logger", "TincanInterface", "LinkManager"]
     },
     "ArpCache": {
         "Enabled": True,
+        "RunInProcess": False,              # Host the module in a worker process to use another core
         "dependencies": ["Logger", "TincanInterface", "LinkManager"]
     },
     "IPMulticast": {
         "Enabled": False,
+        "RunInProcess": False,              # Host the module in a worker process to use another core
         "dependencies": ["Logger", "TincanInterface", "LinkManager"]
     },
     "XmppClient": {
@@ -82,11 +133,25 @@ CONFIG = {
         "InitialAdvertismentDelay": 5,      # Initial delay for Peer XMPP messages
         "XmppAdvrtDelay": 5,                # Incremental delay for XMPP messages
         "MaxAdvertismentDelay": 30,         # Max XMPP Message delay
+        "JidCacheTTL": 300,                 # Seconds the JID of a peer UID is cached
+        "JidQueryInterval": 5,              # Min seconds between roster queries for the same unresolved UID
+        "PendingCBTCapacity": 32,           # Max CBTs held per peer UID while its JID is resolved
+        "PendingCBTTTL": 30,                # Seconds a CBT waits for its peer UID to be resolved
+        "ShareConnection": False,           # Serve the virtual networks using the same account and server over one
+                                            # connection, their stanzas are tagged with the vnet (VnetTag/TapName)
+        "BatchForwardedCBTs": False,        # Pack the CBTs forwarded to the same peer JID into one FORWARDED_CBTS
+                                            # stanza, controllers predating it drop these, enable once all peers
+                                            # accept FORWARDED_CBTS
+        "MaxBatchCBTs": 16,                 # Max CBTs packed into one stanza
+        "MaxBatchBytes": 32768,             # Max payload size of a stanza, a batch reaching it is sent
+        "MaxBatchDelay": 0,                 # Max sec a batch is held, 0 sends it at the end of the dispatch cycle
+        "AsyncOffload": True,               # Blocking module, runs on the asyncio runtime thread pool
         "dependencies": ["Logger", "TincanInterface", "LinkManager"]
     },
     "BaseTopologyManager": {
         "Enabled": True,
         "TimerInterval": 10,            # Timer thread interval in sec
+        "RunInProcess": False,          # Host the module in a worker process to use another core
         "dependencies": ["Logger", "TincanInterface", "XmppClient"]
     },
     "OverlayVisualizer": {
@@ -96,6 +161,7 @@ CONFIG = {
         #"TopologyDataQueryInterval": 5,             # Interval to query TopologyManager to get network stats
         #"WebServiceDataPostInterval": 5,            # Interval to send data to the visualizer
         "NodeName": "",                             # Node Name as seen from the UI
+        "AsyncOffload": True,                       # Blocking module, runs on the asyncio runtime thread pool
         "dependencies": ["Logger", "BaseTopologyManager"]
     },
     "StatReport": {
@@ -103,6 +169,7 @@ CONFIG = {
         "TimerInterval": 200,
         "StatServerAddress": "metrics.ipop-project.org",
         "StatServerPort": 8080,
+        "AsyncOffload": True,
         "dependencies": ["Logger"]
     }
 }
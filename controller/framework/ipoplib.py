@@ -20,182 +20,79 @@
 # THE SOFTWARE.
 
 import sys
+import json
+import binascii
+import controller.framework.jsoncodec as jsoncodec
 py_ver = sys.version_info[0]
 
-RESPLINK = {
-    "IPOP": {
-        "ProtocolVersion": 4,
-        "TransactionId": 0,
-        "ControlType": "TincanRequest",
-        "Request": {
-            "Command": "CreateCtrlRespLink",
-            "AddressFamily": "af_inetv6",
-            "Protocol": "proto_datagram",
-            "IP": "::1",
-            "Port": 5801
-            }
-    }
-}
-LOGCFG = {
-    "IPOP": {
-        "ProtocolVersion": 4,
-        "TransactionId": 0,
-        "ControlType": "TincanRequest",
-        "Request": {
-          "Command": "ConfigureLogging",
-          "Level": "WARNING",
-          "Device": "FILE",
-          "Directory": "./logs/",
-          "Filename": "tincan_log",
-          "MaxArchives": 10,
-          "MaxFileSize": 1048576
-        }
-    }
-}
-LSTATE = {
-    "IPOP": {
-        "ProtocolVersion": 4,
-        "TransactionId": 0,
-        "ControlType": "TincanRequest",
-        "Request": {
-          "Command": "QueryNodeInfo",
-          "InterfaceName": "ipop_tap0",
-          "MAC": ""
-        }
-    }
-}
-ECHO = {
-  "IPOP": {
-      "ProtocolVersion": 4,
-      "TransactionId": 0,
-      "ControlType": "TincanRequest",
-      "Request": {
-        "Command": "Echo",
-        "InterfaceName": "ipop_tap0",
-        "Message": "echo message"
-      }
-  }
-}
-VNET = {
-    "IPOP": {
-        "ProtocolVersion": 4,
-        "ControlType": "TincanRequest",
-        "TransactionId": 0,
-        "Request": {
-          "Command": "CreateVnet",
-          "InterfaceName": "ipop_tap0",
-          "Description": "My Devices",
-          "LocalVirtIP4": "",
-          "LocalPrefix4": "",
-          "MTU4": "",
-          "LocalUID": "",
-          "StunAddress": "",
-          "TurnAddress": "",
-          "TurnUser": "",
-          "TurnPass": "",
-          "AutoTrimEnabled": False,
-          "IPMappingEnabled": False
-        }
-    }
-}
-LCAS = {
-    "IPOP": {
-        "ProtocolVersion": 4,
-        "TransactionId": 0,
-        "ControlType": "TincanRequest",
-        "Request": {
-          "Command": "CreateTunnel",
-          "InterfaceName": "ipop_tap0",
-          "EncryptionEnabled": True,
-          "PeerInfo": {
-            "VIP4": "",
-            "UID": "",
-            "MAC": "",
-            "Fingerprint": ""
-          }
-        }
-    }
-}
-CONCT = {
-    "IPOP": {
-        "ProtocolVersion": 4,
-        "TransactionId": 0,
-        "ControlType": "TincanRequest",
-        "Request": {
-          "Command": "ConnectTunnel",
-          "InterfaceName": "ipop_tap0",
-          "EncryptionEnabled": True,
-          "PeerInfo": {
-            "VIP4": "",
-            "UID": "",
-            "MAC": "",
-            "Fingerprint": ""
-          }
-        }
-    }
-}
-IGNORE = {
-    "IPOP": {
-        "ProtocolVersion": 4,
-        "TransactionId": 0,
-        "ControlType": "TincanRequest",
-        "Request": {
-          "Command": "SetIgnoredNetInterfaces",
-          "InterfaceName": "ipop_tap0",
-          "IgnoredNetInterfaces": []
-        }
-    }    
-}
-ICC = {
-    "IPOP": {
-      "ProtocolVersion": 4,
-      "Tag": 100020,
-      "ControlType": "TincanRequest",
-      "Request": {
-        "Command": "ICC",
-        "RecipientMac": "",
-        "InterfaceName": "ipop_tap0",
-        "Recipient": "peer_uid",
-        "Data": "encoded string"
-      }
-     }
-  }
-PACKET = {
-    "IPOP": {
-        "ProtocolVersion": 4,
-        "TransactionId": 0,
-        "ControlType": "TincanRequest",
-        "Request": {
-            "Command": "UpdateRoutes",
-            "InterfaceName": "ipop_tap0",
-            "Data": "encoded_string"
-        }
-     }
-  }
-INSERT_TAP_PACKET = {
-    "IPOP": {
-        "ProtocolVersion": 4,
-        "TransactionId": 0,
-        "ControlType": "TincanRequest",
-        "Request": {
-            "Command": "InjectFrame",
-            "InterfaceName": "ipop_tap0",
-            "Data": "encoded_string"
-        }
-     }
-  }
-REMOVE = {
-    "IPOP": {
-        "ProtocolVersion": 4,
-        "TransactionId": 0,
-        "ControlType": "TincanRequest",
-        "Request": {
-            "Command": "TrimTunnel",
-            "InterfaceName": "ipop_tap0",
-            "MAC": ""
-        }
-     }
-  }
+
+class TincanRequest(object):
+    '''
+    Immutable Tincan request template. The JSON text of the message envelope and of every default field is
+    encoded once when the template is created and build() serializes only the fields passed to it, so any number
+    of threads can build requests from the same template without locking.
+    '''
+    __slots__ = ("command", "_fields", "_rest", "_head", "_mid")
+
+    def __init__(self, command, envelope=None, **defaults):
+        self.command = command
+        # Encoded '"name": value' text of each default field
+        self._fields = tuple((key, "{0}: {1}".format(json.dumps(key), json.dumps(value)))
+                             for key, value in sorted(defaults.items()))
+        # Names of the fields passed to build() -> encoded text of the defaults they leave in place
+        self._rest = {}
+        static_fields = "".join("{0}: {1}, ".format(json.dumps(key), json.dumps(value))
+                                for key, value in sorted((envelope or {}).items()))
+        self._head = '{"IPOP": {"ProtocolVersion": 4, "ControlType": "TincanRequest", ' + static_fields + \
+                     '"TransactionId": '
+        self._mid = ', "Request": {"Command": ' + json.dumps(command)
+
+    # Return the JSON encoded request, fields override the template defaults
+    def build(self, transaction_id, owner=None, **fields):
+        parts = [self._head, str(int(transaction_id))]
+        if owner is not None:
+            parts.append(', "Owner": ' + json.dumps(owner))
+        parts.append(self._mid)
+        names = tuple(fields)
+        rest = self._rest.get(names)
+        if rest is None:
+            # Computing the same entry twice is harmless, so the cache needs no lock
+            rest = self._rest[names] = "".join(", " + text for key, text in self._fields if key not in fields)
+        parts.append(rest)
+        if fields:
+            parts.append(", " + jsoncodec.dumps(fields)[1:])
+        else:
+            parts.append("}")
+        parts.append("}}")
+        return "".join(parts)
+
+
+def _peer_info():
+    return {"VIP4": "", "UID": "", "MAC": "", "Fingerprint": ""}
+
+
+RESPLINK = TincanRequest("CreateCtrlRespLink", AddressFamily="af_inetv6", Protocol="proto_datagram", IP="::1",
+                         Port=5801)
+LOGCFG = TincanRequest("ConfigureLogging", Level="WARNING", Device="FILE", Directory="./logs/",
+                       Filename="tincan_log", MaxArchives=10, MaxFileSize=1048576)
+LSTATE = TincanRequest("QueryNodeInfo", InterfaceName="ipop_tap0", MAC="")
+ECHO = TincanRequest("Echo", InterfaceName="ipop_tap0", Message="echo message")
+VNET = TincanRequest("CreateVnet", InterfaceName="ipop_tap0", Description="My Devices", LocalVirtIP4="",
+                     LocalPrefix4="", MTU4="", LocalUID="", StunAddress="", TurnAddress="", TurnUser="",
+                     TurnPass="", AutoTrimEnabled=False, IPMappingEnabled=False)
+LCAS = TincanRequest("CreateTunnel", InterfaceName="ipop_tap0", EncryptionEnabled=True, PeerInfo=_peer_info())
+CONCT = TincanRequest("ConnectTunnel", InterfaceName="ipop_tap0", EncryptionEnabled=True, PeerInfo=_peer_info())
+IGNORE = TincanRequest("SetIgnoredNetInterfaces", InterfaceName="ipop_tap0", IgnoredNetInterfaces=[])
+ICC = TincanRequest("ICC", envelope={"Tag": 100020}, RecipientMac="", InterfaceName="ipop_tap0",
+                    Recipient="peer_uid", Data="encoded string")
+PACKET = TincanRequest("UpdateRoutes", InterfaceName="ipop_tap0", Data="encoded_string")
+INSERT_TAP_PACKET = TincanRequest("InjectFrame", InterfaceName="ipop_tap0", Data="encoded_string")
+REMOVE = TincanRequest("TrimTunnel", InterfaceName="ipop_tap0", MAC="")
+ADD_FORWARDING_RULE = TincanRequest("UpdateMap", InterfaceName="ipop_tap0", Routes=[])
+DELETE_FORWARDING_RULE = TincanRequest("RemoveRoutes", InterfaceName="ipop_tap0", Routes=[])
+LINK_STATS = TincanRequest("QueryLinkStats", InterfaceName="ipop_tap0", MAC="")
+QUERY_CAS = TincanRequest("QueryCandidateAddressSet", InterfaceName="ipop_tap0", MAC="")
+
 RESP = {
     "IPOP": {
         "ProtocolVersion": 4,
@@ -210,57 +107,7 @@ RESP = {
     }
 }
 
-ADD_FORWARDING_RULE = {
-        "IPOP": {
-            "ProtocolVersion": 4,
-            "TransactionId": 0,
-            "ControlType": "TincanRequest",
-            "Request": {
-                "Command": "UpdateMap",
-                "InterfaceName": "ipop_tap0",
-                "Routes": []
-                }
-        }
-}
 
-DELETE_FORWARDING_RULE = {
-        "IPOP": {
-            "ProtocolVersion": 4,
-            "TransactionId": 0,
-            "ControlType": "TincanRequest",
-            "Request": {
-                "Command": "RemoveRoutes",
-                "InterfaceName": "ipop_tap0",
-                "Routes": []
-                }
-        }
-}
-LINK_STATS = {
-    "IPOP": {
-        "ProtocolVersion": 4,
-        "TransactionId" : 0,
-        "Owner" : "ModuleName",
-        "ControlType": "TincanRequest",
-        "Request": {
-        "Command": "QueryLinkStats",
-        "InterfaceName": "ipop_tap0",
-        "MAC" : ""
-        }
-    }
-}
-QUERY_CAS = {
-    "IPOP": {
-        "ProtocolVersion": 4,
-        "TransactionId" : 0,
-        "Owner" : "",
-        "ControlType": "TincanRequest",
-        "Request": {
-          "Command": "QueryCandidateAddressSet",
-          "InterfaceName": "ipop_tap0",
-          "MAC" : ""
-        }
-    }
-}
 def ip4_a2hex(ipstr):
     return "".join(hex(int(x, 10))[2:] for x in ipstr.split("."))
 
@@ -320,15 +167,12 @@ def uid_b2a(bin_uid):
 
 
 def hexstr2b(hexstr):
-    if py_ver == 3:
-        return b''.join(int(hexstr[i:i+2], 16).to_bytes(1, byteorder='big') for i in range(0, len(hexstr), 2))
-    else:
-        return hexstr.decode('hex')
+    return binascii.unhexlify(hexstr)
 
 
 def b2hexstr(binary):
     if py_ver == 3:
-        return ''.join("%02x" % int.from_bytes(binary[i:i+1], byteorder='big') for i in range(0, len(binary), 1))
+        return binascii.hexlify(binary).decode("ascii")
     else:
         return binary.encode('hex')
 
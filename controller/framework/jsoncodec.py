@@ -0,0 +1,112 @@
+# ipop-project
+# Copyright 2016, University of Florida
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+# JSON codec used for Tincan and XMPP payloads. An accelerated backend (orjson, msgspec or ujson) is
+# used when it is installed, otherwise the codec falls back to the standard library json module.
+
+import sys
+import json
+from controller.framework.TapFrame import json_default
+
+py_ver = sys.version_info[0]
+
+# Backends in order of preference for "auto"
+BACKENDS = ["orjson", "msgspec", "ujson", "json"]
+
+
+def _stdlib_codec():
+    def dumps(obj):
+        return json.dumps(obj, default=json_default)
+
+    def loads(data):
+        if py_ver == 3 and isinstance(data, (bytes, bytearray)):
+            data = data.decode("utf-8")
+        return json.loads(data)
+    return dumps, loads
+
+
+def _orjson_codec():
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj, default=json_default).decode("utf-8")
+    return dumps, orjson.loads
+
+
+def _msgspec_codec():
+    import msgspec
+    encoder = msgspec.json.Encoder(enc_hook=json_default)
+    decoder = msgspec.json.Decoder()
+
+    def dumps(obj):
+        return encoder.encode(obj).decode("utf-8")
+    return dumps, decoder.decode
+
+
+def _ujson_codec():
+    import ujson
+    # the default hook is only supported by recent ujson releases
+    ujson.dumps({}, default=json_default)
+
+    def dumps(obj):
+        return ujson.dumps(obj, default=json_default)
+    return dumps, ujson.loads
+
+
+_FACTORIES = {
+    "json": _stdlib_codec,
+    "orjson": _orjson_codec,
+    "msgspec": _msgspec_codec,
+    "ujson": _ujson_codec
+}
+
+BACKEND = "json"
+dumps, loads = _stdlib_codec()
+
+
+# Load a codec backend by name without installing it, raises ImportError/TypeError when unavailable
+def load_backend(name):
+    return _FACTORIES[name]()
+
+
+# Select the process wide codec backend; "auto" picks the fastest installed one. Returns the backend name.
+def select_backend(name="auto"):
+    global BACKEND, dumps, loads
+    candidates = BACKENDS if name in [None, "", "auto"] else [name, "json"]
+    for candidate in candidates:
+        try:
+            dumps, loads = load_backend(candidate)
+            BACKEND = candidate
+            break
+        except (ImportError, TypeError, AttributeError, KeyError):
+            continue
+    return BACKEND
+
+
+def available_backends():
+    names = []
+    for name in BACKENDS:
+        try:
+            load_backend(name)
+            names.append(name)
+        except (ImportError, TypeError, AttributeError):
+            pass
+    return names
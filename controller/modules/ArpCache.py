@@ -1,4 +1,5 @@
 from controller.framework.ControllerModule import ControllerModule
+from controller.framework.TapFrame import ZERO_MAC
 
 
 class ArpCache(ControllerModule):
@@ -58,21 +59,11 @@ class ArpCache(ControllerModule):
         # Process ARP Packets received
         elif cbt.action == "ARPPacket":
             self.registerCBT('Logger', 'debug', "ARP Packet: {0}".format(str(cbt.data)))
-            # Variables to store length of MACAddress and IPV4 Address
-            maclen = int(frame[36:38], 16)
-            iplen = int(frame[38:40], 16)
             # Variable to store operation 1- ARP Request 2- ARP Reply
-            op = int(frame[40:44], 16)
-            srcmacindex = 44 + 2 * maclen
-            srcmac = frame[44:srcmacindex]
-            srcipindex = srcmacindex + 2 * iplen
-            # Converting Source IPV4 address in hex format to ASCII format (XXX.XXX.XXX.XXX)
-            srcip = '.'.join(str(int(i, 16)) for i in [frame[srcmacindex:srcipindex][i:i + 2] for i in range(0, 8, 2)])
-            destmacindex = srcipindex + 2 * maclen
-            destmac = frame[srcipindex:destmacindex]
-            destipindex = destmacindex + 2 * iplen
-            # Converting Destination IPV4 address in hex format to ASCII format (XXX.XXX.XXX.XXX)
-            destip = '.'.join(str(int(i, 16)) for i in [frame[destmacindex:destipindex][i:i + 2] for i in range(0, 8, 2)])
+            op = frame.arp_op
+            # ARP header fields are decoded once by TincanInterface when the frame is received
+            srcmac, srcip = frame.arp_src_mac, frame.src_ip
+            destmac, destip = frame.arp_dst_mac, frame.dst_ip
 
             self.registerCBT('Logger', 'debug', "Source MAC:: " + str(srcmac))
             self.registerCBT('Logger', 'debug', "Source IP Address::  " + str(srcip))
@@ -85,7 +76,7 @@ class ArpCache(ControllerModule):
             if cbt.data["type"] == "local":
                 mac_ip_table = {}
                 # Update Local MAC-IP Table with Unmanaged node MAC and IP details
-                if int(srcmac, 16) != 0:
+                if srcmac != ZERO_MAC:
                     interface_details["local_mac_ip_table"][srcmac] = srcip
                     mac_ip_table[srcmac] = srcip
                 UpdateBTMMacUIDTable = {
@@ -97,7 +88,7 @@ class ArpCache(ControllerModule):
             else:
                 uid = cbt.data["init_uid"]          # Get the remote control UID
                 mac_ip_table = {}
-                if int(srcmac, 16) != 0:
+                if srcmac != ZERO_MAC:
                     mac_ip_table[srcmac] = srcip
 
                 UpdateBTMMacUIDTable = {
@@ -122,7 +113,7 @@ class ArpCache(ControllerModule):
         # ARP Reply Packet: Send ARP Reply as unicast to the source and Broadcast local MAC-IP
         # Table for setting up routing rules in the Tincan
         else:
-            if int(srcmac, 16) != 0:
+            if srcmac != ZERO_MAC:
                 interface_details["local_mac_ip_table"][srcmac] = srcip
             # Send ARP Reply as a Unicast packet
             self.registerCBT('BaseTopologyManager', 'TINCAN_PACKET', cbt.data)
@@ -20,6 +20,8 @@
 # THE SOFTWARE.
 
 from controller.framework.ControllerModule import ControllerModule
+from controller.framework.RoutingIndex import RoutingIndex
+from controller.framework.AddressTable import AddressTable
 from controller.framework.CFx import CFX
 import time
 import math
@@ -31,6 +33,10 @@ class BaseTopologyManager(ControllerModule, CFX):
         self.CFxHandle = CFxHandle
         # BTM internal Table
         self.ipop_vnets_details = {}
+        # Online peers of every virtual network indexed for next hop lookups
+        self.routing_index = {}
+        # MAC/IP addresses reachable through each UID of every virtual network
+        self.address_tables = {}
         # Query CFX to get properties of virtual networks configured by the user
         tincanparams = self.CFxHandle.queryParam("TincanInterface", "Vnets")
         # Iterate across the virtual networks to get XMPPModuleName and TAPName
@@ -43,11 +49,10 @@ class BaseTopologyManager(ControllerModule, CFX):
             vnet_details["ipop_state"] = {}
             vnet_details["discovered_nodes"] = []
             vnet_details["successor"] = {}
-            vnet_details["ip_uid_table"] = {}
-            vnet_details["uid_mac_table"] = {}
-            vnet_details["mac_uid_table"] = {}
             vnet_details["link_type"] = {}
             vnet_details["peer_uid_sendmsgcount"] = {}
+            self.routing_index[interface_name] = RoutingIndex()
+            self.address_tables[interface_name] = AddressTable()
             vnet_details["xmpp_client_code"] = tincanparams[k]["XMPPModuleName"]
         tincanparams = None
 
@@ -57,6 +62,8 @@ class BaseTopologyManager(ControllerModule, CFX):
             # Invoke Tincan to get Local node state
             self.registerCBT('TincanInterface', 'DO_GET_STATE', {"interface_name": interface_name, "MAC": ""})
             self.CFxHandle.StartSubscription(self.ipop_vnets_details[interface_name]["xmpp_client_code"], "PEER_PRESENCE_NOTIFICATION")
+        # Link state transitions are pushed by LinkManager between the periodic link detail queries
+        self.CFxHandle.StartSubscription("LinkManager", "LINK_STATE_CHANGE")
 
         self.registerCBT('Logger', 'info', "{0} Loaded".format(self.ModuleName))
         self.timer_method()
@@ -147,28 +154,27 @@ class BaseTopologyManager(ControllerModule, CFX):
                 # Update Link details (E.g TTL, Status)
                 for peeruid in current_links:
                     vnet_details[vnet_details["link_type"][peeruid]].update({peeruid: data[peeruid]})
+                    self.update_route(interface_name, peeruid)
             else:
                 # Extract nodes in current_links not present in the updated_links. These are the deleted links
                 deleted_links = set(current_links) - set(updated_links)
                 for peeruid in deleted_links:
+                    self.routing_index[interface_name].discard(peeruid)
                     # Deleted the Peer UID from BTM's link table
                     if peeruid in vnet_details[vnet_details["link_type"][peeruid]]:
                         del vnet_details[vnet_details["link_type"][peeruid]][peeruid]
-                    if peeruid in vnet_details["uid_mac_table"]:
-                        # Extract unmanaged nodes behind the Peer UID
-                        unmanaged_node_mac_list = vnet_details["uid_mac_table"][peeruid]
-                        # Deleted the Peer UID entry from the UID_MAC_TABLE
-                        del vnet_details["uid_mac_table"][peeruid]
-                        # Iterate across the unmanaged node mac list and remove it from MAC_UID Table
-                        for node_mac in unmanaged_node_mac_list:
-                            del vnet_details["mac_uid_table"][node_mac]
-                    # Iterate across IP_UID Table and remove all keys whose value is the Peer UID
-                    for ip, uid in list(vnet_details["ip_uid_table"].items()):
-                        if uid == peeruid:
-                            del vnet_details["ip_uid_table"][ip]
+                    # Remove the MAC and IP addresses of the unmanaged nodes behind the Peer UID
+                    self.address_tables[interface_name].remove_uid(peeruid)
                     # Delete the entry from Peer UID sent msg table
                     if peeruid in vnet_details["peer_uid_sendmsgcount"]:
                         del vnet_details["peer_uid_sendmsgcount"][peeruid]
+        # CBT to apply a p2p link state transition published by LinkManager
+        elif cbt.action == "LINK_STATE_CHANGE":
+            peeruid = msg["uid"]
+            link_type = vnet_details["link_type"].get(peeruid)
+            if link_type is not None and peeruid in vnet_details[link_type]:
+                vnet_details[link_type][peeruid]["status"] = msg["status"]
+                self.update_route(interface_name, peeruid)
         elif cbt.action == "XMPP_MSG":
             # Remove Offline peer node from Discovered node List
             if msg_type == "offline_peer":
@@ -185,9 +191,7 @@ class BaseTopologyManager(ControllerModule, CFX):
             if msg_type == "local_state":
                 vnet_details["ipop_state"] = msg
                 vnet_details["mac"] = msg["mac"]
-                vnet_details["mac_uid_table"][msg["mac"]] = msg["_uid"]
-                if msg["_uid"] not in vnet_details["uid_mac_table"].keys():
-                    vnet_details["uid_mac_table"][msg["_uid"]] = [msg["mac"]]
+                self.address_tables[interface_name].add_mac(msg["_uid"], msg["mac"])
             else:
                 self.setGeoIP(interface_name, msg["cas"])
         elif cbt.action == "UPDATE_MAC_UID_IP_TABLES":
@@ -195,17 +199,9 @@ class BaseTopologyManager(ControllerModule, CFX):
             uid = msg["uid"]
             localuid = vnet_details["ipop_state"]["_uid"]
 
-            # check whether an entry exists for UID, if NOT create an entry in UID_MAC Table
-            if uid not in list(vnet_details["uid_mac_table"].keys()):
-                vnet_details["uid_mac_table"][uid] = []
-
             self.registerCBT('Logger', 'debug', 'UpdateMACUIDMessage:::' + str(msg))
             # Update the IP_UID and MAC_UID Table with the Unmanaged node details
-            for mac, ip in msg["mac_ip_table"].items():
-                if mac not in vnet_details["uid_mac_table"][uid]:
-                    vnet_details["uid_mac_table"][uid].append(mac)
-                    vnet_details["ip_uid_table"].update({ip: uid})
-                vnet_details["mac_uid_table"].update({mac: uid})
+            self.address_tables[interface_name].update(uid, msg["mac_ip_table"])
         elif cbt.action == "ICC_CONTROL":
             msg_type = msg.get("msg_type", None)
             # advertisement of nearby nodes
@@ -244,9 +240,9 @@ class BaseTopologyManager(ControllerModule, CFX):
                 successors = []
 
                 # Iterate over the IP-UID Table to retrieve Unmanaged node IP list
-                for ip, uid in list(vnet_details["ip_uid_table"].items()):
+                for ip in self.address_tables[interface_name].get_ips(local_uid):
                     # check whether the IP is that of the local node
-                    if ip != local_ip and uid == local_uid and ip != "0.0.0.0":
+                    if ip != local_ip and ip != "0.0.0.0":
                         unmanaged_node_list.append(ip)
                 # Extract the online successor list from the BTM Table
                 for successor in list(vnet_details["successor"].keys()):
@@ -269,7 +265,7 @@ class BaseTopologyManager(ControllerModule, CFX):
                     "GeoIP": geoip,
                     "mac": vnet_details["mac"],
                     "state": vnet_details["p2p_state"],
-                    "macuidmapping": vnet_details["uid_mac_table"],
+                    "macuidmapping": self.address_tables[interface_name].get_mac_mapping(),
                     #"unmanagednodelist": unmanaged_node_list,
                     "links": {
                         "successor": successors,
@@ -282,65 +278,48 @@ class BaseTopologyManager(ControllerModule, CFX):
         elif cbt.action == "TINCAN_PACKET":
             reqdata = cbt.data
             data = reqdata["dataframe"]
-            m_type = reqdata["m_type"]
             # ignore packets when not connected to the overlay
             if vnet_details["p2p_state"] != "connected":
                 return
             # Check the Packet type whether it is an ARP or IP packet and extract destination IP and MAC for routing
-            if m_type == "ARP":
-                maclen = int(data[36:38], 16)
-                iplen = int(data[38:40], 16)
-                srcmacindex = 44 + 2 * maclen
-                srcmac = data[44:srcmacindex]
-                srcipindex = srcmacindex + 2 * iplen
-                destmacindex = srcipindex + 2 * maclen
-                destmac = data[srcipindex:destmacindex]
-                destipindex = destmacindex + 2 * iplen
-                dst_ip = '.'.join(str(int(i, 16))
-                                  for i in [data[destmacindex:destipindex][i:i + 2] for i in range(0, 8, 2)])
+            if data.is_arp:
+                destmac, srcmac = data.arp_dst_mac, data.arp_src_mac
             else:
-                # Check whether the packet is IPv4 or IPv6
-                if data[24:28] == "0800":
-                    dst_ip = '.'.join(str(int(i, 16)) for i in [data[60:68][i:i + 2] for i in range(0, 8, 2)])
-                else:
-                    dst_ip = data[76: 108]
-                destmac, srcmac = data[0:12], data[12:24]
-
-            ip4_uid_table = vnet_details["ip_uid_table"]
-            # If the destination IP exists in IP_UID_Table, if YES get the UID and send the message to the Peer
-            if dst_ip in list(ip4_uid_table.keys()):
-                dst_uid = ip4_uid_table[dst_ip]
-            # If the destination MAC exists in MAC_UID_Table, if YES get the UID and send the message to the Peer
-            elif destmac in vnet_details["mac_uid_table"].keys():
-                dst_uid = vnet_details["mac_uid_table"][destmac]
-            # Check if it is an IPv4 Multicast packet
-            elif destmac[0:6] == "01005E":
-                self.registerCBT("BroadcastForwarder", "BroadcastPkt", {"dataframe": data, "interface_name": interface_name,
-                                                                   "type": "local"})
-                return
-            # Check if it is an IPv6 Multicast packet
-            elif destmac[0:4] == "3333":
-                self.registerCBT("BroadcastForwarder", "BroadcastPkt", {"dataframe": data, "interface_name": interface_name,
-                                                                   "type": "local"})
-                return
-            # Packet is broadcast packet send it to Broadcast module
-            elif destmac == "FFFFFFFFFFFF":
-                datapacket = {
-                    "dataframe": data,
-                    "interface_name": interface_name,
-                }
-                # Check whether Packet has been generated from the local network interface
-                if reqdata.get("type") == "remote":
-                    datapacket["type"] = "remote"
+                destmac, srcmac = data.dst_mac, data.src_mac
+
+            # Resolve the destination UID by the destination IP or else the destination MAC
+            dst_uid = self.address_tables[interface_name].lookup(data)
+            if dst_uid is None:
+                # Check if it is an IPv4 Multicast packet
+                if destmac[0:6] == "01005E":
+                    self.registerCBT("BroadcastForwarder", "BroadcastPkt", {"dataframe": data,
+                                                                       "interface_name": interface_name,
+                                                                       "type": "local"})
+                    return
+                # Check if it is an IPv6 Multicast packet
+                elif destmac[0:4] == "3333":
+                    self.registerCBT("BroadcastForwarder", "BroadcastPkt", {"dataframe": data,
+                                                                       "interface_name": interface_name,
+                                                                       "type": "local"})
+                    return
+                # Packet is broadcast packet send it to Broadcast module
+                elif destmac == "FFFFFFFFFFFF":
+                    datapacket = {
+                        "dataframe": data,
+                        "interface_name": interface_name,
+                    }
+                    # Check whether Packet has been generated from the local network interface
+                    if reqdata.get("type") == "remote":
+                        datapacket["type"] = "remote"
+                    else:
+                        datapacket["type"] = "local"
+                    # Route the packet to Broadcast module for broadcasting
+                    self.registerCBT("BroadcastForwarder", "BroadcastPkt", datapacket)
+                    return
                 else:
-                    datapacket["type"] = "local"
-                # Route the packet to Broadcast module for broadcasting
-                self.registerCBT("BroadcastForwarder", "BroadcastPkt", datapacket)
-                return
-            else:
-                log = "recv illegal tincan_packet: src={0} dst={1}".format(srcmac, destmac)
-                self.registerCBT('Logger', 'info', log)
-                return
+                    log = "recv illegal tincan_packet: src={0} dst={1}".format(srcmac, destmac)
+                    self.registerCBT('Logger', 'info', log)
+                    return
             # Message routing to one of the local node attached to this UID
             if dst_uid == vnet_details["ipop_state"]["_uid"]:
                 network_inject_message = {
@@ -392,21 +371,8 @@ class BaseTopologyManager(ControllerModule, CFX):
         # find peer that is successively closest to and less-than-or-equal-to the designated UID
         vnet_details = self.ipop_vnets_details[interface_name]
         uid = vnet_details["ipop_state"]["_uid"]
-        nxt_uid = uid
-        online_peer_list = list(vnet_details["successor"].keys())# + list(vnet_details["chord"].keys()) +\
-            #list(vnet_details["on_demand"].keys())
-        # Iterate across the Peer List
-        for peer in sorted(online_peer_list):
-            # Check if the link to Peer is Online else dont forward the message to the Peer UID
-            if self.is_link_connected(peer, interface_name):
-                # Check whether the Peer is the dst_uid of the message, If YES terminate the loop
-                # and set the UID as the next_uid
-                if peer == dst_uid:
-                    nxt_uid = peer
-                    break
-                # Check whether the UID is closest to the destination node
-                if self.closer(uid, peer, dst_uid):
-                    nxt_uid = peer
+        # Only peers with an online link are in the routing index
+        nxt_uid = self.routing_index[interface_name].next_hop(uid, dst_uid)
 
         # packet is intended specifically to the destination node
         if fwd_type == "exact":
@@ -416,8 +382,8 @@ class BaseTopologyManager(ControllerModule, CFX):
             # this is the closest node but not the destination; drop packet
             elif nxt_uid == uid:
                 # check if atleast one online peer exists
-                if len(online_peer_list) > 0:
-                    nxt_uid = max(online_peer_list)
+                if len(vnet_details["successor"]) > 0:
+                    nxt_uid = max(vnet_details["successor"])
                 else:
                     return False
         # packet is intended to the node closest to the designated node
@@ -429,6 +395,10 @@ class BaseTopologyManager(ControllerModule, CFX):
                          "dst_uid": nxt_uid, "msg": msg, "interface_name": interface_name})
         return False
 
+    # Add or remove the peer from the routing index after the state of its link changed
+    def update_route(self, interface_name, uid):
+        self.routing_index[interface_name].set_online(uid, self.is_link_connected(uid, interface_name))
+
     # Checks if the link to Peer UID is connected
     def is_link_connected(self, uid, interface_name):
         # Checks whether the Peer UID exists in link_type Table
@@ -20,7 +20,11 @@
 # THE SOFTWARE.
 
 import sys,time
+from controller.framework.BroadcastTree import BroadcastTree
 from controller.framework.ControllerModule import ControllerModule
+from controller.framework.DedupeCache import DedupeCache
+from controller.framework.TapFrame import TapFrame
+import controller.framework.bcastcodec as bcastcodec
 
 
 py_ver = sys.version_info[0]
@@ -29,8 +33,10 @@ class BroadcastForwarder(ControllerModule):
         super(BroadcastForwarder,self).__init__(CFxHandle,  paramDict,ModuleName)
         # Table to store VNet specific network information
         self.ipop_vnets_details = {}
-        # List to store timestamp of all messages seen by the node and drop any duplicate messages
-        self.prevtimestamp = []
+        # Keys of the broadcast messages seen by the node, used to drop any duplicate messages
+        self.seen_messages = DedupeCache(self.CMConfig["DedupeCapacity"], self.CMConfig["DedupeTTL"])
+        # Sequence number of the broadcasts originated by this node, tells apart broadcasts sent in the same ms
+        self.broadcast_seq = 0
      
     def initialize(self):
         # Query CFX to get properties of virtual networks configured by the user
@@ -43,31 +49,35 @@ class BroadcastForwarder(ControllerModule):
             self.ipop_vnets_details[interface_name]["mac"] = ""
             # Stores local node's mac address obtained from LinkManager
             self.ipop_vnets_details[interface_name]["peerlist"] = []
+            # Forwarding fan-out of the broadcasts computed from the online peers
+            self.ipop_vnets_details[interface_name]["tree"] = BroadcastTree(tincanparams[k]["uid"])
         tincanparams = None
 
         self.registerCBT('Logger', 'info', "{0} Loaded".format(self.ModuleName))
 
-    # Method to store timestamp of messages processed to avoid duplicates
-    def inserttimestamp(self, msgtime):
-        # Check whether the length has exceeded the max value, if Yes, clean the list
-        if len(self.prevtimestamp) < 10000:
-            self.prevtimestamp.append(msgtime)
-        else:
-            self.prevtimestamp = []
-            self.prevtimestamp.append(msgtime)
-
     def processCBT(self, cbt):
         # CBT gets Online Peerlist and MAC from BTM
         if cbt.action == 'ONLINE_PEERLIST':
             interface_name = cbt.data.get("interface_name")
-            self.ipop_vnets_details[interface_name]["peerlist"] = list(sorted(cbt.data['peerlist']))
-            self.ipop_vnets_details[interface_name]["mac"] = cbt.data.get("mac", None)
+            vnet_details = self.ipop_vnets_details[interface_name]
+            vnet_details["peerlist"] = list(sorted(cbt.data['peerlist']))
+            vnet_details["mac"] = cbt.data.get("mac", None)
+            # The cached forwarding fan-out is dropped only when the online peers changed
+            if vnet_details["tree"].update(vnet_details["uid"], vnet_details["peerlist"], cbt.data.get("peer_macs")):
+                self.registerCBT('Logger', 'debug', "Broadcast fan-out of {0} reset for online peers {1}"
+                                 .format(interface_name, vnet_details["peerlist"]))
         # CBT to process network packets broadcasted over p2plink
         elif cbt.action == 'BroadcastPkt':
             self.sendtopeer(cbt.data, "BroadcastPkt")
         # CBT to process JSON data broadcasted over p2plink
         elif cbt.action == 'BroadcastData':
             self.sendtopeer(cbt.data, "BroadcastData")
+        elif cbt.action == 'GET_BROADCAST_STATS':
+            self.registerCBT(cbt.initiator, 'BROADCAST_STATS', {
+                "dedupe": self.seen_messages.get_stats(),
+                "fanout": dict((interface_name, vnet_details["tree"].get_stats())
+                               for interface_name, vnet_details in self.ipop_vnets_details.items())
+            })
         else:
             log = '{0}: unrecognized CBT message {1} received from {2}.Data:: {3}' \
                 .format(cbt.recipient, cbt.action, cbt.initiator, cbt.data)
@@ -82,17 +92,17 @@ class BroadcastForwarder(ControllerModule):
             if data["type"] == "local":
                 # Message originated at this node. Pass to all the Peers (with uid greater than itself).
                 self.registerCBT('Logger', 'debug', "Broadcast message obtained from the local Tap interface")
-                self.sendto_all_peers(sorted(self.ipop_vnets_details[interface_name]["peerlist"]),
-                                       data["dataframe"], datype, data["interface_name"])
+                self.sendto_all_peers(data["dataframe"], datype, data["interface_name"])
             else:
                 messagetime = data["put_time"]
-                # Check for duplicate broadcast message from different sources
-                if self.prevtimestamp.count(messagetime) == 0:
-                    self.inserttimestamp(messagetime)
+                # Check for duplicate broadcast message from different sources, controllers predating the
+                # sequence number only send the timestamp
+                seq = data.get("seq")
+                if not self.seen_messages.seen((data["init_uid"], messagetime, seq)):
                     # Message originated at some other node. Pass to peers upto the incoming successor uid.
                     self.registerCBT('Logger', 'debug', "Broadcast message received from peer node.")
-                    self.sendto_peer(data["dataframe"], data["init_uid"], data["peer_list"], messagetime, datype,
-                                 data["interface_name"])
+                    self.sendto_peer(data["dataframe"], data["init_uid"], data["peer_list"], messagetime, seq, datype,
+                                     data["interface_name"])
                     # Passing the message to itself.
                     self.insertnetworkpacket(data, data["message_type"])
         else:
@@ -100,7 +110,17 @@ class BroadcastForwarder(ControllerModule):
             # if no online peers exists in the Forwarder table then send request to LinkManager to get the list
             self.registerCBT('LinkManager', 'GET_ONLINE_PEERLIST', {"interface_name": data["interface_name"]})
 
-    def forwardmessage(self, msg_frame, init_id, suc_id, peer, peer_list, puttime, datype, interface_name):
+    # TapFrames are carried as is and encoded to hex by TincanInterface, control data is encoded by bcastcodec,
+    # or as the repr of the dict older controllers evaluate while LegacyBroadcastData is set.
+    # The frame is encoded once per broadcast, not per peer it is sent to.
+    def encodeframe(self, msg_frame):
+        if isinstance(msg_frame, dict) and not self.CMConfig["LegacyBroadcastData"]:
+            return bcastcodec.encode(msg_frame)
+        elif not isinstance(msg_frame, TapFrame):
+            return str(msg_frame)
+        return msg_frame
+
+    def buildforwardmessage(self, msg_frame, init_id, suc_id, peer, peer_list, puttime, seq, datype, interface_name):
         # ICC Message structure for broadcasting data over p2plink
         cbtdata = {
                     "msg_type": "forward",
@@ -108,63 +128,65 @@ class BroadcastForwarder(ControllerModule):
                     "dst_uid": peer,
                     "interface_name": interface_name,
                     "msg": {
-                            "dataframe": str(msg_frame),
+                            "dataframe": msg_frame,
                             "init_uid": init_id,
                             "peer_list": peer_list,
                             "put_time":  puttime,
+                            "seq": seq,
                             "message_type": datype
                     }
         }
-        # Register CBT to send message to the node whose UID is mentioned as destination UID
-        self.registerCBT('BaseTopologyManager', 'ICC_CONTROL', cbtdata)
+        return cbtdata
+
+    # Returns the CBT sending an ICC message to an online peer. Broadcasts only go to peers with a direct link, so
+    # the message is handed straight to TincanInterface when the peer MAC is known instead of being routed through
+    # BaseTopologyManager and LinkManager.
+    def buildsendmessage(self, interface_name, peer, cbtdata):
+        vnet_details = self.ipop_vnets_details[interface_name]
+        peer_mac = vnet_details["tree"].mac(peer)
+        if peer_mac is None:
+            return ('BaseTopologyManager', 'ICC_CONTROL', cbtdata)
+        return ('TincanInterface', 'DO_SEND_ICC_MSG', {
+                    "src_uid": vnet_details["uid"],
+                    "dst_uid": peer,
+                    "dst_mac": peer_mac,
+                    "msg": cbtdata,
+                    "interface_name": interface_name
+        })
 
     # Method to forward message to peers from the Initiating node.
-    def sendto_all_peers(self, plist, data, datype, interface_name):
-        # Considering the node with the highest uid.
-        self.registerCBT('Logger', 'info', 'Sending broadcast packet to all online peers'+str(plist))
+    def sendto_all_peers(self, data, datype, interface_name):
+        tree = self.ipop_vnets_details[interface_name]["tree"]
+        self.registerCBT('Logger', 'info', 'Sending broadcast packet to all online peers'+str(tree.peers))
         uid = self.ipop_vnets_details[interface_name]["uid"]
         messageputtime = int(round(time.time()*1000))
-        # Case when the initiator is the last node in the network
-        if uid > max(plist):
-            self.registerCBT('Logger', 'info', 'Broadcast message sent to peer: '+str(plist[0]))
-            self.forwardmessage(data, uid, uid, plist[0], [plist[0], uid], messageputtime, datype, interface_name)
-        else:
-            for ind, peer in enumerate(plist):
-                if ind == len(plist)-1:
-                    suc_id = plist[0]
-                else:
-                    suc_id = plist[ind+1]
-                # Appending the message with the next succesor and the initiator
-                self.registerCBT('Logger', 'debug', 'Broadcast message sent to Successor uid: {0}'.format(peer))
-                self.forwardmessage(data, uid, uid, plist[ind], [peer, suc_id], messageputtime, datype, interface_name)
+        self.broadcast_seq += 1
+        seq = self.broadcast_seq
+        data = self.encodeframe(data)
+        # The messages to all the peers are submitted together, each peer relays the message up to its successor
+        messages = []
+        for peer, peer_list in tree.origin_targets():
+            messages.append(('Logger', 'debug', 'Broadcast message sent to Successor uid: {0}'.format(peer)))
+            messages.append(self.buildsendmessage(interface_name, peer,
+                                                  self.buildforwardmessage(data, uid, uid, peer, peer_list,
+                                                                           messageputtime, seq, datype,
+                                                                           interface_name)))
+        self.registerCBTs(messages)
 
     # Method to forward packets when the initiator is elsewhere
-    def sendto_peer(self, data_frame, init_id, in_plist, messagetime, datype, interface_name):
+    def sendto_peer(self, data_frame, init_id, in_plist, messagetime, seq, datype, interface_name):
         self.registerCBT('Logger', 'info', 'Sending broadcast data to suitable peers.')
         uid = self.ipop_vnets_details[interface_name]["uid"]
-        plist = sorted(self.ipop_vnets_details[interface_name]["peerlist"])
-        # Case when next node is larger than initiator and current node UID
-        if uid >= max(in_plist) and uid > init_id:
-            for peer in plist:
-                if peer != init_id and peer > uid:
-                    self.registerCBT('Logger', 'debug', 'Broadcast message sent to UID: {0}'.format(peer))
-                    self.forwardmessage(data_frame, init_id, uid, peer, in_plist, messagetime, datype, interface_name)
-        # Case when next node is smaller than initiator and current node UID
-        elif uid <= min(in_plist) and uid < init_id:
-            for peer in plist:
-                if init_id >= max(in_plist):
-                    if uid < peer and in_plist.count(peer) == 0 and peer != init_id:
-                        self.registerCBT('Logger', 'debug', 'Broadcast message sent to UID: {0}'.format(peer))
-                        self.forwardmessage(data_frame, init_id, uid, peer, in_plist, messagetime, datype, interface_name)
-                else:
-                    if uid > peer and in_plist.count(peer) == 0 and peer != init_id:
-                        self.registerCBT('Logger', 'debug', 'Broadcast message sent to UID: {0}'.format(peer))
-                        self.forwardmessage(data_frame, init_id, uid, peer, in_plist, messagetime, datype, interface_name)
-        else:
-            for peer in plist:
-                if uid < peer and in_plist.count(peer) == 0 and peer != init_id and peer < max(in_plist):
-                    self.registerCBT('Logger', 'debug', 'Broadcast message sent to UID: {0}'.format(peer))
-                    self.forwardmessage(data_frame, init_id, uid, peer, in_plist, messagetime, datype, interface_name)
+        # Peers the message is relayed to, cached per initiator and incoming peer list
+        targets = self.ipop_vnets_details[interface_name]["tree"].targets(init_id, in_plist)
+        if not targets:
+            return
+        self.registerCBT('Logger', 'debug', 'Broadcast message sent to UIDs: {0}'.format(targets))
+        data_frame = self.encodeframe(data_frame)
+        self.registerCBTs([self.buildsendmessage(interface_name, peer,
+                                                 self.buildforwardmessage(data_frame, init_id, uid, peer, in_plist,
+                                                                          messagetime, seq, datype, interface_name))
+                           for peer in targets])
 
     # Method to insert received packet into the local network stack
     def insertnetworkpacket(self, data, messagetype):
@@ -177,6 +199,8 @@ class BroadcastForwarder(ControllerModule):
         pass
 
     def timer_method(self):
+        # Reclaim the keys of broadcasts older than the dedupe TTL
+        self.seen_messages.expire()
         # Refresh the Online Peer list on every timer thread invocation
         for interface_name in self.ipop_vnets_details.keys():
             self.registerCBT('LinkManager', 'GET_ONLINE_PEERLIST', {"interface_name": interface_name})
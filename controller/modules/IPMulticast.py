@@ -21,6 +21,7 @@
 
 from controller.framework.ControllerModule import ControllerModule
 import controller.framework.ipoplib as ipoplib
+from controller.framework.TapFrame import TapFrame
 
 
 class IPMulticast(ControllerModule):
@@ -161,7 +162,9 @@ class IPMulticast(ControllerModule):
             self.registerCBT('Logger', 'warning', log)
 
     def process_multicast_pkt(self, cbt, ip_version, interface_name):
-        dataframe = cbt.data.get("dataframe")
+        frame = cbt.data.get("dataframe")
+        # IGMP records are parsed from the hex encoding of the frame, the frame itself is forwarded as is
+        dataframe = frame.hex if isinstance(frame, TapFrame) else frame
         # Check whether the IP Packet is version 4 or 6
         if ip_version == "4":
             protocol = dataframe[46:48]  # Variable to store IPv4 protocol (02- IGMP messages)
@@ -199,7 +202,7 @@ class IPMulticast(ControllerModule):
                 if cbt.data.get("type") == "local":
                     msg = {
                         "interface_name": interface_name,
-                        "dataframe": dataframe,
+                        "dataframe": frame,
                         "type": "local"
                     }
                     # Broadcast the MembershipQuery packet to all IPOP nodes in the network
@@ -348,7 +351,7 @@ class IPMulticast(ControllerModule):
                     # MembershipReport obtained from an unmanaged node, route it to all other nodes in the network
                     msg = {
                         "interface_name": interface_name,
-                        "dataframe": dataframe,
+                        "dataframe": frame,
                         "type": "local"
                     }
                     # The message has originated from the local Tap interface send it to remaining nodes in the IPOP network
@@ -361,11 +364,11 @@ class IPMulticast(ControllerModule):
                     multicast_address = IGMPData[8:16]
                 else:
                     multicast_address = dataframe[76:108]
-                self.sendmulticastdata(dataframe, interface_name, multicast_address)
+                self.sendmulticastdata(frame, interface_name, multicast_address)
         else:
             # IP Packet is Multicast data packet send it to all the UIDs subscribed to the Multicast address
             multicast_address = dataframe[60:68]
-            self.sendmulticastdata(dataframe, interface_name, multicast_address)
+            self.sendmulticastdata(frame, interface_name, multicast_address)
 
     def timer_method(self):
         pass
@@ -23,6 +23,7 @@ from controller.framework.ControllerModule import ControllerModule
 import time
 import json
 import threading
+from controller.framework.LinkStatePoller import LinkStatePoller
 
 class LinkManager(ControllerModule):
 
@@ -32,6 +33,13 @@ class LinkManager(ControllerModule):
         self.peers_lck = threading.Lock()
         # Member data to hold value for p2plink retries (value entered in config file)
         self.maxretries = self.CMConfig["MaxConnRetry"]
+        # Link state query schedule per virtual network. The poll interval is kept below half the LinkPulse so an
+        # online link is always confirmed before its Time To Live expires.
+        self.poll_intervals = (self.CMConfig["TimerInterval"],
+                               min(self.CMConfig["MaxLinkPollInterval"], self.CMConfig["LinkPulse"] / 2),
+                               self.CMConfig["LinkPollBackoff"])
+        self.pollers = {}
+        self.link_state_publisher = None
 
     def initialize(self):
         # Query UID and Tap Interface from TincanInterface
@@ -47,17 +55,30 @@ class LinkManager(ControllerModule):
             self.link_details[interface_name]["ipop_state"] = {}
             # Attribute to store p2p link with online as link status
             self.link_details[interface_name]["online_peer_uid"] = []
+            self.pollers[interface_name] = LinkStatePoller(*self.poll_intervals)
         # Iterate across Table to send Local Get State request to Tincan
         for interface_name in self.link_details.keys():
             msg = {"interface_name": interface_name, "MAC": ""}
             self.registerCBT('TincanInterface', 'DO_GET_STATE', msg)
+        # Peer link state transitions are published to the subscribed modules
+        self.link_state_publisher = self.CFxHandle.PublishSubscription("LINK_STATE_CHANGE")
         self.registerCBT('Logger', 'info', "{0} Loaded".format(self.ModuleName))
 
     # Forward cbt over XMPP
     def forward_cbt(self,interface_name,peer_uid,payload):
+        # Controllers predating the dict form call json.loads on core_data, keep sending them the string
+        if self.CMConfig["LegacyCoreData"] and isinstance(payload.get("core_data"), dict):
+            payload = dict(payload, core_data=json.dumps(payload["core_data"]))
         cbtdata = {"uid": peer_uid, "data": payload, "interface_name":interface_name}
         self.registerCBT(self.link_details[interface_name]["xmpp_client_code"], "FORWARD_CBT",cbtdata)
 
+    # Forwarded CBT data arrives as a dict, peers running older controllers still send it JSON encoded
+    @staticmethod
+    def decode_core_data(core_data):
+        if isinstance(core_data, dict):
+            return core_data
+        return json.loads(core_data)
+
     # send message (through ICC)
     #   - uid = UID of the destination peer (a tincan link must exist)
     #   - msg = message
@@ -116,7 +137,7 @@ class LinkManager(ControllerModule):
 
         # Send the message via XMPP server to Peer node
         payload = dict(sender_uid=self.link_details[interface_name]["ipop_state"]["_uid"], dest_module="LinkManager",
-                       action='RETRIEVE_CAS_FROM_TINCAN',core_data=json.dumps(msg))
+                       action='RETRIEVE_CAS_FROM_TINCAN',core_data=msg)
 
         self.forward_cbt(interface_name,uid,payload)
         self.registerCBT('Logger', 'info', "Requested CAS details for peer UID:{0}".format(uid))
@@ -134,6 +155,7 @@ class LinkManager(ControllerModule):
                         msg = {"interface_name": interface_name, "uid": uid, "MAC": mac}
                         self.registerCBT('TincanInterface', 'DO_TRIM_LINK', msg)
             del peer_details[uid]
+            self.pollers[interface_name].remove(uid)
             self.registerCBT('Logger', 'info', "Removed Connection to Peer UID: {0}".format(uid))
 
     #  remove peers with expired time-to-live attributes
@@ -175,7 +197,7 @@ class LinkManager(ControllerModule):
                     response_msg["ttl"] = ttl
                     payload = dict(sender_uid=self.link_details[interface_name]["ipop_state"]["_uid"],
                                    dest_module="LinkManager",
-                                   action='CREATE_P2PLINK', core_data=json.dumps(response_msg))
+                                   action='CREATE_P2PLINK', core_data=response_msg)
                     self.forward_cbt(interface_name, uid, payload)
                 # else if node has sent p2plinkrequest concurrently
                 elif peer[uid]["status"] == "sent_link_req":
@@ -191,7 +213,7 @@ class LinkManager(ControllerModule):
                     response_msg["ttl"] = ttl
                     payload = dict(sender_uid=self.link_details[interface_name]["ipop_state"]["_uid"],
                                    dest_module="LinkManager",
-                                   action='CREATE_P2PLINK', core_data=json.dumps(response_msg))
+                                   action='CREATE_P2PLINK', core_data=response_msg)
                     self.forward_cbt(interface_name, uid, payload)
                 elif peer[uid]["status"] == "offline":
                     # If the CAS has been requested for a peer UID but it is inprogress
@@ -200,7 +222,7 @@ class LinkManager(ControllerModule):
                         response_msg["ttl"] = ttl
                         payload = dict(sender_uid=self.link_details[interface_name]["ipop_state"]["_uid"],
                                        dest_module="LinkManager",
-                                       action='CREATE_P2PLINK', core_data=json.dumps(response_msg))
+                                       action='CREATE_P2PLINK', core_data=response_msg)
                         self.forward_cbt(interface_name, uid, payload)
                     else:
                         # Check whether the peer2peer link retry has exceeded the max count
@@ -217,7 +239,7 @@ class LinkManager(ControllerModule):
                             response_msg["ttl"] = ttl
                             payload = dict(src_uid=self.link_details[interface_name]["ipop_state"]["_uid"],
                                            dest_module="LinkManager",
-                                           action='CREATE_P2PLINK', core_data=json.dumps(response_msg))
+                                           action='CREATE_P2PLINK', core_data=response_msg)
                             self.forward_cbt(interface_name, uid, payload)
                         else:
                             peer[uid]["linkretrycount"] = 0
@@ -250,7 +272,7 @@ class LinkManager(ControllerModule):
                 response_msg["ttl"] = ttl
                 payload = dict(sender_uid=self.link_details[interface_name]["ipop_state"]["_uid"],
                                dest_module="LinkManager",
-                               action='CREATE_P2PLINK', core_data=json.dumps(response_msg))
+                               action='CREATE_P2PLINK', core_data=response_msg)
                 self.forward_cbt(interface_name, uid, payload)
 
     # Create Peer2Peer Link via Tincan
@@ -291,7 +313,7 @@ class LinkManager(ControllerModule):
             elif cbt.action == "RETRIEVE_CAS_FROM_TINCAN":
                 msg = cbt.data
                 uid = msg["uid"]
-                msg["data"] = json.loads(msg["data"])
+                msg["data"] = self.decode_core_data(msg["data"])
                 self.registerCBT('Logger', 'debug', "Received peer {0} req to retrieve CAS details.".format(uid))
                 self.registerCBT('TincanInterface', 'DO_GET_CAS', msg)
                 # Request Peer CAS details for two way connection
@@ -299,12 +321,26 @@ class LinkManager(ControllerModule):
                     self.request_cas(uid, msg["interface_name"])
             elif cbt.action == "CREATE_P2PLINK":
                 msg = cbt.data
-                msg["data"] = json.loads(msg["data"])
+                msg["data"] = self.decode_core_data(msg["data"])
                 self.create_p2plink(msg["uid"], msg.get("interface_name"), msg)
             elif cbt.action == "SEND_CAS_DETAILS_TO_PEER":
                 msg = cbt.data
                 interface_name = msg["interface_name"]
                 self.send_casdetails(msg["uid"], msg["data"], interface_name)
+            # A CBT forwarded over XMPP was not delivered, the peer never answered the UID query
+            elif cbt.action == "FORWARD_CBT_FAILED":
+                msg = cbt.data
+                uid = msg["uid"]
+                peers = self.link_details[msg["interface_name"]]["peers"]
+                self.registerCBT('Logger', 'info', "{0} to peer UID:{1} {2}, {3} CBTs still pending"
+                                 .format(msg.get("action"), uid, msg.get("reason"), msg.get("pending", 0)))
+                # A CBT dropped on overflow leaves newer CBTs of the same link queued, only once the peer UID could
+                # not be resolved in time and nothing is left pending drop a link still being set up, so the next
+                # CREATE_LINK retries without waiting for its TTL
+                if msg.get("reason") == "expired" and not msg.get("pending") and uid in peers and \
+                        peers[uid]["status"] not in ["online", "offline"]:
+                    self.registerCBT('Logger', 'info', "Dropping link request to peer UID:{0}".format(uid))
+                    self.remove_p2plink(uid, msg["interface_name"])
             elif cbt.action == "SEND_ICC_MSG":
                 msg = cbt.data
                 self.send_msg_icc(msg.get("dst_uid"), msg.get("msg"), msg.get("interface_name"))
@@ -341,44 +377,29 @@ class LinkManager(ControllerModule):
                       .format(msg["_uid"], msg["mac"], msg["ip4"]))
                     # update peer list
                 elif msg_type == "peer_state":
-                    uid = msg["uid"]
-                    data = cbt.data
-                    # check whether UID exits in LinkManager Tables
-                    if uid in interface_details["peers"]:
-                        # check whether TTL exits if not initialize it to current timestamp
-                        if "ttl" not in interface_details["peers"][uid]:
-                            interface_details["peers"][uid]["ttl"] = time.time()
-                        # Variable to store TTL
-                        ttl = interface_details["peers"][uid]["ttl"]
-
-                        # Check whether the p2plink is online if yes extend its Time To Live
-                        if "online" == data["status"]:
-                            ttl = time.time() + self.CMConfig["LinkPulse"]
-                            # If the p2plink has just turned Online added into the Online Peer List
-                            if uid not in self.link_details[interface_name]["online_peer_uid"]:
-                                self.link_details[interface_name]["online_peer_uid"].append(uid)
-                        # Connection has been removed from Tincan clear Connection Manager Table
-                        elif "unknown" == data["status"]:
-                            del self.link_details[interface_name]["peers"][uid]
-                            if uid in self.link_details[interface_name]["online_peer_uid"]:
-                                self.link_details[interface_name]["online_peer_uid"].remove(uid)
-                            return
-                        else:
-                            if uid in self.link_details[interface_name]["online_peer_uid"]:
-                                self.link_details[interface_name]["online_peer_uid"].remove(uid)
-                        # update peer state within BTM Tables
-                        interface_details["peers"][uid].update(msg)
-                        interface_details["peers"][uid]["ttl"] = ttl
+                    self.update_peer_state(interface_name, msg)
                 else:
                     log = '{0}: unrecognized CBT message {1} received from {2}.Data:: {3}' \
                         .format(cbt.recipient, cbt.action, cbt.initiator, cbt.data)
                     self.registerCBT('Logger', 'warning', log)
+            # Link state change pushed by Tincan
+            elif cbt.action == "LINK_STATE_CHANGE":
+                self.update_peer_state(cbt.data["interface_name"], cbt.data, notified=True)
+            elif cbt.action == "GET_LINK_POLL_STATS":
+                self.registerCBT(cbt.initiator, "LINK_POLL_STATS",
+                                 dict((interface_name, poller.get_stats())
+                                      for interface_name, poller in self.pollers.items()))
             elif cbt.action == "GET_ONLINE_PEERLIST":
                 interface_name = cbt.data["interface_name"]
                 if "_uid" in self.link_details[interface_name]["ipop_state"].keys():
-                    cbtdt = {'peerlist': self.link_details[interface_name]["online_peer_uid"],
+                    peers = self.link_details[interface_name]["peers"]
+                    online_peers = self.link_details[interface_name]["online_peer_uid"]
+                    cbtdt = {'peerlist': online_peers,
                              'uid': self.link_details[interface_name]["ipop_state"]["_uid"],
                              'mac': self.link_details[interface_name]["mac"],
+                             # MAC of the online peers, lets the recipient send ICC messages to them directly
+                             'peer_macs': dict((uid, peers[uid]["mac"]) for uid in online_peers
+                                               if uid in peers and peers[uid].get("mac")),
                              'interface_name': interface_name
                     }
                     # Send the Online PeerList to the Initiator of CBT
@@ -392,25 +413,83 @@ class LinkManager(ControllerModule):
             self.peers_lck.release()
             raise
 
+    # Apply a peer link state reported by Tincan, either polled or pushed as a notification
+    def update_peer_state(self, interface_name, msg, notified=False):
+        uid = msg["uid"]
+        status = msg["status"]
+        interface_details = self.link_details[interface_name]
+        # check whether UID exits in LinkManager Tables
+        if uid not in interface_details["peers"]:
+            return
+        poller = self.pollers[interface_name]
+        if notified:
+            changed = poller.notify(uid, status)
+        else:
+            changed = poller.observe(uid, status)
+        # check whether TTL exits if not initialize it to current timestamp
+        if "ttl" not in interface_details["peers"][uid]:
+            interface_details["peers"][uid]["ttl"] = time.time()
+        # Variable to store TTL
+        ttl = interface_details["peers"][uid]["ttl"]
+
+        # Check whether the p2plink is online if yes extend its Time To Live
+        if "online" == status:
+            ttl = time.time() + self.CMConfig["LinkPulse"]
+            # If the p2plink has just turned Online added into the Online Peer List
+            if uid not in interface_details["online_peer_uid"]:
+                interface_details["online_peer_uid"].append(uid)
+        # Connection has been removed from Tincan clear Connection Manager Table
+        elif "unknown" == status:
+            del interface_details["peers"][uid]
+            poller.remove(uid)
+            if uid in interface_details["online_peer_uid"]:
+                interface_details["online_peer_uid"].remove(uid)
+        else:
+            if uid in interface_details["online_peer_uid"]:
+                interface_details["online_peer_uid"].remove(uid)
+        if "unknown" != status:
+            # update peer state within BTM Tables, a state without a MAC never clears the known MAC of the peer
+            peer = interface_details["peers"][uid]
+            mac = peer.get("mac")
+            peer.update(msg)
+            if mac and not peer.get("mac"):
+                peer["mac"] = mac
+            peer["ttl"] = ttl
+        # Publish the transitions only, unchanged states confirmed by a poll are not reported
+        if changed:
+            self.link_state_publisher.PostUpdate({
+                "interface_name": interface_name,
+                "uid": uid,
+                "status": status,
+                "mac": msg.get("mac") or interface_details["peers"].get(uid, {}).get("mac", "")
+            })
+
     def timer_method(self):
         try:
             # Iterate across various virtual networks
             self.peers_lck.acquire()
             for interface_name in self.link_details.keys():
                 self.registerCBT("Logger","debug","Peer Nodes:: {0}".format(self.link_details[interface_name]["peers"]))
-                # Iterate over the Peer Table
+                # Link state and stats requests for all the peers are submitted together
+                requests = []
+                poller = self.pollers[interface_name]
+                now = time.time()
+                # Iterate over the Peer Table, peers whose link state is stable are polled less often
                 for peeruid in self.link_details[interface_name]["peers"].keys():
                     # Check whether the Peer MAC address has been obtained via XMPP
-                    if self.link_details[interface_name]["peers"][peeruid]["mac"] != "":
+                    if self.link_details[interface_name]["peers"][peeruid]["mac"] != "" and \
+                            poller.is_due(peeruid, now):
                         message = {
                             "interface_name": interface_name,
                             "MAC": self.link_details[interface_name]["peers"][peeruid]["mac"],
                             "uid": peeruid
                         }
                         # Get P2P Link state
-                        self.registerCBT('TincanInterface', 'DO_GET_STATE', message)
+                        requests.append(('TincanInterface', 'DO_GET_STATE', message))
                         # Get P2P Link stats
-                        self.registerCBT('TincanInterface', 'DO_QUERY_LINK_STATS', message)
+                        requests.append(('TincanInterface', 'DO_QUERY_LINK_STATS', message))
+                if requests:
+                    self.registerCBTs(requests)
                 # Check whether Local Node details have been obtained from Tincan, if not issue local 
                 # state message to Tincan
                 if "_uid" not in self.link_details[interface_name]["ipop_state"].keys():
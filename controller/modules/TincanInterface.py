@@ -20,16 +20,23 @@
 # THE SOFTWARE.
 
 from controller.framework.ControllerModule import ControllerModule
-import socket,select,json,ast
+import socket,select
+import traceback
+import itertools
 import controller.framework.ipoplib as ipoplib
 import controller.framework.fxlib as fxlib
+import controller.framework.jsoncodec as jsoncodec
+import controller.framework.bcastcodec as bcastcodec
+from controller.framework.DatagramChannel import DatagramChannel
+from controller.framework.TransactionTable import SentRequest, TransactionTable
+from controller.framework.TapFrame import TapFrame, ETH_P_ARP, ETH_P_IP, ETH_P_IPV6
 from threading import Thread
 
 
 class TincanInterface(ControllerModule):
     def __init__(self, CFxHandle, paramDict, ModuleName):
         super(TincanInterface, self).__init__(CFxHandle, paramDict, ModuleName)
-        self.trans_counter = 0  # Counter to send transaction number for every TINCAN request
+        self.trans_counter = itertools.count()  # Counter to send transaction number for every TINCAN request
         self.TincanListenerThread = None    # Class data member to hold UDP listener Thread object
         # Check whether the system supports IPv6
         if socket.has_ipv6:
@@ -48,18 +55,32 @@ class TincanInterface(ControllerModule):
             self.dest = (self.CMConfig["localhost"], self.CMConfig["ctrl_send_port"])
         self.sock.bind(("", 0))
         self.sock_list = [self.sock_svr]
+        # Batched receive/send layer for the Tincan control channel
+        self.channel = DatagramChannel(self.sock_svr, self.sock, self.dest, self.CMConfig["buf_size"],
+                                       self.CMConfig["RecvBatchSize"])
         self.model = self.CFxHandle.queryParam('CFx', 'Model')
+        # Requests awaiting a Tincan response, keyed by TransactionId
+        self.transactions = TransactionTable(self.CMConfig["RequestTimeout"], self.CMConfig["RequestRetries"],
+                                             self.CMConfig["RetryBackoff"])
+        self.tracked_commands = frozenset(self.CMConfig["TrackedCommands"])
+        self.retry_commands = frozenset(self.CMConfig["RetryCommands"])
 
     def initialize(self):
         self.registerCBT('Logger', 'info', "{0} Loaded".format(self.ModuleName))
-        # create a listener thread (listens to tincan notifications)
-        self.TincanListenerThread = Thread(target=self.__tincan_listener)
-        self.TincanListenerThread.setDaemon(True)
-        self.TincanListenerThread.start()
+        runtime = self.CFxHandle.getRuntime()
+        if runtime is not None:
+            # the asyncio runtime reads Tincan notifications on its event loop
+            runtime.open_datagram_endpoint(self.sock_svr, self.tincan_ingress)
+        else:
+            # create a listener thread (listens to tincan notifications)
+            self.TincanListenerThread = Thread(target=self.__tincan_listener)
+            self.TincanListenerThread.setDaemon(True)
+            self.TincanListenerThread.start()
         self.create_control_link()
         self.set_log_level()
         self.create_virtual_networks()
         self.set_ignored_interfaces()
+        self.channel.flush()
 
     def __tincan_listener(self):
         while True:
@@ -68,398 +89,443 @@ class TincanInterface(ControllerModule):
             # Iterate across all socket list to obtain Tincan messages
             for sock in socks:
                 if sock == self.sock_svr:
-                    data, addr = sock.recvfrom(self.CMConfig["buf_size"])
-                    # Create CBT to process every Tincan message
-                    self.registerCBT('TincanInterface', 'PROCESS_TINCAN_DATA', data)
+                    # Drain all the datagrams pending on the socket, buffers are reused on the next wakeup
+                    for data in self.channel.recv_batch():
+                        self.tincan_ingress(data.tobytes())
+
+    # Handle a message received from Tincan on the listener thread or the event loop
+    def tincan_ingress(self, data):
+        if self.CMConfig["DirectIngress"]:
+            # Decode on the receiving thread and hand the message straight to the target module
+            self.dispatch_tincan_data(data)
+        else:
+            # Create CBT to process every Tincan message
+            self.registerCBT('TincanInterface', 'PROCESS_TINCAN_DATA', data)
+
+    # Process a Tincan message on the listener thread, errors are logged so the listener keeps running
+    def dispatch_tincan_data(self, data):
+        try:
+            self.process_tincan_data(data)
+        except Exception:
+            log = "Tincan message dispatch exception:\n    data      {0}:\n    traceback:\n{1}"\
+                .format(data, traceback.format_exc())
+            self.registerCBT('Logger', 'warning', log)
 
     def processCBT(self, cbt):
+        try:
+            self.process_request(cbt)
+        finally:
+            # Requests queued within one dispatch cycle are sent together once the CBT queue drains
+            if self.CFxHandle.CMQueue.empty():
+                self.channel.flush()
+
+    # Requests created for one batch of CBTs are sent to Tincan together
+    def processCBTBatch(self, cbts):
+        try:
+            for cbt in cbts:
+                try:
+                    self.process_request(cbt)
+                except Exception:
+                    log = "CBT exception:\n    action    {0}:\n    data      {1}:\n    traceback:\n{2}"\
+                        .format(cbt.action, cbt.data, traceback.format_exc())
+                    self.registerCBT('Logger', 'warning', log)
+        finally:
+            self.channel.flush()
+
+    def process_request(self, cbt):
         # CBT to process Link Creation
         if cbt.action == 'DO_CREATE_LINK':
             uid = cbt.data.get('uid')
             msg = cbt.data.get("data")
-            connection_details = ipoplib.CONCT
-            conn_details = connection_details["IPOP"]["Request"]
-            conn_details["InterfaceName"] = cbt.data.get("interface_name")
-            connection_details["IPOP"]["TransactionId"] = self.trans_counter
-            self.trans_counter += 1
-            conn_details["PeerInfo"]["VIP4"] = msg.get('ip4')
-            conn_details["PeerInfo"]["UID"] = uid
-            conn_details["PeerInfo"]["MAC"] = msg.get('mac')
-            conn_details["PeerInfo"]["CAS"] = msg.get('cas')
-            conn_details["PeerInfo"]["Fingerprint"] = msg.get('fpr')
-            conn_details["Initiator"] = cbt.initiator
-            self.send_msg(json.dumps(connection_details))
-            self.registerCBT('Logger', 'debug', "Connection Details : {0}".format(str(conn_details)))
+            peer_info = {
+                "VIP4": msg.get('ip4'),
+                "UID": uid,
+                "MAC": msg.get('mac'),
+                "CAS": msg.get('cas'),
+                "Fingerprint": msg.get('fpr')
+            }
+            trans = self.send_request(ipoplib.CONCT, InterfaceName=cbt.data.get("interface_name"),
+                                      PeerInfo=peer_info, Initiator=cbt.initiator)
+            self.registerCBT('Logger', 'debug', "Connection Details : {0}".format(trans.request))
             self.registerCBT('Logger', 'info', "Creating Connection to Peer:{0}".format(uid))
         # CBT to process Link deletion request
         elif cbt.action == 'DO_TRIM_LINK':
             uid = cbt.data.get("uid")
-            remove_node_details = ipoplib.REMOVE
-            remove_node_details["IPOP"]["Request"]["InterfaceName"] = cbt.data.get("interface_name")
-            remove_node_details["IPOP"]["Request"]["Initiator"] = cbt.initiator
-            remove_node_details["IPOP"]["TransactionId"] = self.trans_counter
-            self.trans_counter += 1
-            remove_node_details["IPOP"]["Request"]["MAC"] = cbt.data.get("MAC")
-            self.send_msg(json.dumps(remove_node_details))
-            log = "Tincan Request : {0}".format(str(remove_node_details["IPOP"]))
+            trans = self.send_request(ipoplib.REMOVE, InterfaceName=cbt.data.get("interface_name"),
+                                      Initiator=cbt.initiator, MAC=cbt.data.get("MAC"))
+            log = "Tincan Request : {0}".format(trans.request)
             self.registerCBT('Logger', 'debug', log)
             self.registerCBT('Logger', 'info', "Removing Connection to : {0}".format(uid))
         # CBT to process Query Link state
         elif cbt.action == 'DO_GET_STATE':
-            get_state_request = ipoplib.LSTATE
-            get_state_request["IPOP"]["TransactionId"] = self.trans_counter
-            self.trans_counter += 1
-            get_state_request["IPOP"]["Request"]["ProtocolVersion"] = 4
-            get_state_request["IPOP"]["Request"]["InterfaceName"] = cbt.data.get("interface_name")
-            get_state_request["IPOP"]["Request"]["UID"] = cbt.data.get("uid")
-            get_state_request["IPOP"]["Request"]["MAC"] = cbt.data.get("MAC")
-            get_state_request["IPOP"]["Request"]["Initiator"] = cbt.initiator
-            self.send_msg(json.dumps(get_state_request))
-            log = "Tincan Request: {0}".format(str(get_state_request["IPOP"]))
+            trans = self.send_request(ipoplib.LSTATE, ProtocolVersion=4,
+                                      InterfaceName=cbt.data.get("interface_name"), UID=cbt.data.get("uid"),
+                                      MAC=cbt.data.get("MAC"), Initiator=cbt.initiator)
+            log = "Tincan Request: {0}".format(trans.request)
             self.registerCBT('Logger', 'debug', log)
         # CBT to process GET CAS for a given peer MAC address
         elif cbt.action == 'DO_GET_CAS':
-            lcas = ipoplib.LCAS
             data = cbt.data
-            uid = data["uid"]
-            lcas["IPOP"]["TransactionId"] = self.trans_counter
-            self.trans_counter += 1
-            lcas["IPOP"]["Request"]["InterfaceName"] = data["interface_name"]
-            lcas["IPOP"]["Request"]["PeerInfo"]["VIP4"] = data["data"]["ip4"]
-            lcas["IPOP"]["Request"]["PeerInfo"]["Fingerprint"] = data["data"]["fpr"]
-            lcas["IPOP"]["Request"]["PeerInfo"]["UID"] = uid
-            lcas["IPOP"]["Request"]["PeerInfo"]["MAC"] = data["data"]["mac"]
-            lcas["IPOP"]["Request"]["Initiator"] = cbt.initiator
-            self.registerCBT('Logger', 'debug', "Get CAS Request: {0}".format(str(lcas["IPOP"])))
-            self.send_msg(json.dumps(lcas))
+            peer_info = {
+                "VIP4": data["data"]["ip4"],
+                "Fingerprint": data["data"]["fpr"],
+                "UID": data["uid"],
+                "MAC": data["data"]["mac"]
+            }
+            trans = self.send_request(ipoplib.LCAS, InterfaceName=data["interface_name"],
+                                      PeerInfo=peer_info, Initiator=cbt.initiator)
+            self.registerCBT('Logger', 'debug', "Get CAS Request: {0}".format(trans.request))
         # CBT message to keep Tincan and controller channel up and running
         elif cbt.action == 'DO_ECHO':
-            ec = ipoplib.ECHO
-            ec["IPOP"]["Request"]["InterfaceName"] = cbt.data.get("interface_name")
-            ec["IPOP"]["Request"]["TransactionId"] = self.trans_counter
-            ec["IPOP"]["Request"]["Initiator"] = cbt.initiator
-            self.trans_counter += 1
-            self.send_msg(json.dumps(ec))
+            self.send_request(ipoplib.ECHO, InterfaceName=cbt.data.get("interface_name"),
+                              Initiator=cbt.initiator)
         # CBT to send ICC message via overlay
         elif cbt.action == 'DO_SEND_ICC_MSG':
-            icc_message_details = ipoplib.ICC
-            icc_message_details["IPOP"]["TransactionId"] = self.trans_counter
-            self.trans_counter += 1
-            icc_message_details["IPOP"]["Request"]["InterfaceName"] = cbt.data.get("interface_name")
-            icc_message_details["IPOP"]["Request"]["Recipient"] = cbt.data.get('dst_uid')
-            icc_message_details["IPOP"]["Request"]["RecipientMac"] = cbt.data.get('dst_mac')
             msg = cbt.data.get("msg")
-            icc_message_details["IPOP"]["Request"]["Data"] = json.dumps(msg)
-            icc_message_details["IPOP"]["Request"]["Initiator"] = cbt.initiator
-            self.send_msg(json.dumps(icc_message_details))
-            log = "Sending ICC Message: {0}".format(str(icc_message_details["IPOP"]))
+            trans = self.send_request(ipoplib.ICC, InterfaceName=cbt.data.get("interface_name"),
+                                      Recipient=cbt.data.get('dst_uid'), RecipientMac=cbt.data.get('dst_mac'),
+                                      Data=jsoncodec.dumps(msg), Initiator=cbt.initiator)
+            log = "Sending ICC Message: {0}".format(trans.request)
             self.registerCBT('Logger', 'debug', log)
         # CBT to process request to insert data into the local network interface
         elif cbt.action == 'DO_INSERT_DATA_PACKET':
-            packet = ipoplib.INSERT_TAP_PACKET
-            packet["IPOP"]["TransactionId"] = self.trans_counter
-            self.trans_counter += 1
-            packet["IPOP"]["Request"]["InterfaceName"] = cbt.data["interface_name"]
-            packet["IPOP"]["Request"]["Data"] = cbt.data["dataframe"]
-            self.send_msg(json.dumps(packet))
-            log = "Inserting Network Packet: {0}".format(str(packet["IPOP"]))
+            trans = self.send_request(ipoplib.INSERT_TAP_PACKET, InterfaceName=cbt.data["interface_name"],
+                                      Data=cbt.data["dataframe"])
+            log = "Inserting Network Packet: {0}".format(trans.request)
             self.registerCBT('Logger', 'debug', log)
-        # CBT to retry any Tincan Request
-        #elif cbt.action == 'DO_RETRY':
-        #    self.send_msg(json.dumps(cbt.data))
         # CBT to process request to insert Forwarding rule in Tincan
         elif cbt.action == "DO_INSERT_FORWARDING_RULES":
-            add_routing = ipoplib.ADD_FORWARDING_RULE
-            add_routing["IPOP"]["TransactionId"] = self.trans_counter
-            self.trans_counter += 1
-            add_routing["IPOP"]["Request"]["InterfaceName"] = cbt.data["interface_name"]
-            add_routing["IPOP"]["Request"]["Routes"] = []
             sourcemac = cbt.data["sourcemac"]
             for mac in cbt.data.get("destmac"):
                 if mac != "0" * 12 and mac != sourcemac:
-                    add_routing["IPOP"]["Request"]["Routes"] = [mac + ":" + sourcemac]
-                    log = "Inserting Routing Rule: {0}".format(str(add_routing["IPOP"]))
+                    trans = self.send_request(ipoplib.ADD_FORWARDING_RULE, InterfaceName=cbt.data["interface_name"],
+                                              Routes=[mac + ":" + sourcemac])
+                    log = "Inserting Routing Rule: {0}".format(trans.request)
                     self.registerCBT('Logger', 'debug', log)
-                    self.send_msg(json.dumps(add_routing))
         # CBT to process request to remove Forwarding rule in Tincan
         elif cbt.action == "DO_REMOVE_FORWARDING_RULES":
-            remove_routing = ipoplib.DELETE_FORWARDING_RULE
-            remove_routing["IPOP"]["TransactionId"] = self.trans_counter
-            self.trans_counter += 1
-            remove_routing["IPOP"]["Request"]["InterfaceName"] = cbt.data["interface_name"]
-            remove_routing["IPOP"]["Request"]["Routes"] = [cbt.data["mac"]]
-            log = "Routing Rule Removed: {0}".format(str(remove_routing["IPOP"]))
+            trans = self.send_request(ipoplib.DELETE_FORWARDING_RULE, InterfaceName=cbt.data["interface_name"],
+                                      Routes=[cbt.data["mac"]])
+            log = "Routing Rule Removed: {0}".format(trans.request)
             self.registerCBT('Logger', 'debug', log)
-            self.send_msg(json.dumps(remove_routing))
         # CBT to process request to send any message to Tincan
         elif cbt.action == "DO_SEND_TINCAN_MSG":
             data = cbt.data
-            data["IPOP"]["TransactionId"] = self.trans_counter
-            self.trans_counter += 1
+            data["IPOP"]["TransactionId"] = self.next_transaction_id()
             data["IPOP"]["Request"]["Initiator"] = cbt.initiator
-            self.send_msg(json.dumps(data))
+            self.track_request(data["IPOP"]["TransactionId"], data["IPOP"]["Request"]["Command"],
+                               jsoncodec.dumps(data), cbt.initiator)
             log = "Data sent to Tincan: {0}".format(str(data))
             self.registerCBT('Logger', 'debug', log)
         elif cbt.action == 'DO_QUERY_LINK_STATS':
-            link_stat_request = ipoplib.LINK_STATS
-            link_stat_request["IPOP"]["TransactionId"] = self.trans_counter
-            self.trans_counter += 1
-            link_stat_request["IPOP"]["Request"]["ProtocolVersion"] = 4
-            link_stat_request["IPOP"]["Request"]["InterfaceName"] = cbt.data.get("interface_name")
-            link_stat_request["IPOP"]["Request"]["UID"] = cbt.data.get("uid")
-            link_stat_request["IPOP"]["Request"]["MAC"] = cbt.data.get("MAC")
-            link_stat_request["IPOP"]["Request"]["Initiator"] = cbt.initiator
-            link_stat_request["IPOP"]["Owner"] = cbt.initiator
-            self.send_msg(json.dumps(link_stat_request))
-            log = "Tincan Request: {0}".format(str(link_stat_request["IPOP"]))
+            trans = self.send_request(ipoplib.LINK_STATS, owner=cbt.initiator, ProtocolVersion=4,
+                                      InterfaceName=cbt.data.get("interface_name"),
+                                      UID=cbt.data.get("uid"), MAC=cbt.data.get("MAC"),
+                                      Initiator=cbt.initiator)
+            log = "Tincan Request: {0}".format(trans.request)
             self.registerCBT('Logger', 'debug', log)
         elif cbt.action == 'DO_QUERY_ADDRESS_SET':
-            query_cas_request = ipoplib.QUERY_CAS
-            query_cas_request["IPOP"]["TransactionId"] = self.trans_counter
-            self.trans_counter += 1
-            query_cas_request["IPOP"]["Request"]["ProtocolVersion"] = 4
-            query_cas_request["IPOP"]["Request"]["InterfaceName"] = cbt.data.get("interface_name")
-            query_cas_request["IPOP"]["Request"]["UID"] = cbt.data.get("uid")
-            query_cas_request["IPOP"]["Request"]["MAC"] = cbt.data.get("MAC")
-            query_cas_request["IPOP"]["Request"]["Initiator"] = cbt.initiator
-            query_cas_request["IPOP"]["Owner"] = cbt.initiator
-            self.send_msg(json.dumps(query_cas_request))
-            log = "Tincan Request: {0}".format(str(query_cas_request["IPOP"]))
+            trans = self.send_request(ipoplib.QUERY_CAS, owner=cbt.initiator, ProtocolVersion=4,
+                                      InterfaceName=cbt.data.get("interface_name"),
+                                      UID=cbt.data.get("uid"), MAC=cbt.data.get("MAC"),
+                                      Initiator=cbt.initiator)
+            log = "Tincan Request: {0}".format(trans.request)
             self.registerCBT('Logger', 'debug', log)
+        # CBT to report the control channel I/O counters
+        elif cbt.action == "GET_CHANNEL_STATS":
+            self.registerCBT(cbt.initiator, "CHANNEL_STATS", self.channel.get_stats())
+        # CBT to report the outstanding requests and the response latency per Tincan command
+        elif cbt.action == "GET_TRANSACTION_STATS":
+            self.registerCBT(cbt.initiator, "TRANSACTION_STATS", self.transactions.get_stats())
         # CBT to process messages from Tincan
         elif cbt.action == "PROCESS_TINCAN_DATA":
-            interface_name, data = "", cbt.data
-            tincan_resp_msg = json.loads(data.decode("utf-8"))["IPOP"]
-            # Extract the Operation from the Tincan message
-            req_operation = tincan_resp_msg["Request"]["Command"]
+            self.process_tincan_data(cbt.data)
+        else:
+            log = '{0}: unrecognized CBT {1} received from {2}'\
+                    .format(cbt.recipient, cbt.action, cbt.initiator)
+            self.registerCBT('Logger', 'warning', log)
 
-            # Check if tap name exits in the TINCAN Response Message
-            if "InterfaceName" in tincan_resp_msg["Request"].keys():
-                interface_name = tincan_resp_msg["Request"]["InterfaceName"]
+    # Decode a message received from Tincan and route it to the module handling it
+    def process_tincan_data(self, data):
+        interface_name = ""
+        tincan_resp_msg = jsoncodec.loads(data)["IPOP"]
+        # Extract the Operation from the Tincan message
+        req_operation = tincan_resp_msg["Request"]["Command"]
+
+        # Check if tap name exits in the TINCAN Response Message
+        if "InterfaceName" in tincan_resp_msg["Request"].keys():
+            interface_name = tincan_resp_msg["Request"]["InterfaceName"]
 
-            # Condition to check if Tincan Message not an UpdateRoute or an ICC Message
-            if "Response" in tincan_resp_msg.keys():
-                # check whether the Tincan response is Success message
-                if tincan_resp_msg["Response"]["Success"] is True:
-                    # Whether the response is for GET_NODE_STATE operation
-                    if req_operation == "QueryNodeInfo":
-                        resp_msg = json.loads(tincan_resp_msg["Response"]["Message"])
-                        resp_target_module = tincan_resp_msg["Request"]["Initiator"]
-                        # Check whether the Query is for Self or a remote node
-                        if resp_msg["Type"] == "local":
+        # Condition to check if Tincan Message not an UpdateRoute or an ICC Message
+        if "Response" in tincan_resp_msg.keys():
+            # Complete the request awaiting this response, runs the callbacks registered by send_request
+            self.transactions.complete(tincan_resp_msg.get("TransactionId"), tincan_resp_msg)
+            # check whether the Tincan response is Success message
+            if tincan_resp_msg["Response"]["Success"] is True:
+                # Whether the response is for GET_NODE_STATE operation
+                if req_operation == "QueryNodeInfo":
+                    resp_msg = jsoncodec.loads(tincan_resp_msg["Response"]["Message"])
+                    resp_target_module = tincan_resp_msg["Request"]["Initiator"]
+                    # Check whether the Query is for Self or a remote node
+                    if resp_msg["Type"] == "local":
+                        msg = {
+                            "type": "local_state",
+                            "_uid": resp_msg["UID"],
+                            "ip4": resp_msg["VIP4"],
+                            "fpr": resp_msg["Fingerprint"],
+                            "mac": resp_msg["MAC"],
+                            "interface_name": interface_name
+                        }
+                        log = "current state of {0} : {1}".format(resp_msg["UID"], str(msg))
+                        self.registerCBT('Logger', 'debug', log)
+                        self.registerCBT(resp_target_module, 'TINCAN_RESPONSE', msg)
+                    else:
+                        # Checks whether the link to peer is in Unknown state
+                        if resp_msg["Status"] != "unknown":
                             msg = {
-                                "type": "local_state",
-                                "_uid": resp_msg["UID"],
+                                "type": "peer_state",
+                                "uid": tincan_resp_msg["Request"]["UID"],
                                 "ip4": resp_msg["VIP4"],
                                 "fpr": resp_msg["Fingerprint"],
                                 "mac": resp_msg["MAC"],
+                                "status": resp_msg["Status"],
                                 "interface_name": interface_name
                             }
-                            log = "current state of {0} : {1}".format(resp_msg["UID"], str(msg))
-                            self.registerCBT('Logger', 'debug', log)
-                            self.registerCBT(resp_target_module, 'TINCAN_RESPONSE', msg)
                         else:
-                            # Checks whether the link to peer is in Unknown state
-                            if resp_msg["Status"] != "unknown":
-                                msg = {
-                                    "type": "peer_state",
-                                    "uid": tincan_resp_msg["Request"]["UID"],
-                                    "ip4": resp_msg["VIP4"],
-                                    "fpr": resp_msg["Fingerprint"],
-                                    "mac": resp_msg["MAC"],
-                                    "status": resp_msg["Status"],
-                                    "interface_name": interface_name
-                                }
-                            else:
-                                msg = {
-                                    "type": "peer_state",
-                                    "uid": tincan_resp_msg["Request"]["UID"],
-                                    "ip4": "",
-                                    "fpr": "",
-                                    "mac": "",
-                                    "ttl": "",
-                                    "rate": "",
-                                    "status": resp_msg["Status"],
-                                    "interface_name": interface_name
-                                }
-                            log = "Peer UID:{0} State:{1}".format(tincan_resp_msg["Request"]["UID"], resp_msg["Status"])
-                            self.registerCBT('Logger', 'debug', log)
-                            self.registerCBT(resp_target_module, 'TINCAN_RESPONSE', msg)
-                    # Whether the response is for DO_GET_CAS operation
-                    elif req_operation == "CreateTunnel":
-                        # Sends the CAS to LinkManager
-                        resp_target_module = tincan_resp_msg["Request"]["Initiator"]
-                        log = "Received data from Tincan for operation: {0}. Data: {1}".\
-                            format(tincan_resp_msg["Request"]["Command"], str(tincan_resp_msg))
-                        self.registerCBT('Logger', 'info', log)
-                        msg = {
-                            "uid": tincan_resp_msg["Request"]["PeerInfo"]["UID"],
-                            "data": {
-                                "fpr": tincan_resp_msg["Request"]["PeerInfo"]["Fingerprint"],
-                                "cas": tincan_resp_msg['Response']['Message'],
-                                "peer_mac": tincan_resp_msg["Request"]["PeerInfo"]["MAC"]
-                            },
-                            "interface_name": interface_name
-                        }
-                        self.registerCBT(resp_target_module, 'SEND_CAS_DETAILS_TO_PEER', msg)
-                    elif req_operation == "ConnectTunnel":
-                        # Response message for Connection Request for a p2plink
-                        log = "Received data from Tincan for operation: {0} Data: {1}".format\
-                            (tincan_resp_msg["Request"]["Command"], str(tincan_resp_msg))
+                            msg = {
+                                "type": "peer_state",
+                                "uid": tincan_resp_msg["Request"]["UID"],
+                                "ip4": "",
+                                "fpr": "",
+                                "mac": "",
+                                "ttl": "",
+                                "rate": "",
+                                "status": resp_msg["Status"],
+                                "interface_name": interface_name
+                            }
+                        log = "Peer UID:{0} State:{1}".format(tincan_resp_msg["Request"]["UID"], resp_msg["Status"])
                         self.registerCBT('Logger', 'debug', log)
-                        msg = {
-                            "type": "con_resp",
-                            "uid": tincan_resp_msg["Request"]["PeerInfo"]["UID"],
-                            "data": {
-                                "fpr": tincan_resp_msg["Request"]["PeerInfo"]["Fingerprint"],
-                                "cas": tincan_resp_msg["Request"]["PeerInfo"]["CAS"],
-                            },
-                            "status": "offline",
-                            "interface_name": interface_name
-                        }
-                        return
-                    elif req_operation == "QueryCandidateAddressSet":
-                        resp_msg = json.loads(tincan_resp_msg["Response"]["Message"])
-                        resp_target_module = tincan_resp_msg["Request"]["Initiator"]
-                        if "Controlled" in resp_msg.keys():
-                            cas  = str(resp_msg["Controlled"])
-                            if cas.find("stun") != -1:
-                                msg = {
-                                    "interface_name": interface_name,
-                                    "cas": cas,
-                                    "type": "set_geo_ip"
-                                } #FixMe
-                                self.registerCBT(resp_target_module, 'TINCAN_RESPONSE', msg)
-                                return
-                        elif "Controlling" in resp_msg.keys():
-                            cas  = str(resp_msg["Controlling"])
-                            if cas.find("stun") != -1:
-                                msg = {
-                                    "interface_name": interface_name,
-                                    "cas": cas,
-                                    "type": "set_geo_ip"
-                                }  #FixMe
-                                self.registerCBT(resp_target_module, 'TINCAN_RESPONSE', msg)
-                                return
-                    elif req_operation == "QueryLinkStats":
-                        resp_msg = json.loads(tincan_resp_msg["Response"]["Message"])
-                        resp_target_module = tincan_resp_msg["Request"]["Initiator"]
-                        self.registerCBT('Logger', 'info', json.dumps(resp_msg))
-                        return # Fix Me - LinkManager not coded to recieve Tunnel Stats
-                        self.registerCBT(resp_target_module, 'TINCAN_RESPONSE', resp_msg)
-                    elif req_operation in ["CreateCtrlRespLink", "ConfigureLogging", "CreateVnet",
-                                           "SetIgnoredNetInterfaces", "RemovePeer"]:
-                        self.registerCBT("Logger", "info", "Received data from Tincan: Operation: {0}."
-                                                          " Task status::{1}".format(req_operation,
-                                                                                     tincan_resp_msg["Response"]))
-                        return
-                    else:
-                        log = '{0}: unrecognized Data {1} received from {2}. Data:::{3}' \
-                            .format(cbt.recipient, cbt.action, cbt.initiator, cbt.data)
-                        self.registerCBT('Logger', 'warning', log)
+                        self.registerCBT(resp_target_module, 'TINCAN_RESPONSE', msg)
+                # Whether the response is for DO_GET_CAS operation
+                elif req_operation == "CreateTunnel":
+                    # Sends the CAS to LinkManager
+                    resp_target_module = tincan_resp_msg["Request"]["Initiator"]
+                    log = "Received data from Tincan for operation: {0}. Data: {1}".\
+                        format(tincan_resp_msg["Request"]["Command"], str(tincan_resp_msg))
+                    self.registerCBT('Logger', 'info', log)
+                    msg = {
+                        "uid": tincan_resp_msg["Request"]["PeerInfo"]["UID"],
+                        "data": {
+                            "fpr": tincan_resp_msg["Request"]["PeerInfo"]["Fingerprint"],
+                            "cas": tincan_resp_msg['Response']['Message'],
+                            "peer_mac": tincan_resp_msg["Request"]["PeerInfo"]["MAC"]
+                        },
+                        "interface_name": interface_name
+                    }
+                    self.registerCBT(resp_target_module, 'SEND_CAS_DETAILS_TO_PEER', msg)
+                elif req_operation == "ConnectTunnel":
+                    # Response message for Connection Request for a p2plink
+                    log = "Received data from Tincan for operation: {0} Data: {1}".format\
+                        (tincan_resp_msg["Request"]["Command"], str(tincan_resp_msg))
+                    self.registerCBT('Logger', 'debug', log)
+                    msg = {
+                        "type": "con_resp",
+                        "uid": tincan_resp_msg["Request"]["PeerInfo"]["UID"],
+                        "data": {
+                            "fpr": tincan_resp_msg["Request"]["PeerInfo"]["Fingerprint"],
+                            "cas": tincan_resp_msg["Request"]["PeerInfo"]["CAS"],
+                        },
+                        "status": "offline",
+                        "interface_name": interface_name
+                    }
+                    return
+                elif req_operation == "QueryCandidateAddressSet":
+                    resp_msg = jsoncodec.loads(tincan_resp_msg["Response"]["Message"])
+                    resp_target_module = tincan_resp_msg["Request"]["Initiator"]
+                    if "Controlled" in resp_msg.keys():
+                        cas  = str(resp_msg["Controlled"])
+                        if cas.find("stun") != -1:
+                            msg = {
+                                "interface_name": interface_name,
+                                "cas": cas,
+                                "type": "set_geo_ip"
+                            } #FixMe
+                            self.registerCBT(resp_target_module, 'TINCAN_RESPONSE', msg)
+                            return
+                    elif "Controlling" in resp_msg.keys():
+                        cas  = str(resp_msg["Controlling"])
+                        if cas.find("stun") != -1:
+                            msg = {
+                                "interface_name": interface_name,
+                                "cas": cas,
+                                "type": "set_geo_ip"
+                            }  #FixMe
+                            self.registerCBT(resp_target_module, 'TINCAN_RESPONSE', msg)
+                            return
+                elif req_operation == "QueryLinkStats":
+                    resp_msg = jsoncodec.loads(tincan_resp_msg["Response"]["Message"])
+                    resp_target_module = tincan_resp_msg["Request"]["Initiator"]
+                    self.registerCBT('Logger', 'info', jsoncodec.dumps(resp_msg))
+                    return # Fix Me - LinkManager not coded to recieve Tunnel Stats
+                    self.registerCBT(resp_target_module, 'TINCAN_RESPONSE', resp_msg)
+                elif req_operation in ["CreateCtrlRespLink", "ConfigureLogging", "CreateVnet",
+                                       "SetIgnoredNetInterfaces", "RemovePeer"]:
+                    self.registerCBT("Logger", "info", "Received data from Tincan: Operation: {0}."
+                                                      " Task status::{1}".format(req_operation,
+                                                                                 tincan_resp_msg["Response"]))
+                    return
                 else:
-                    log = 'Tincan Failure Status for request:: '.format(cbt.data)
+                    log = '{0}: unrecognized Tincan response received. Data:::{1}' \
+                        .format(self.ModuleName, data)
                     self.registerCBT('Logger', 'warning', log)
             else:
-                # Checks whether the message is an ICC message
-                if req_operation == "ICC":
-                    iccmsg = json.loads(tincan_resp_msg["Request"]["Data"])
-                    self.registerCBT('Logger', 'debug', "ICC Message Received ::" + str(iccmsg))
-                    if "msg" in iccmsg.keys():
-                        iccmsg["msg"]["type"] = "remote"
-                        iccmsg["msg"]["interface_name"] = tincan_resp_msg["Request"]["InterfaceName"]
-                        if "message_type" in iccmsg["msg"]:
-                            # Check whether data routed is Packetdata
-                            if iccmsg["msg"]["message_type"] == "BroadcastPkt":
-                                dataframe = iccmsg["msg"]["dataframe"]
-                                # Check whether the Packet is ARP Packet
-                                if dataframe[24:28] == "0806":
-                                    self.registerCBT('ArpCache', 'ARPPacket', iccmsg["msg"])
-                                # Check whether packet is IPv4 Multicast Packet
-                                #elif dataframe[0:6] == "01005E":
-                                #    self.registerCBT('IPMulticast', 'IPv4_MULTICAST', iccmsg["msg"])
-                                # Check whether packet is IPv6 Multicast Packet
-                                #elif dataframe[0:4] == "3300":
-                                #    self.registerCBT('IPMulticast', 'IPv6_MULTICAST', iccmsg["msg"])
-                                else:
-                                    # Broadcast other packets
-                                    self.registerCBT('BroadcastForwarder', 'BroadcastPkt', iccmsg["msg"])
-                            # Check whether data is Control data
-                            elif iccmsg["msg"]["message_type"] == "BroadcastData":
-                                # Convert string control data to dictionary
-                                iccmessage = ast.literal_eval(iccmsg["msg"]["dataframe"])
-                                iccmessage["interface_name"] = tincan_resp_msg["Request"]["InterfaceName"]
-                                # Check the control data message type so that it routes to appropriate module
-                                if iccmessage["message_type"] == "SendMacDetails":
-                                    self.registerCBT('ArpCache', 'PeerMACIPDetails', iccmessage)
-                                self.registerCBT('BroadcastForwarder', 'BroadcastData', iccmsg["msg"])
+                log = 'Tincan Failure Status for request:: {0}'.format(data)
+                self.registerCBT('Logger', 'warning', log)
+        else:
+            # Checks whether the message is an ICC message
+            if req_operation == "ICC":
+                iccmsg = jsoncodec.loads(tincan_resp_msg["Request"]["Data"])
+                self.registerCBT('Logger', 'debug', "ICC Message Received ::" + str(iccmsg))
+                if "msg" in iccmsg.keys():
+                    iccmsg["msg"]["type"] = "remote"
+                    iccmsg["msg"]["interface_name"] = tincan_resp_msg["Request"]["InterfaceName"]
+                    if "message_type" in iccmsg["msg"]:
+                        # Check whether data routed is Packetdata
+                        if iccmsg["msg"]["message_type"] == "BroadcastPkt":
+                            # Decode the frame once, modules downstream use the parsed header fields
+                            dataframe = TapFrame.from_hex(iccmsg["msg"]["dataframe"])
+                            iccmsg["msg"]["dataframe"] = dataframe
+                            # Check whether the Packet is ARP Packet
+                            if dataframe.ethertype == ETH_P_ARP:
+                                self.registerCBT('ArpCache', 'ARPPacket', iccmsg["msg"])
+                            # Check whether packet is IPv4 Multicast Packet
+                            #elif dataframe[0:6] == "01005E":
+                            #    self.registerCBT('IPMulticast', 'IPv4_MULTICAST', iccmsg["msg"])
+                            # Check whether packet is IPv6 Multicast Packet
+                            #elif dataframe[0:4] == "3300":
+                            #    self.registerCBT('IPMulticast', 'IPv6_MULTICAST', iccmsg["msg"])
                             else:
-                                self.registerCBT('BaseTopologyManager', 'ICC_CONTROL', iccmsg["msg"])
-                        else:
+                                # Broadcast other packets
+                                self.registerCBT('BroadcastForwarder', 'BroadcastPkt', iccmsg["msg"])
+                        # Check whether data is Control data
+                        elif iccmsg["msg"]["message_type"] == "BroadcastData":
+                            # Decode the control data, relays re-encode it from the decoded dictionary
+                            iccmsg["msg"]["dataframe"] = bcastcodec.decode(iccmsg["msg"]["dataframe"])
+                            iccmessage = dict(iccmsg["msg"]["dataframe"])
+                            iccmessage["interface_name"] = tincan_resp_msg["Request"]["InterfaceName"]
+                            # Check the control data message type so that it routes to appropriate module
+                            if iccmessage["message_type"] == "SendMacDetails":
+                                self.registerCBT('ArpCache', 'PeerMACIPDetails', iccmessage)
                             self.registerCBT('BroadcastForwarder', 'BroadcastData', iccmsg["msg"])
+                        else:
+                            self.registerCBT('BaseTopologyManager', 'ICC_CONTROL', iccmsg["msg"])
                     else:
-                        # Pass all non routing messages to BTM
-                        iccmsg["interface_name"] = tincan_resp_msg["Request"]["InterfaceName"]
-                        self.registerCBT('BaseTopologyManager', 'ICC_CONTROL', iccmsg)
+                        self.registerCBT('BroadcastForwarder', 'BroadcastData', iccmsg["msg"])
+                else:
+                    # Pass all non routing messages to BTM
+                    iccmsg["interface_name"] = tincan_resp_msg["Request"]["InterfaceName"]
+                    self.registerCBT('BaseTopologyManager', 'ICC_CONTROL', iccmsg)
 
-                elif req_operation == "UpdateRoutes":
-                    msg = tincan_resp_msg["Request"]["Data"]
-                    interface_name = tincan_resp_msg["Request"]["InterfaceName"]
-                    # Create message for inter module communication within the controller
-                    datagram = {
-                        "dataframe": msg,
-                        "interface_name": interface_name,
-                        "type": "local"
-                    }
+            # Unsolicited link state change of a peer, saves LinkManager from waiting for its next poll
+            elif req_operation == "LinkStateChange":
+                request = tincan_resp_msg["Request"]
+                msg = {
+                    "type": "peer_state",
+                    "uid": request["UID"],
+                    "status": request["Status"],
+                    "interface_name": interface_name
+                }
+                # Only a MAC sent by Tincan is passed on, the peer record keeps the MAC it already has
+                if request.get("MAC"):
+                    msg["mac"] = request["MAC"]
+                self.registerCBT('Logger', 'debug', "Peer UID:{0} link state changed to {1}"
+                                 .format(request["UID"], request["Status"]))
+                self.registerCBT('LinkManager', 'LINK_STATE_CHANGE', msg)
+            elif req_operation == "UpdateRoutes":
+                msg = TapFrame.from_hex(tincan_resp_msg["Request"]["Data"])
+                interface_name = tincan_resp_msg["Request"]["InterfaceName"]
+                # Create message for inter module communication within the controller
+                datagram = {
+                    "dataframe": msg,
+                    "interface_name": interface_name,
+                    "type": "local"
+                }
 
-                    log = "Tincan Packet received ::{0}".format(datagram)
-                    self.registerCBT('Logger', 'debug', log)
-                    # Check for IPv4 and IPv6 Packet, if YES send it to BTM for processing
-                    if str(msg[24:28]) in ["0800", "86DD"]:
-                        datagram["m_type"] = "IP"
-                        self.registerCBT("BaseTopologyManager", "TINCAN_PACKET", datagram)
-                    # Check whether Packet is ARP message then route to ARPManager
-                    elif str(msg[24:28]) == "0806":
-                        datagram["m_type"] = "ARP"
-                        self.registerCBT('ArpCache', 'ARPPacket', datagram)
-                    # Send all other Packets for Broadcast
-                    else:
-                        datagram["message_type"] = "BroadcastPkt"
-                        self.registerCBT('BroadcastForwarder', 'BroadcastPkt', datagram)
+                log = "Tincan Packet received ::{0}".format(datagram)
+                self.registerCBT('Logger', 'debug', log)
+                # Check for IPv4 and IPv6 Packet, if YES send it to BTM for processing
+                if msg.ethertype in (ETH_P_IP, ETH_P_IPV6):
+                    datagram["m_type"] = "IP"
+                    self.registerCBT("BaseTopologyManager", "TINCAN_PACKET", datagram)
+                # Check whether Packet is ARP message then route to ARPManager
+                elif msg.ethertype == ETH_P_ARP:
+                    datagram["m_type"] = "ARP"
+                    self.registerCBT('ArpCache', 'ARPPacket', datagram)
+                # Send all other Packets for Broadcast
                 else:
-                    log = '{0}: unrecognized Data {1} received from {2}. Data:::{3}' \
-                        .format(cbt.recipient, cbt.action, cbt.initiator, cbt.data)
-                    self.registerCBT('Logger', 'warning', log)
-        else:
-            log = '{0}: unrecognized CBT {1} received from {2}'\
-                    .format(cbt.recipient, cbt.action, cbt.initiator)
-            self.registerCBT('Logger', 'warning', log)
+                    datagram["message_type"] = "BroadcastPkt"
+                    self.registerCBT('BroadcastForwarder', 'BroadcastPkt', datagram)
+            else:
+                log = '{0}: unrecognized Tincan message received. Data:::{1}' \
+                    .format(self.ModuleName, data)
+                self.registerCBT('Logger', 'warning', log)
 
     def send_msg(self, msg):
-        return self.sock.sendto(bytes(msg.encode('utf-8')), self.dest)
+        # Queue the message, the batch is flushed at the end of the dispatch cycle or once it is full
+        if self.channel.send(msg) >= self.CMConfig["SendBatchSize"]:
+            self.channel.flush()
 
     def timer_method(self):
-        pass
+        # Resend the requests whose deadline passed and report the ones that ran out of retries
+        resend, timed_out = self.transactions.expire()
+        for trans in resend:
+            self.registerCBT('Logger', 'debug', "Retrying Tincan Request (attempt {0}): {1}"
+                             .format(trans.attempts, trans.request))
+            self.send_msg(trans.request)
+        self.channel.flush()
+        for trans in timed_out:
+            log = "Tincan {0} request {1} from {2} timed out after {3} attempts"\
+                .format(trans.command, trans.tid, trans.initiator, trans.attempts)
+            self.registerCBT('Logger', 'warning', log)
 
     def terminate(self):
         pass
+    # Returns the TransactionId for a new Tincan request, safe to call from any thread
+    def next_transaction_id(self):
+        return next(self.trans_counter)
+
+    # Build and send a request from a template. Commands Tincan responds to are tracked until the response arrives
+    # and their Transaction is returned, callback(transaction) is invoked with the response or once the request
+    # timed out. Other commands, every data plane send among them, return a SentRequest tuple.
+    def send_request(self, template, owner=None, callback=None, timeout=None, **fields):
+        tid = self.next_transaction_id()
+        request = template.build(tid, owner, **fields)
+        return self.track_request(tid, template.command, request, fields.get("Initiator"), callback, timeout)
+
+    def track_request(self, tid, command, request, initiator=None, callback=None, timeout=None):
+        if command in self.tracked_commands or callback is not None:
+            retries = None if command in self.retry_commands else 0
+            trans = self.transactions.add(tid, command, request, initiator, callback, timeout, retries)
+        else:
+            trans = SentRequest(tid, command, request, initiator)
+        self.send_msg(request)
+        return trans
+
     '''
     Instructs Tincan to create the UDP control connection for sending message to the controller
     '''
     def create_control_link(self,):
         self.registerCBT("Logger", "info", "Creating Tincan control response link")
-        ep = ipoplib.RESPLINK
+        fields = {}
         if self.CMConfig["ctrl_recv_port"] is not None:
-          ep["IPOP"]["Request"]["Port"] = self.CMConfig["ctrl_recv_port"]
+            fields["Port"] = self.CMConfig["ctrl_recv_port"]
         if socket.has_ipv6 is False:
-            ep["IPOP"]["Request"]["AddressFamily"] = "af_inet"
-            ep["IPOP"]["Request"]["IP"] = self.CMConfig["localhost"]
+            fields["AddressFamily"] = "af_inet"
+            fields["IP"] = self.CMConfig["localhost"]
         else:
-            ep["IPOP"]["Request"]["AddressFamily"] = "af_inetv6"
-            ep["IPOP"]["Request"]["IP"] = self.CMConfig["localhost6"]
-        ep["IPOP"]["TransactionId"] = self.trans_counter
-        self.trans_counter += 1
-        self.send_msg(json.dumps(ep))
+            fields["AddressFamily"] = "af_inetv6"
+            fields["IP"] = self.CMConfig["localhost6"]
+        self.send_request(ipoplib.RESPLINK, **fields)
 
     '''
     Set Tincan's Logging Level
@@ -467,17 +533,13 @@ class TincanInterface(ControllerModule):
     def set_log_level(self,):
         log_level = self.CFxHandle.queryParam("Logger", "LogLevel")
         self.registerCBT("Logger", "info", "Setting Tincan log level to " + log_level)
-        lgl = ipoplib.LOGCFG
-        lgl["IPOP"]["Request"]["Level"] = log_level
-        lgl["IPOP"]["Request"]["Device"] = self.CFxHandle.queryParam("Logger", "LogOption")
-        lgl["IPOP"]["Request"]["Directory"] = self.CFxHandle.queryParam("Logger", "LogFilePath")
-        lgl["IPOP"]["Request"]["Filename"] = self.CFxHandle.queryParam("Logger", "TincanLogFileName")
-        lgl["IPOP"]["Request"]["MaxArchives"] = self.CFxHandle.queryParam("Logger", "BackupLogFileCount")
-        lgl["IPOP"]["Request"]["MaxFileSize"] = self.CFxHandle.queryParam("Logger", "LogFileSize")
-        lgl["IPOP"]["Request"]["ConsoleLevel"] = self.CFxHandle.queryParam("Logger", "ConsoleLevel")
-        lgl["IPOP"]["TransactionId"] = self.trans_counter
-        self.trans_counter += 1
-        self.send_msg(json.dumps(lgl))
+        self.send_request(ipoplib.LOGCFG, Level=log_level,
+                          Device=self.CFxHandle.queryParam("Logger", "LogOption"),
+                          Directory=self.CFxHandle.queryParam("Logger", "LogFilePath"),
+                          Filename=self.CFxHandle.queryParam("Logger", "TincanLogFileName"),
+                          MaxArchives=self.CFxHandle.queryParam("Logger", "BackupLogFileCount"),
+                          MaxFileSize=self.CFxHandle.queryParam("Logger", "LogFileSize"),
+                          ConsoleLevel=self.CFxHandle.queryParam("Logger", "ConsoleLevel"))
 
     '''
     Create the virtual network specfied in the config 
@@ -485,32 +547,31 @@ class TincanInterface(ControllerModule):
     def create_virtual_networks(self,):
         for i in range(len(self.CMConfig["Vnets"])):
             vnetdetails = self.CMConfig["Vnets"][i]
-            vn = ipoplib.VNET
             # Create VNET Request Message
             self.registerCBT("Logger", "info", "Creating Vnet {0}".format(vnetdetails["TapName"]))
-            vn["IPOP"]["Request"]["InterfaceName"] = vnetdetails["TapName"]
-            vn["IPOP"]["Request"]["Description"] = vnetdetails["Description"]
-            vn["IPOP"]["Request"]["LocalVirtIP4"] = vnetdetails["IP4"]
-            vn["IPOP"]["Request"]["LocalPrefix4"] = vnetdetails["IP4PrefixLen"]
-            if "MTU4" in vnetdetails:
-                vn["IPOP"]["Request"]["MTU4"] = vnetdetails["MTU4"]
             vnetdetails["uid"] = fxlib.gen_uid(vnetdetails["IP4"])
-            vn["IPOP"]["Request"]["LocalUID"] = vnetdetails["uid"]
-            # Currently configured to take the first stun address
-            vn["IPOP"]["Request"]["StunAddress"] = self.CMConfig["Stun"][0]
+            fields = {
+                "InterfaceName": vnetdetails["TapName"],
+                "Description": vnetdetails["Description"],
+                "LocalVirtIP4": vnetdetails["IP4"],
+                "LocalPrefix4": vnetdetails["IP4PrefixLen"],
+                "LocalUID": vnetdetails["uid"],
+                # Currently configured to take the first stun address
+                "StunAddress": self.CMConfig["Stun"][0],
+                "L2TunnelEnabled": True
+            }
+            if "MTU4" in vnetdetails:
+                fields["MTU4"] = vnetdetails["MTU4"]
             if "Turn" in self.CMConfig:
                 if self.CMConfig["Turn"][0]["Address"] is not None:
-                    vn["IPOP"]["Request"]["TurnAddress"] = self.CMConfig["Turn"][0]["Address"]
+                    fields["TurnAddress"] = self.CMConfig["Turn"][0]["Address"]
                 if self.CMConfig["Turn"][0]["User"] is not None:
-                    vn["IPOP"]["Request"]["TurnUser"] = self.CMConfig["Turn"][0]["User"]
+                    fields["TurnUser"] = self.CMConfig["Turn"][0]["User"]
                 if self.CMConfig["Turn"][0]["Password"] is not None:
-                    vn["IPOP"]["Request"]["TurnPass"] = self.CMConfig["Turn"][0]["Password"]
+                    fields["TurnPass"] = self.CMConfig["Turn"][0]["Password"]
             if "IPMappingEnabled" in vnetdetails:
-                vn["IPOP"]["Request"]["IPMappingEnabled"] = vnetdetails["IPMappingEnabled"]
-            vn["IPOP"]["Request"]["L2TunnelEnabled"] = True
-            vn["IPOP"]["TransactionId"] = self.trans_counter
-            self.trans_counter += 1
-            self.send_msg(json.dumps(vn))
+                fields["IPMappingEnabled"] = vnetdetails["IPMappingEnabled"]
+            self.send_request(ipoplib.VNET, **fields)
 
     '''
     Network Interfaces that will not be used for tunneling
@@ -521,9 +582,5 @@ class TincanInterface(ControllerModule):
             self.registerCBT("Logger", "info", "Ignoring interfaces {0}".
                               format(vnetdetails["IgnoredNetInterfaces"]))
             if "IgnoredNetInterfaces" in vnetdetails:
-                net_ignore_list = ipoplib.IGNORE
-                net_ignore_list["IPOP"]["Request"]["IgnoredNetInterfaces"] = vnetdetails["IgnoredNetInterfaces"]
-                net_ignore_list["IPOP"]["Request"]["InterfaceName"] = vnetdetails["TapName"]
-                net_ignore_list["IPOP"]["TransactionId"] = self.trans_counter
-                self.trans_counter += 1
-                self.send_msg(json.dumps(net_ignore_list))
+                self.send_request(ipoplib.IGNORE, IgnoredNetInterfaces=vnetdetails["IgnoredNetInterfaces"],
+                                  InterfaceName=vnetdetails["TapName"])
@@ -47,11 +47,29 @@ class XmppClient(ControllerModule):
     def __init__(self, CFxHandle, paramDict, ModuleName):
         ControllerModule.__init__(self, CFxHandle, paramDict, ModuleName)
         self.ipop_xmpp_details = {}
+        # Bare JID of each XMPP connection -> interface name, used to route inbound stanzas
+        self.jid_interface = {}
         self.keyring_installed = False
 
+    # Rebuild the bare JID -> interface index, the bound JID is only final once the session has started
+    def index_interfaces(self):
+        index = {}
+        for interface_name, xmpp_details in self.ipop_xmpp_details.items():
+            for jid in (xmpp_details.get("username"), xmpp_details["XMPPObj"].boundjid.bare):
+                if jid:
+                    index.setdefault(JID(jid).bare, interface_name)
+        self.jid_interface = index
+
+    # Returns the interface of the XMPP connection a stanza was addressed to, None if it is not one of ours
+    def get_interface(self, jid):
+        if not isinstance(jid, JID):
+            jid = JID(jid)
+        return self.jid_interface.get(jid.bare)
+
     # Triggered at start of XMPP session
     def start(self, event):
         try:
+            self.index_interfaces()
             for xmpp_detail in list(self.ipop_xmpp_details.values()):
                 # Check whether Callback functions are configured for XMPP server messages
                 if xmpp_detail["callbackinit"] is False:
@@ -72,33 +90,27 @@ class XmppClient(ControllerModule):
     def handle_presence(self, presence):
         try:
             presence_sender = presence['from']
-            presence_receiver_jid = JID(presence['to'])
-            presence_receiver = str(presence_receiver_jid.user)+"@"+str(presence_receiver_jid.domain)
-            for xmpp_details in self.ipop_xmpp_details.values():
-                # Check whether the Receiver JID belongs to the XMPP Object of the particular virtual network,
-                # If YES update JID-UID table
-                if presence_receiver == xmpp_details["username"] and presence_sender != xmpp_details["XMPPObj"].boundjid\
-                        .full:
-                    xmpp_details["jid_uid"][presence_sender][1] = time.time()
-                    self.log("Presence received from {0}".format(presence_sender), severity=log_level)
+            # Find the virtual network of the XMPP connection the presence was received on
+            interface_name = self.get_interface(presence['to'])
+            if interface_name is None:
+                return
+            xmpp_details = self.ipop_xmpp_details[interface_name]
+            # Ignore the presence of the node itself, otherwise update JID-UID table
+            if presence_sender != xmpp_details["XMPPObj"].boundjid.full:
+                xmpp_details["jid_uid"][presence_sender][1] = time.time()
+                self.log("Presence received from {0}".format(presence_sender), severity=log_level)
         except Exception as err:
             self.log("Exception caught in XMPPClient handle_presence method : {0}".format(err), severity="error")
 
     # Callback Function to update XMPP Roster information (Revocation)
     def updateroster(self, message):
         try:
-            presence_receiver_jid = JID(message['to'])
-            presence_receiver = str(presence_receiver_jid.user) + "@" + str(presence_receiver_jid.domain)
-            interface_name, xmppobj = "", None
-            # Iterate across the XMPPClient module table to find the TapInterface for the XMPP server message
-            for tapName, xmpp_details in list(self.ipop_xmpp_details.items()):
-                if presence_receiver == xmpp_details["username"]:
-                    xmppobj = xmpp_details
-                    interface_name = tapName
-                    break
+            # Find the TapInterface of the XMPP connection the message was received on
+            interface_name = self.get_interface(message['to'])
             # check whether Server Message has a matching key in the XMPP Table if not stop processing
-            if xmppobj is None:
+            if interface_name is None:
                 return
+            xmppobj = self.ipop_xmpp_details[interface_name]
             # iterate across the roster details to find unsubscribe JIDs
             for nodejid, data in message["roster"]["items"].items():
                 if data["subscription"] == "remove":
@@ -133,18 +145,12 @@ class XmppClient(ControllerModule):
         try:
             peerjid = message["from"]
             self.log("Peer JID {0} offline".format(peerjid), severity="info")
-            presence_receiver_jid = JID(message['to'])
-            presence_receiver = str(presence_receiver_jid.user) + "@" + str(presence_receiver_jid.domain)
-            interface_name, xmppobj = "", None
-            # Iterate across the XMPPClient module table to find the TapInterface for the XMPP server message
-            for tapName, xmpp_details in list(self.ipop_xmpp_details.items()):
-                if presence_receiver == xmpp_details["username"]:
-                    xmppobj = xmpp_details
-                    interface_name = tapName
-                    break
+            # Find the TapInterface of the XMPP connection the message was received on
+            interface_name = self.get_interface(message['to'])
             # check whether Server Message has a matching key in the XMPP Table if not stop processing
-            if xmppobj is None:
+            if interface_name is None:
                 return
+            xmppobj = self.ipop_xmpp_details[interface_name]
             # Check whether the JID of the offline peer exists in the JID-UID Table, If YES remove it from the
             # JID-UID, UID-JID and sent a trigger message to Topology Manager
             # to remove it from its discovered node list
@@ -169,19 +175,13 @@ class XmppClient(ControllerModule):
     # extracts the setup and payload and takes suitable action depending on the
     # them.
     def xmppmessagelistener(self, msg):
-        presence_receiver_jid = JID(msg['to'])
         sender_jid = msg['from']
-        presence_receiver = str(presence_receiver_jid.user) + "@" + str(presence_receiver_jid.domain)
-        interface_name, xmppobj = "", None
-        # Iterate across the XMPPClient module table to find the TapInterface for the XMPP server message
-        for tapName, xmpp_details in list(self.ipop_xmpp_details.items()):
-            if presence_receiver == xmpp_details["username"]:
-                xmppobj = xmpp_details
-                interface_name = tapName
-                break
+        # Find the TapInterface of the XMPP connection the message was received on
+        interface_name = self.get_interface(msg['to'])
         # check whether Server Message has a matching key in the XMPP Table if not stop processing
-        if xmppobj is None:
+        if interface_name is None:
             return
+        xmppobj = self.ipop_xmpp_details[interface_name]
         # Check whether Node UID obtained from CFX
         if xmppobj["uid"] == "":
             self.log("UID not received from Tincan. Please check Tincan logs.", severity="warning")
@@ -380,6 +380,7 @@ class XmppClient(ControllerModule):
                     self.ipop_xmpp_details[interface_name]["uid"] = interface_details["uid"]
             # Connect to the XMPP server
             self.xmpp_handler(xmpp_ele, xmppobj)
+        self.index_interfaces()
         self.log("{0} module Loaded".format(self.ModuleName))
 
     def processCBT(self, cbt):
@@ -23,7 +23,12 @@ import sys
 import ssl
 import json
 import time
+import threading
+import traceback
 from controller.framework.ControllerModule import ControllerModule
+from controller.framework.JidCache import JidCache
+from controller.framework.PendingDeliveryStore import PendingDeliveryStore
+import controller.framework.jsoncodec as jsoncodec
 from collections import defaultdict
 
 try:
@@ -33,15 +38,14 @@ try:
     from sleekxmpp.xmlstream.handler.callback import Callback
     from sleekxmpp.xmlstream.matcher import StanzaPath
     from sleekxmpp.stanza.message import Message
+    from sleekxmpp.stanza.presence import Presence
 except:
     raise ImportError("Sleekxmpp Module not installed")
 
 py_ver = sys.version_info[0]
 if py_ver == 3:
-    from queue import Queue
     import _thread as thread
 else:
-    from Queue import Queue
     import thread
 log_level = "info"
 
@@ -51,22 +55,77 @@ class XmppClient(ControllerModule):
         ControllerModule.__init__(self, CFxHandle, paramDict, ModuleName)
         self.presence_publisher = None
         self.ipop_xmpp_details = {}
+        # Bare JID of each XMPP connection -> interface name, used to route inbound stanzas
+        self.jid_interface = {}
+        # (bare JID, vnet tag) -> interface name for the connections shared by several virtual networks
+        self.vnet_interface = {}
+        self.shared_jids = set()
         self.keyring_installed = False
         #self.pending_CBTQ = {}
+        # Forwarded CBT payloads waiting to be packed into one stanza per peer JID
+        self.outbox_lck = threading.Lock()
+        self.flush_timer = None
+
+    # Rebuild the bare JID -> interface index, the bound JID is only final once the session has started
+    def index_interfaces(self):
+        index, vnet_index, shared = {}, {}, set()
+        for interface_name, xmpp_details in self.ipop_xmpp_details.items():
+            for jid in (xmpp_details.get("username"), xmpp_details["XMPPObj"].boundjid.bare):
+                if jid:
+                    bare = JID(jid).bare
+                    if index.setdefault(bare, interface_name) != interface_name:
+                        shared.add(bare)
+                    vnet_index.setdefault((bare, xmpp_details["vnet_tag"]), interface_name)
+        self.jid_interface = index
+        self.vnet_interface = vnet_index
+        self.shared_jids = shared
+
+    # Returns the interface of the XMPP connection a stanza was addressed to, None if it is not one of ours. On a
+    # connection shared by several virtual networks the stanza is demultiplexed by its vnet tag.
+    def get_interface(self, jid, vnet=None):
+        if not isinstance(jid, JID):
+            jid = JID(jid)
+        bare = jid.bare
+        if vnet:
+            interface_name = self.vnet_interface.get((bare, vnet))
+            if interface_name is not None or bare in self.shared_jids:
+                return interface_name
+        return self.jid_interface.get(bare)
+
+    # Send a presence status for a virtual network, tagged with its vnet on a shared connection
+    def send_vnet_presence(self, xmpp_details, pstatus, pto=None):
+        xmppobj = xmpp_details["XMPPObj"]
+        if xmpp_details["vnet"] is None:
+            xmppobj.send_presence(pstatus=pstatus)
+            return
+        presence = xmppobj.make_presence(pstatus=pstatus, pto=pto)
+        presence['Ipop']['vnet'] = xmpp_details["vnet"]
+        presence.send()
 
     # Triggered at start of XMPP session
     def start(self, event):
         try:
+            self.index_interfaces()
             for xmpp_detail in list(self.ipop_xmpp_details.values()):
                 # Check whether Callback functions are configured for XMPP server messages
                 if xmpp_detail["callbackinit"] is False:
-                    xmpp_detail["callbackinit"] = True
+                    # Virtual networks sharing the connection are set up together, handlers are registered once
+                    vnets = [details for details in self.ipop_xmpp_details.values()
+                             if details["XMPPObj"] is xmpp_detail["XMPPObj"]]
+                    for details in vnets:
+                        details["callbackinit"] = True
                     xmpp_detail["XMPPObj"].get_roster()  # Obtains the friends list for the user
-                    xmpp_detail["XMPPObj"].send_presence(pstatus="uid_is#"+xmpp_detail["uid"])  # Sends presence message when the XMPP user is online
+                    # Sends presence message when the XMPP user is online
+                    for details in vnets:
+                        self.send_vnet_presence(details, "uid_is#" + details["uid"])
                     # Event to capture all online peer nodes as seen by the XMPP server
                     xmpp_detail["XMPPObj"].add_event_handler("presence_available", self.handle_presence)
+                    # Event to drop the cached JID of peers going offline
+                    xmpp_detail["XMPPObj"].add_event_handler("presence_unavailable", self.handle_unavailable)
                     # Register IPOP message with the server
                     register_stanza_plugin(Message, IpopMsg)
+                    # Presences carry the vnet tag in the same element
+                    register_stanza_plugin(Presence, IpopMsg)
                     xmpp_detail["XMPPObj"].registerHandler(Callback('Ipop', StanzaPath('message/Ipop'), self.xmppmessagelistener))
         except Exception as err:
             self.log("Exception in XMPPClient:{0} Event:{1}".format(err, event), severity="error")
@@ -75,27 +134,34 @@ class XmppClient(ControllerModule):
     def handle_presence(self, presence):
         #try:
             presence_sender = presence['from']
-            presence_receiver_jid = JID(presence['to'])
-            presence_receiver = str(presence_receiver_jid.user)+"@"+str(presence_receiver_jid.domain)
             status = presence['status']
-            for interface, xmpp_details in self.ipop_xmpp_details.items():
-                # Check whether the Receiver JID belongs to the XMPP Object of the particular virtual network,
-                # If YES update JID-UID table
-                if presence_receiver == xmpp_details["username"] and presence_sender != xmpp_details["XMPPObj"].boundjid\
-                        .full:
+            # Find the virtual network of the XMPP connection the presence was received on
+            interface = self.get_interface(presence['to'], presence['Ipop']['vnet'])
+            if interface is not None:
+                xmpp_details = self.ipop_xmpp_details[interface]
+                # Ignore the presence of the node itself, otherwise update JID-UID table
+                if presence_sender != xmpp_details["XMPPObj"].boundjid.full:
                     if (status != "" and "#" in status):
-                        p_type, uid = status.split('#')
+                        p_type, uid = status.split('#', 1)
                         if (p_type=="uid_is"):
                             self.presence_publisher.PostUpdate(dict(uid_notification=uid, interface_name=interface))
                             self.log("UID {0} received from {1}".format(uid,presence_sender), severity=log_level)
+                            self.update_jid(interface, uid, presence_sender)
+                            # Only the last presence of a shared connection is kept by the server, a peer that
+                            # came online later is told about all the virtual networks directly
+                            self.announce_vnets(xmpp_details, presence_sender)
+                        elif (p_type == "jid_uid"):
+                            # Reply of a peer to a UID query, carries the UID and full JID of the peer
+                            uid, peer_jid = uid.split('#', 1)
+                            self.update_jid(interface, uid, peer_jid)
                         elif (p_type == "uid?"):
                                 if (xmpp_details["uid"]==uid):
-                                    xmpp_details["XMPPObj"].send_presence(pstatus="jid_uid#" + xmpp_details["uid"]+"#"+
-                                                                          xmpp_details["XMPPObj"].boundjid.full)
+                                    self.send_vnet_presence(xmpp_details, "jid_uid#" + xmpp_details["uid"] + "#" +
+                                                            xmpp_details["XMPPObj"].boundjid.full)
                                     setup_load = "UID_MATCH" + "#" + "None" + "#" + str(presence_sender)
                                     msg_load = xmpp_details["XMPPObj"].boundjid.full+"#"+xmpp_details["uid"]
                                     self.sendxmppmsg(presence_sender, xmpp_details["XMPPObj"],
-                                                     setup_load, msg_load)
+                                                     setup_load, msg_load, xmpp_details["vnet"])
                                     self.log("UID {0} matched, replied to {1}".format(uid, presence_sender),
                                              "debug")
                                 else:
@@ -103,27 +169,138 @@ class XmppClient(ControllerModule):
         #except Exception as err:
             #self.log("Exception caught in XmppClient handle_presence method : {0}".format(err), severity="error")
 
-    def arp_uid(self,xmppobj , who_has_uid):
-        xmppobj.send_presence(pstatus="uid?#"+who_has_uid)
+    # Callback Function to drop the cached JID of a peer that went offline
+    def handle_unavailable(self, presence):
+        presence_sender = presence['from']
+        interface = self.get_interface(presence['to'])
+        if interface is None:
+            return
+        # The JID is gone for all the virtual networks sharing the connection
+        xmppobj = self.ipop_xmpp_details[interface]["XMPPObj"]
+        for xmpp_details in self.ipop_xmpp_details.values():
+            if xmpp_details["XMPPObj"] is not xmppobj:
+                continue
+            xmpp_details["announced"].discard(str(presence_sender))
+            uid = xmpp_details["jid_cache"].invalidate(presence_sender)
+            if uid is not None:
+                self.log("JID {0} of UID {1} is unavailable".format(presence_sender, uid), "debug")
+
+    # Send the UIDs of the virtual networks sharing the connection to a peer JID, once per JID so two peers
+    # announcing themselves to each other stop after one exchange
+    def announce_vnets(self, xmpp_details, peer_jid):
+        if xmpp_details["vnet"] is None:
+            return
+        peer_jid = str(peer_jid)
+        for details in self.ipop_xmpp_details.values():
+            if details["XMPPObj"] is xmpp_details["XMPPObj"] and peer_jid not in details["announced"]:
+                details["announced"].add(peer_jid)
+                self.send_vnet_presence(details, "uid_is#" + details["uid"], pto=peer_jid)
+
+    def arp_uid(self, xmpp_details, who_has_uid):
+        self.send_vnet_presence(xmpp_details, "uid?#" + who_has_uid)
+
+    # Cache the JID of a peer UID and send the CBTs waiting for it
+    def update_jid(self, interface_name, uid, jid):
+        self.ipop_xmpp_details[interface_name]["jid_cache"].put(uid, jid)
+        self.send_pending_cbts(interface_name, uid, str(jid))
+
+    def send_pending_cbts(self, interface_name, uid, jid):
+        pending = self.ipop_xmpp_details[interface_name]["pending"].pop(uid)
+        if not pending:
+            return
+        for data in pending:
+            self.send_forwarded_cbt(interface_name, jid, data)
+        # The pending CBTs go out together instead of waiting for the end of the dispatch cycle
+        self.flush_forwarded_cbts(interface_name, jid)
+        self.log("sent out pending cbt for UID {}".format(uid), "debug")
+
+    # Send a CBT payload to a peer JID. With batching the payloads to the same JID are packed into one stanza,
+    # which is sent once MaxBatchCBTs or MaxBatchBytes is reached, at the end of the dispatch cycle or after
+    # MaxBatchDelay seconds.
+    def send_forwarded_cbt(self, interface_name, peer_jid, data):
+        xmpp_details = self.ipop_xmpp_details[interface_name]
+        payload = jsoncodec.dumps(data)
+        if not self.CMConfig["BatchForwardedCBTs"]:
+            self.send_forwarded_batch(xmpp_details, peer_jid, [payload])
+            return
+        with self.outbox_lck:
+            outbox = xmpp_details["outbox"]
+            batch = outbox.get(peer_jid)
+            if batch is None:
+                batch = outbox[peer_jid] = {"payloads": [], "size": 0, "time": time.time()}
+            batch["payloads"].append(payload)
+            batch["size"] += len(payload)
+            full = len(batch["payloads"]) >= self.CMConfig["MaxBatchCBTs"] or \
+                batch["size"] >= self.CMConfig["MaxBatchBytes"]
+            if full:
+                del outbox[peer_jid]
+            elif self.CMConfig["MaxBatchDelay"] > 0 and self.flush_timer is None:
+                self.start_flush_timer()
+        if full:
+            self.send_forwarded_batch(xmpp_details, peer_jid, batch["payloads"])
+
+    # Send the batched payloads of one JID, of one interface or all of them. Without force only the batches held
+    # for at least MaxBatchDelay seconds are sent.
+    def flush_forwarded_cbts(self, interface_name=None, peer_jid=None, force=True):
+        now = time.time()
+        delay = self.CMConfig["MaxBatchDelay"]
+        batches = []
+        with self.outbox_lck:
+            for interface, xmpp_details in self.ipop_xmpp_details.items():
+                if interface_name is not None and interface != interface_name:
+                    continue
+                outbox = xmpp_details["outbox"]
+                for jid in list(outbox.keys()):
+                    if peer_jid is not None and jid != peer_jid:
+                        continue
+                    if force or now - outbox[jid]["time"] >= delay:
+                        batches.append((xmpp_details, jid, outbox.pop(jid)["payloads"]))
+        for xmpp_details, jid, payloads in batches:
+            self.send_forwarded_batch(xmpp_details, jid, payloads)
+
+    def send_forwarded_batch(self, xmpp_details, peer_jid, payloads):
+        xmppobj, vnet = xmpp_details["XMPPObj"], xmpp_details["vnet"]
+        # A single payload is sent as a plain FORWARDED_CBT so peers without batching support understand it
+        if len(payloads) == 1:
+            setup_load = "FORWARDED_CBT" + "#" + "None" + "#" + peer_jid
+            self.sendxmppmsg(peer_jid, xmppobj, setup_load, payloads[0], vnet)
+        else:
+            setup_load = "FORWARDED_CBTS" + "#" + "None" + "#" + peer_jid
+            self.sendxmppmsg(peer_jid, xmppobj, setup_load, "[" + ",".join(payloads) + "]", vnet)
+
+    # Called with the outbox lock held
+    def start_flush_timer(self):
+        self.flush_timer = threading.Timer(self.CMConfig["MaxBatchDelay"], self.flush_timer_expired)
+        self.flush_timer.daemon = True
+        self.flush_timer.start()
+
+    def flush_timer_expired(self):
+        with self.outbox_lck:
+            self.flush_timer = None
+        self.flush_forwarded_cbts(force=False)
+        with self.outbox_lck:
+            if self.flush_timer is None and any(xmpp_details["outbox"] for xmpp_details in
+                                                self.ipop_xmpp_details.values()):
+                self.start_flush_timer()
+
+    # Returns the registerCBT arguments of a CBT forwarded by a peer
+    def forwarded_cbt(self, payload, interface_name):
+        src_uid = payload["sender_uid"]
+        cbtdata = dict(uid=src_uid, data=payload['core_data'], interface_name=interface_name)
+        return (payload["dest_module"], payload["action"], cbtdata, src_uid)
 
     # This handler method listens for the matched messages on the xmpp stream,
     # extracts the setup and payload and takes suitable action depending on the
     # them.
     def xmppmessagelistener(self, msg):
-        receiver_jid = JID(msg['to'])
         sender_jid = msg['from']
-        receiver = str(receiver_jid.user) + "@" + str(receiver_jid.domain)
-        interface_name, xmppobj = "", None
         self.log("RECEIVED MESSAGE MSG {} ".format(msg), "debug")
-        # Iterate across the XMPPClient module table to find the TapInterface for the XMPP server message
-        for tapName, xmpp_details in list(self.ipop_xmpp_details.items()):
-            if receiver == xmpp_details["username"]:
-                xmppobj = xmpp_details
-                interface_name = tapName
-                break
+        # Find the TapInterface of the XMPP connection the message was received on
+        interface_name = self.get_interface(msg['to'], msg['Ipop']['vnet'])
         # check whether Server Message has a matching key in the XMPP Table if not stop processing
-        if xmppobj is None:
+        if interface_name is None:
             return
+        xmppobj = self.ipop_xmpp_details[interface_name]
         # Check whether Node UID obtained from CFX
         if xmppobj["uid"] == "":
             self.log("UID not received from Tincan. Please check Tincan logs.", severity="warning")
@@ -145,39 +322,29 @@ class XmppClient(ControllerModule):
             # This type does not contains target uid
             match_jid,matched_uid = payload.split("#")
             self.log("UID match received from JID {} for UID {}".format(match_jid,matched_uid),"debug")
-            # complete all pending CBTs
-            #CBTQ = self.pending_CBTQ[matched_uid]
-            CBTQ = self.ipop_xmpp_details[interface_name]["pending_CBTQ"][matched_uid]
-            self.log("Type CBTQ {} ".format(type(CBTQ)), "debug")
-            self.log("CBTQ {} ".format(CBTQ),"debug")
-            while not CBTQ.empty():
-                cbt = CBTQ.get()
-                self.log("cbt {}".format(cbt),"debug")
-                setup_load = "FORWARDED_CBT" + "#" + "None" + "#" + match_jid
-                msg_payload = json.dumps(cbt)
-                self.sendxmppmsg(match_jid,xmppobj["XMPPObj"],setup_load,msg_payload)
-            self.log("sent out pending cbt for UID {}".format(matched_uid), "debug")
+            # cache the JID and complete all pending CBTs
+            self.update_jid(interface_name, matched_uid, match_jid)
             return
 
         elif msg_type == "FORWARDED_CBT":
-            self.log("____________________HERE-6__________________", "debug")
             # does not contains target uid
-            payload = json.loads(payload)
+            payload = jsoncodec.loads(payload)
             self.log("payload {}".format(payload), "debug")
-            self.log("____________________HERE-7__________________", "debug")
-            dest_module = payload["dest_module"]
-            self.log("____________________HERE-8__________________", "debug")
-            src_uid = payload["sender_uid"]
-            action = payload["action"]
-            cbtdata = dict(uid=src_uid,data=payload['core_data'],interface_name = interface_name)
-            self.log("cbtdata {}".format(cbtdata),"debug")
-            self.registerCBT(dest_module, action, cbtdata, _tag=src_uid)
+            self.registerCBTs([self.forwarded_cbt(payload, interface_name)])
             self.log("Received forwarded CBT from {}".format(sender_jid),"debug")
             return
 
+        elif msg_type == "FORWARDED_CBTS":
+            # batch of forwarded CBTs, unpacked into individual CBTs
+            payloads = jsoncodec.loads(payload)
+            self.registerCBTs([self.forwarded_cbt(item, interface_name) for item in payloads])
+            self.log("Received {} forwarded CBTs from {}".format(len(payloads), sender_jid), "debug")
+            return
+
 
     # Send message to Peer JID via XMPP server
-    def sendxmppmsg(self, peer_jid, xmppobj, setup_load=None, msg_payload=None):
+    # vnet tags the message on a connection shared by several virtual networks
+    def sendxmppmsg(self, peer_jid, xmppobj, setup_load=None, msg_payload=None, vnet=None):
         if setup_load is None:
             setup_load = "regular_msg" + "#" + "None" + "#" + peer_jid.full
 
@@ -194,6 +361,8 @@ class XmppClient(ControllerModule):
         msg['type'] = 'chat'
         msg['Ipop']['setup'] = setup_load
         msg['Ipop']['payload'] = content_load
+        if vnet is not None:
+            msg['Ipop']['vnet'] = vnet
         msg.send()
         self.log("Sent XMPP message to {0}".format(peer_jid), severity=log_level)
 
@@ -218,11 +387,16 @@ class XmppClient(ControllerModule):
         xmpp_details = self.CMConfig.get("XmppDetails")
         self.presence_publisher = self.CFxHandle.PublishSubscription("PEER_PRESENCE_NOTIFICATION")
         xmpp_password = None
+        # XMPP connections by account and server, reused by the virtual networks that can share them
+        connections = {}
         # Iterate over the XMPP credentials for different virtual networks configured in ipop-config.json
         for i, xmpp_ele in enumerate(xmpp_details):
             xmpp_ele = dict(xmpp_ele)
             interface_name = xmpp_ele['TapName']
             self.ipop_xmpp_details[interface_name] = {}
+            connection_key = (xmpp_ele.get("AuthenticationMethod"), xmpp_ele.get("Username"),
+                              xmpp_ele.get("CertFile"), xmpp_ele.get("AddressHost"), xmpp_ele.get("Port"))
+            shared_xmppobj = connections.get(connection_key) if self.CMConfig["ShareConnection"] else None
             # Check whether the authentication mechanism is certifcate if YES then config file should not contain
             # Password based authentication parameters
             if xmpp_ele.get("AuthenticationMethod") == "x509" and (xmpp_ele.get("Username", None) is not None
@@ -230,7 +404,9 @@ class XmppClient(ControllerModule):
                 raise RuntimeError("x509 Authentication Error: Username/Password in IPOP configuration file.")
 
             # Check the Authentication Method configured for the particular virtual network interface
-            if xmpp_ele.get("AuthenticationMethod") == "x509":
+            if shared_xmppobj is not None:
+                xmppobj = shared_xmppobj
+            elif xmpp_ele.get("AuthenticationMethod") == "x509":
                 xmppobj = sleekxmpp.ClientXMPP(None, None, sasl_mech='EXTERNAL')
                 xmppobj.ssl_version = ssl.PROTOCOL_TLSv1
                 xmppobj.ca_certs = xmpp_ele["TrustStore"]
@@ -272,13 +448,26 @@ class XmppClient(ControllerModule):
                 else:
                     xmppobj.ca_certs = xmpp_ele["TrustStore"]
 
-            # Register event handler for session start and Roster Update in case a user gets unfriended
-            xmppobj.add_event_handler("session_start", self.start)
+            if shared_xmppobj is None:
+                # Register event handler for session start and Roster Update in case a user gets unfriended
+                xmppobj.add_event_handler("session_start", self.start)
+                connections[connection_key] = xmppobj
 
             self.ipop_xmpp_details[interface_name]["XMPPObj"] = xmppobj     # Store the Sleekxmpp object in the Table
-            self.ipop_xmpp_details[interface_name]["pending_CBTQ"] = {} # map for holding pending cbt data to be forwarded
+            # Tag demultiplexing the stanzas of a shared connection, vnet is only set once the connection is shared
+            self.ipop_xmpp_details[interface_name]["vnet_tag"] = xmpp_ele.get("VnetTag", interface_name)
+            self.ipop_xmpp_details[interface_name]["vnet"] = None
+            # Peer JIDs this virtual network has been announced to directly
+            self.ipop_xmpp_details[interface_name]["announced"] = set()
+            # CBT data waiting for the JID of its peer UID to be resolved
+            self.ipop_xmpp_details[interface_name]["pending"] = PendingDeliveryStore(
+                self.CMConfig["PendingCBTCapacity"], self.CMConfig["PendingCBTTTL"])
+            self.ipop_xmpp_details[interface_name]["outbox"] = {}   # peer JID -> batched forwarded CBT payloads
+            # UID -> JID of the peers, saves a roster wide UID query per forwarded CBT
+            self.ipop_xmpp_details[interface_name]["jid_cache"] = JidCache(self.CMConfig["JidCacheTTL"],
+                                                                           self.CMConfig["JidQueryInterval"])
             # Store XMPP UserName (required to extract TapInterface from the XMPP server message)
-            self.ipop_xmpp_details[interface_name]["username"] = xmpp_ele["Username"]
+            self.ipop_xmpp_details[interface_name]["username"] = xmpp_ele.get("Username")
             # Flag to check whether the XMPP Callback for various functionalities have been set
             self.ipop_xmpp_details[interface_name]["callbackinit"] = False
             # Query VirtualNetwork Interface details from TincanInterface module
@@ -288,12 +477,42 @@ class XmppClient(ControllerModule):
                 # Check whether the TapName given in the XMPPClient and TincanInterface module if yes load UID
                 if interface_details["TapName"] == interface_name:
                     self.ipop_xmpp_details[interface_name]["uid"] = interface_details["uid"]
-            # Connect to the XMPP server
-            self.xmpp_handler(xmpp_ele, xmppobj)
+            # Connect to the XMPP server, a shared connection is already being set up
+            if shared_xmppobj is None:
+                self.xmpp_handler(xmpp_ele, xmppobj)
+        # Stanzas of a connection serving several virtual networks carry the vnet tag
+        for xmpp_detail in self.ipop_xmpp_details.values():
+            if sum(1 for details in self.ipop_xmpp_details.values()
+                   if details["XMPPObj"] is xmpp_detail["XMPPObj"]) > 1:
+                xmpp_detail["vnet"] = xmpp_detail["vnet_tag"]
+        self.index_interfaces()
         self.log("{0} module Loaded".format(self.ModuleName))
 
+    # Forwarded CBTs queued while processing the batch are sent at the end of the dispatch cycle
+    def processCBTBatch(self, cbts):
+        try:
+            for cbt in cbts:
+                try:
+                    self.processCBT(cbt)
+                except Exception:
+                    log = "CBT exception:\n    action    {0}:\n    data      {1}:\n    traceback:\n{2}"\
+                        .format(cbt.action, cbt.data, traceback.format_exc())
+                    self.registerCBT('Logger', 'warning', log)
+        finally:
+            self.flush_forwarded_cbts(force=self.CMConfig["MaxBatchDelay"] <= 0)
+
     def processCBT(self, cbt):
         message = cbt.data
+        if cbt.action == "GET_JID_CACHE_STATS":
+            self.registerCBT(cbt.initiator, "JID_CACHE_STATS",
+                             dict((interface_name, xmpp_details["jid_cache"].get_stats())
+                                  for interface_name, xmpp_details in self.ipop_xmpp_details.items()))
+            return
+        elif cbt.action == "GET_PENDING_CBT_STATS":
+            self.registerCBT(cbt.initiator, "PENDING_CBT_STATS",
+                             dict((interface_name, xmpp_details["pending"].get_stats())
+                                  for interface_name, xmpp_details in self.ipop_xmpp_details.items()))
+            return
         interface_name = message.get("interface_name")
         if self.ipop_xmpp_details[interface_name]["uid"] == "":
             self.log("UID not received from Tincan. Please check Tincan logs.", severity="error")
@@ -303,20 +522,48 @@ class XmppClient(ControllerModule):
             peer_uid = message.get("uid")
             node_uid = self.ipop_xmpp_details[interface_name]["uid"]
             data = message.get("data")
-            #CBTQ =  self.pending_CBTQ
-            CBTQ = self.ipop_xmpp_details[interface_name]["pending_CBTQ"]
-            if peer_uid in CBTQ.keys():
-                CBTQ[peer_uid].put(data)
-            else:
-                CBTQ[peer_uid]= Queue(maxsize=0)
-                CBTQ[peer_uid].put(data)
-            self.arp_uid(self.ipop_xmpp_details[interface_name]["XMPPObj"], peer_uid)
+            xmpp_details = self.ipop_xmpp_details[interface_name]
+            jid_cache = xmpp_details["jid_cache"]
+            # Send straight to the JID of a resolved peer, after any CBT still waiting for it
+            peer_jid = jid_cache.get(peer_uid)
+            if peer_jid is not None:
+                self.send_pending_cbts(interface_name, peer_uid, peer_jid)
+                self.send_forwarded_cbt(interface_name, peer_jid, data)
+                self.log("CBT for UID {} sent to JID {}".format(peer_uid, peer_jid), severity="debug")
+                return
+            dropped = xmpp_details["pending"].put(peer_uid, data, cbt.initiator)
+            if dropped is not None:
+                self.report_failed_cbts(interface_name, [dropped], "dropped")
+            # Query the roster for the UID unless a query is already outstanding
+            if jid_cache.query(peer_uid):
+                self.arp_uid(xmpp_details, peer_uid)
             self.log("CBT for UID {} put into pending Queue".format(peer_uid), severity="debug")
+            # The UID may have been resolved while the CBT was queued
+            peer_jid = jid_cache.peek(peer_uid)
+            if peer_jid is not None:
+                self.send_pending_cbts(interface_name, peer_uid, peer_jid)
 
-
+    # Tell the originating modules about CBTs that could not be forwarded, so a link setup waiting for them can be
+    # retried or abandoned right away. pending is the number of CBTs still waiting for the same UID.
+    def report_failed_cbts(self, interface_name, entries, reason):
+        reports = []
+        store = self.ipop_xmpp_details[interface_name]["pending"]
+        for entry in entries:
+            action = entry.data.get("action") if isinstance(entry.data, dict) else None
+            reports.append((entry.initiator, "FORWARD_CBT_FAILED",
+                            {"interface_name": interface_name, "uid": entry.uid, "action": action, "reason": reason,
+                             "pending": store.count(entry.uid)}))
+            self.log("CBT {0} for UID {1} {2} before the UID was resolved".format(action, entry.uid, reason),
+                     severity="warning")
+        self.registerCBTs([report for report in reports if report[0]])
 
     def timer_method(self):
-       pass
+        # Sweep the CBTs whose peer UID was not resolved in time, along with the queries no CBT waits for anymore
+        for interface_name, xmpp_details in self.ipop_xmpp_details.items():
+            expired = xmpp_details["pending"].expire()
+            if expired:
+                self.report_failed_cbts(interface_name, expired, "expired")
+            xmpp_details["jid_cache"].expire(self.CMConfig["PendingCBTTTL"])
 
     def terminate(self):
         pass
@@ -327,4 +574,4 @@ class IpopMsg(ElementBase):
     namespace = "Conn_setup"
     name = 'Ipop'
     plugin_attrib = 'Ipop'
-    interfaces = set(('setup', 'payload', 'uid', 'TapName'))
\ No newline at end of file
+    interfaces = set(('setup', 'payload', 'uid', 'TapName', 'vnet'))
\ No newline at end of file
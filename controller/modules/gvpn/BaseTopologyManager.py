@@ -20,6 +20,7 @@
 # THE SOFTWARE.
 
 from controller.framework.ControllerModule import ControllerModule
+from controller.framework.AddressTable import AddressTable
 from controller.framework.CFx import CFX
 import time
 import math
@@ -31,6 +32,8 @@ class BaseTopologyManager(ControllerModule, CFX):
         self.CFxHandle = CFxHandle
         # BTM internal Table
         self.ipop_vnets_details = {}
+        # MAC/IP addresses reachable through each UID of every virtual network
+        self.address_tables = {}
         # Limit for links that can be created by a node
         self.max_num_links = self.CMConfig["NumberOfSuccessors"] + self.CMConfig["NumberOfChords"] + \
                              self.CMConfig["NumberOfOnDemand"] + self.CMConfig["NumberOfInbound"]
@@ -49,11 +52,9 @@ class BaseTopologyManager(ControllerModule, CFX):
             virtual_net_details["successor"] = {}
             virtual_net_details["chord"] = {}
             virtual_net_details["on_demand"] = {}
-            virtual_net_details["ip_uid_table"] = {}
-            virtual_net_details["uid_mac_table"] = {}
-            virtual_net_details["mac_uid_table"] = {}
             virtual_net_details["link_type"] = {}
             virtual_net_details["peer_uid_sendmsgcount"] = {}
+            self.address_tables[interface_name] = AddressTable()
             virtual_net_details["xmpp_client_code"] = tincanparams[k]["XMPPModuleName"]
         tincanparams = None
 
@@ -307,18 +308,8 @@ class BaseTopologyManager(ControllerModule, CFX):
                     # Deleted the Peer UID from BTM's link table
                     if peeruid in virtual_net_details[virtual_net_details["link_type"][peeruid]]:
                         del virtual_net_details[virtual_net_details["link_type"][peeruid]][peeruid]
-                    if peeruid in virtual_net_details["uid_mac_table"]:
-                        # Extract unmanaged nodes behind the Peer UID
-                        unmanaged_node_mac_list = virtual_net_details["uid_mac_table"][peeruid]
-                        # Deleted the Peer UID entry from the UID_MAC_TABLE
-                        del virtual_net_details["uid_mac_table"][peeruid]
-                        # Iterate across the unmanaged node mac list and remove it from MAC_UID Table
-                        for node_mac in unmanaged_node_mac_list:
-                            del virtual_net_details["mac_uid_table"][node_mac]
-                    # Iterate across IP_UID Table and remove all keys whose value is the Peer UID
-                    for ip, uid in list(virtual_net_details["ip_uid_table"].items()):
-                        if uid == peeruid:
-                            del virtual_net_details["ip_uid_table"][ip]
+                    # Remove the MAC and IP addresses of the unmanaged nodes behind the Peer UID
+                    self.address_tables[interface_name].remove_uid(peeruid)
                     # Delete the entry from Peer UID sent msg table
                     if peeruid in virtual_net_details["peer_uid_sendmsgcount"]:
                         del virtual_net_details["peer_uid_sendmsgcount"][peeruid]
@@ -338,9 +329,7 @@ class BaseTopologyManager(ControllerModule, CFX):
             if msg_type == "local_state":
                 virtual_net_details["ipop_state"] = msg
                 virtual_net_details["mac"] = msg["mac"]
-                virtual_net_details["mac_uid_table"][msg["mac"]] = msg["_uid"]
-                if msg["_uid"] not in virtual_net_details["uid_mac_table"].keys():
-                    virtual_net_details["uid_mac_table"][msg["_uid"]] = [msg["mac"]]
+                self.address_tables[interface_name].add_mac(msg["_uid"], msg["mac"])
             else:
                 self.setGeoIP(interface_name, msg["cas"])
         elif cbt.action == "UPDATE_MAC_UID_IP_TABLES":
@@ -348,10 +337,6 @@ class BaseTopologyManager(ControllerModule, CFX):
             uid = msg["uid"]
             localuid = virtual_net_details["ipop_state"]["_uid"]
 
-            # check whether an entry exists for UID, if NOT create an entry in UID_MAC Table
-            if uid not in list(virtual_net_details["uid_mac_table"].keys()):
-                virtual_net_details["uid_mac_table"][uid] = []
-
             self.registerCBT('Logger', 'debug', 'UpdateMACUIDMessage:::' + str(msg))
             '''
             if uid not in virtual_net_details["online_peer_uid"] and uid != localuid:
@@ -377,11 +362,7 @@ class BaseTopologyManager(ControllerModule, CFX):
                                 self.registerCBT("TincanInterface", "DO_INSERT_FORWARDING_RULES", message)
             '''
             # Update the IP_UID and MAC_UID Table with the Unmanaged node details
-            for mac, ip in msg["mac_ip_table"].items():
-                if mac not in virtual_net_details["uid_mac_table"][uid]:
-                    virtual_net_details["uid_mac_table"][uid].append(mac)
-                    virtual_net_details["ip_uid_table"].update({ip: uid})
-                virtual_net_details["mac_uid_table"].update({mac: uid})
+            self.address_tables[interface_name].update(uid, msg["mac_ip_table"])
         elif cbt.action == "ICC_CONTROL":
             msg_type = msg.get("msg_type", None)
             # advertisement of nearby nodes
@@ -442,9 +423,9 @@ class BaseTopologyManager(ControllerModule, CFX):
                 unmanaged_node_list, successors, chords, on_demands = [], [], [], []
 
                 # Iterate over the IP-UID Table to retrieve Unmanaged node IP list
-                for ip, uid in list(virtual_net_details["ip_uid_table"].items()):
+                for ip in self.address_tables[interface_name].get_ips(local_uid):
                     # check whether the IP is that of the local node
-                    if ip != local_ip and uid == local_uid and ip != "0.0.0.0":
+                    if ip != local_ip and ip != "0.0.0.0":
                         unmanaged_node_list.append(ip)
                 # Extract the online successor list from the BTM Table
                 for successor in list(virtual_net_details["successor"].keys()):
@@ -476,7 +457,7 @@ class BaseTopologyManager(ControllerModule, CFX):
                     "GeoIP": geoip,
                     "mac": virtual_net_details["mac"],
                     "state": virtual_net_details["p2p_state"],
-                    "macuidmapping": virtual_net_details["uid_mac_table"],
+                    "macuidmapping": self.address_tables[interface_name].get_mac_mapping(),
                     "unmanagednodelist": unmanaged_node_list,
                     "links": {
                         "successor": successors,
@@ -489,64 +470,48 @@ class BaseTopologyManager(ControllerModule, CFX):
         elif cbt.action == "TINCAN_PACKET":
             reqdata = cbt.data
             data = reqdata["dataframe"]
-            m_type = reqdata["m_type"]
             # ignore packets when not connected to the overlay
             if virtual_net_details["p2p_state"] != "connected":
                 return
             # Check the Packet type whether it is an ARP or IP packet and extract destination IP and MAC for routing
-            if m_type == "ARP":
-                maclen = int(data[36:38], 16)
-                iplen = int(data[38:40], 16)
-                srcmacindex = 44 + 2 * maclen
-                srcmac = data[44:srcmacindex]
-                srcipindex = srcmacindex + 2 * iplen
-                destmacindex = srcipindex + 2 * maclen
-                destmac = data[srcipindex:destmacindex]
-                destipindex = destmacindex + 2 * iplen
-                dst_ip = '.'.join(str(int(i, 16)) for i in [data[destmacindex:destipindex][i:i + 2] for i in range(0, 8, 2)])
+            if data.is_arp:
+                destmac, srcmac = data.arp_dst_mac, data.arp_src_mac
             else:
-                # Check whether the packet is IPv4 or IPv6
-                if data[24:28] == "0800":
-                    dst_ip = '.'.join(str(int(i, 16)) for i in [data[60:68][i:i + 2] for i in range(0, 8, 2)])
-                else:
-                    dst_ip = data[76: 108]
-                destmac, srcmac = data[0:12], data[12:24]
-
-            ip4_uid_table = virtual_net_details["ip_uid_table"]
-            # If the destination IP exists in IP_UID_Table, if YES get the UID and send the message to the Peer
-            if dst_ip in list(ip4_uid_table.keys()):
-                dst_uid = ip4_uid_table[dst_ip]
-            # If the destination MAC exists in MAC_UID_Table, if YES get the UID and send the message to the Peer
-            elif destmac in virtual_net_details["mac_uid_table"].keys():
-                dst_uid = virtual_net_details["mac_uid_table"][destmac]
-            # Check if it is an IPv4 Multicast packet
-            elif destmac[0:6] == "01005E":
-                self.registerCBT("IPMulticast", "IPv4_MULTICAST", {"dataframe": data, "interface_name": interface_name,
-                                                                   "type": "local"})
-                return
-            # Check if it is an IPv6 Multicast packet
-            elif destmac[0:4] == "3333":
-                self.registerCBT("IPMulticast", "IPv6_MULTICAST", {"dataframe": data, "interface_name": interface_name,
-                                                                   "type": "local"})
-                return
-            # Packet is broadcast packet send it to Broadcast module
-            elif destmac == "FFFFFFFFFFFF":
-                datapacket = {
-                    "dataframe": data,
-                    "interface_name": interface_name,
-                }
-                # Check whether Packet has been generated from the local network interface
-                if reqdata.get("type") == "remote":
-                    datapacket["type"] = "remote"
+                destmac, srcmac = data.dst_mac, data.src_mac
+
+            # Resolve the destination UID by the destination IP or else the destination MAC
+            dst_uid = self.address_tables[interface_name].lookup(data)
+            if dst_uid is None:
+                # Check if it is an IPv4 Multicast packet
+                if destmac[0:6] == "01005E":
+                    self.registerCBT("IPMulticast", "IPv4_MULTICAST", {"dataframe": data,
+                                                                       "interface_name": interface_name,
+                                                                       "type": "local"})
+                    return
+                # Check if it is an IPv6 Multicast packet
+                elif destmac[0:4] == "3333":
+                    self.registerCBT("IPMulticast", "IPv6_MULTICAST", {"dataframe": data,
+                                                                       "interface_name": interface_name,
+                                                                       "type": "local"})
+                    return
+                # Packet is broadcast packet send it to Broadcast module
+                elif destmac == "FFFFFFFFFFFF":
+                    datapacket = {
+                        "dataframe": data,
+                        "interface_name": interface_name,
+                    }
+                    # Check whether Packet has been generated from the local network interface
+                    if reqdata.get("type") == "remote":
+                        datapacket["type"] = "remote"
+                    else:
+                        datapacket["type"] = "local"
+                    # Route the packet to Broadcast module for broadcasting
+                    self.registerCBT("BroadCastForwarder", "BroadcastPkt", datapacket)
+                    return
                 else:
-                    datapacket["type"] = "local"
-                # Route the packet to Broadcast module for broadcasting
-                self.registerCBT("BroadCastForwarder", "BroadcastPkt", datapacket)
-                return
-            else:
-                log = "recv illegal tincan_packet: src={0} dst={1}".format(srcmac, destmac)
-                self.registerCBT('Logger', 'info', log)
-                return
+                    log = "recv illegal tincan_packet: src={0} dst={1}".format(srcmac, destmac)
+                    self.registerCBT('Logger', 'info', log)
+                    return
             # Message routing to one of the local node attached to this UID
             if dst_uid == virtual_net_details["ipop_state"]["_uid"]:
                     network_inject_message = {